@@ -0,0 +1,327 @@
+"""
+Times the system pipeline on synthetic systems of increasing size.
+
+    python benchmarks/bench_system_pipeline.py --devices 4 8 16 32 --channels 4
+
+For each size a fresh system is generated (see `synthetic_system.py`) and run through
+the same steps as the default system feature tree, from importing the BOM to building
+the instances list, followed by the instances-list passes of the default harness feature
+tree. Each step is timed separately. The results are printed as a table with one column
+per size and the growth exponent of each step: about 1 for a step that scales linearly
+with the system, about 2 for one that scales quadratically.
+
+Steps of the feature trees that need KiCad, Inkscape or a harness layout are not run.
+"""
+
+import os
+import re
+import io
+import ast
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic_system  # noqa: E402
+
+from harnice import fileio, state  # noqa: E402
+from harnice.products import system, chtype  # noqa: E402
+from harnice.lists import (  # noqa: E402
+    instances_list,
+    library_history,
+    channel_map,
+    disconnect_map,
+    circuits_list,
+)
+from harnice.utils import (  # noqa: E402
+    system_utils,
+    feature_tree_utils,
+)
+
+PN = "bench"
+REV = "1"
+
+HARNESS_FEATURE_TREE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "harnice",
+    "default_product_feature_trees",
+    "harness_default_feature_tree.py",
+)
+
+# sections of the default feature trees that run against the synthetic system, by the
+# title in their banner comment. "INSTANCES LIST" is
+# make_instances_for_connectors_cavities_nodes_channels_circuits() plus the mating
+# connector assignment that follows it.
+SYSTEM_SECTIONS = ["INSTANCES LIST", "ASSIGN CONDUCTORS"]
+HARNESS_SECTIONS = [
+    "ASSIGN CABLES AND CONDUCTORS",
+    "ASSIGN BOM LINE NUMBERS",
+    "ASSIGN PRINT NAMES",
+]
+
+_BANNER = re.compile(r"^#\s*=+\s*\n#\s*(.+?)\s*\n#\s*=+\s*$", re.MULTILINE)
+
+
+def feature_tree_sections(text):
+    """Splits a feature tree into its banner-delimited sections: title -> code."""
+    sections = {}
+    matches = list(_BANNER.finditer(text))
+    for match, next_match in zip(matches, matches[1:] + [None]):
+        end = next_match.start() if next_match else len(text)
+        sections[match.group(1)] = text[match.end() : end]
+    return sections
+
+
+def feature_tree_imports(text):
+    """
+    Returns a namespace holding what the import statements at the top of a feature tree
+    import, so its sections run with exactly the names the feature tree itself provides.
+    """
+    first_banner = _BANNER.search(text)
+    header = ast.parse(text[: first_banner.start() if first_banner else len(text)])
+    imports = [
+        node for node in header.body if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+    namespace = {}
+    exec(compile(ast.Module(imports, type_ignores=[]), "<imports>", "exec"), namespace)
+    return namespace
+
+
+def run_system(workspace, devices, channels, disconnects, verbose=False):
+    """
+    Generates one synthetic system and runs the pipeline on it.
+
+    **Returns:**
+    - `tuple`: `(timings, counts)`; `timings` maps each step to its time in seconds,
+        `counts` is what `synthetic_system.make_system()` generated plus the size of the
+        resulting instances list.
+    """
+    system_directory = os.path.join(workspace, f"n{devices}-m{channels}-k{disconnects}")
+    rev_directory = os.path.join(system_directory, f"{PN}-rev{REV}")
+
+    # every run imports its parts into an empty store, so every run times a cold import
+    import_store = os.path.join(system_directory, "import_store")
+    shutil.rmtree(import_store, ignore_errors=True)
+    os.environ["HARNICE_IMPORT_STORE"] = import_store
+    counts = synthetic_system.make_system(
+        rev_directory, f"{PN}-rev{REV}", devices, channels, disconnects
+    )
+
+    os.chdir(rev_directory)
+    state.set_pn(PN)
+    state.set_rev(REV)
+    state.set_product("system")
+    state.set_net(None)
+    state.set_file_structure(system.file_structure())
+    system.generate_structure()
+    chtype.clear_registries()
+    fileio.invalidate_tsv_cache()
+
+    with open(HARNESS_FEATURE_TREE, encoding="utf-8") as f:
+        harness_text = f.read()
+    harness_sections = feature_tree_sections(harness_text)
+    system_sections = feature_tree_sections(system.system_feature_tree_utils_default)
+    # each feature tree's sections run with its own imports only, so a name the
+    # template forgets to import fails here as it would in a real render
+    system_namespace = feature_tree_imports(system.system_feature_tree_utils_default)
+    harness_namespace = feature_tree_imports(harness_text)
+
+    def run_macro(macro_part_number, artifact_id):
+        feature_tree_utils.run_macro(
+            macro_part_number,
+            "system_builder",
+            synthetic_system.HARNICE_REPO,
+            artifact_id=artifact_id,
+        )
+
+    def disconnects_step():
+        disconnect_map.new()
+        run_macro("disconnect_mapper", "disconnect-mapper-1")
+        disconnect_map.ensure_requirements_met()
+
+    steps = [
+        ("make_instances_from_bom", system_utils.make_instances_from_bom),
+        ("channel_map.new", channel_map.new),
+        (
+            "basic_channel_mapper",
+            lambda: run_macro("basic_channel_mapper", "channel-mapper-1"),
+        ),
+        ("add_chains_to_channel_map", system_utils.add_chains_to_channel_map),
+        ("disconnect_map + disconnect_mapper", disconnects_step),
+        ("circuits_list.new", circuits_list.new),
+    ]
+    for title in SYSTEM_SECTIONS:
+        code = compile(system_sections[title], f"<system: {title}>", "exec")
+        steps.append(
+            (
+                f"system tree: {title.lower()}",
+                lambda code=code: exec(code, system_namespace),
+            )
+        )
+    for title in HARNESS_SECTIONS:
+        code = compile(harness_sections[title], f"<harness: {title}>", "exec")
+        steps.append(
+            (
+                f"harness tree: {title.lower()}",
+                lambda code=code: exec(code, harness_namespace),
+            )
+        )
+
+    timings = {}
+    output = (
+        contextlib.nullcontext()
+        if verbose
+        else contextlib.redirect_stdout(io.StringIO())
+    )
+    with output:
+        library_history.new()
+        instances_list.new()
+        with instances_list.session():
+            for name, step in steps:
+                start = time.perf_counter()
+                step()
+                timings[name] = time.perf_counter() - start
+
+    counts["instances"] = len(fileio.read_tsv("instances list"))
+    return timings, counts
+
+
+def growth_exponent(sizes, times):
+    """Slope of log(time) against log(size) between the smallest and largest size."""
+    if len(sizes) < 2 or times[0] <= 0 or times[-1] <= 0 or sizes[0] == sizes[-1]:
+        return None
+    return math.log(times[-1] / times[0]) / math.log(sizes[-1] / sizes[0])
+
+
+def print_table(sizes, results):
+    steps = [step for step in results[0]["timings"] if step != "total"]
+    headers = ["step"] + [f"N={size}" for size in sizes] + ["exponent"]
+    rows = []
+    for step in steps + ["total"]:
+        times = [result["timings"][step] for result in results]
+        exponent = growth_exponent(sizes, times)
+        rows.append(
+            [step]
+            + [f"{t:.3f}" for t in times]
+            + ["" if exponent is None else f"{exponent:.2f}"]
+        )
+    widths = [max(len(row[i]) for row in rows + [headers]) for i in range(len(headers))]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(cell.ljust(w) for cell, w in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--devices",
+        type=int,
+        nargs="+",
+        default=[4, 8, 16, 32],
+        help="System sizes to run, in number of devices (N)",
+    )
+    parser.add_argument(
+        "--channels", type=int, default=4, help="Channels per device (M)"
+    )
+    parser.add_argument(
+        "--disconnects",
+        type=int,
+        nargs="+",
+        help="Number of disconnects (K) for each size. Defaults to N // 4",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Run each size this many times and keep the fastest time of each step",
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file as well")
+    parser.add_argument(
+        "--max-exponent",
+        type=float,
+        help="Exit with an error if any step's growth exponent is above this",
+    )
+    parser.add_argument(
+        "--workspace",
+        help="Folder to generate the systems in (kept afterwards). Defaults to a temporary folder",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="Show harnice's own output"
+    )
+    args = parser.parse_args()
+
+    sizes = args.devices
+    disconnects = args.disconnects or [size // 4 for size in sizes]
+    if len(disconnects) != len(sizes):
+        parser.error("--disconnects needs one value per --devices value")
+
+    with contextlib.ExitStack() as stack:
+        workspace = args.workspace or stack.enter_context(
+            tempfile.TemporaryDirectory(prefix="harnice-bench-")
+        )
+        workspace = os.path.abspath(workspace)
+        os.environ["HARNICE_LIBRARY_LOCATIONS"] = synthetic_system.make_library(
+            os.path.join(workspace, "library"), args.channels
+        )
+        cwd = os.getcwd()
+
+        results = []
+        try:
+            for size, k in zip(sizes, disconnects):
+                best = None
+                for attempt in range(args.repeat):
+                    run_workspace = os.path.join(workspace, f"run{attempt}")
+                    timings, counts = run_system(
+                        run_workspace, size, args.channels, k, args.verbose
+                    )
+                    if best is None:
+                        best = timings
+                    else:
+                        best = {step: min(best[step], timings[step]) for step in best}
+                best["total"] = sum(best.values())
+                results.append(
+                    {
+                        "devices": size,
+                        "disconnects": k,
+                        "counts": counts,
+                        "timings": best,
+                    }
+                )
+                print(
+                    f"N={size} M={args.channels} K={k}: {counts['channels']} channels, "
+                    f"{counts['instances']} instances, {best['total']:.3f}s",
+                    file=sys.stderr,
+                )
+        finally:
+            os.chdir(cwd)
+
+    print()
+    print_table(sizes, results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"channels_per_device": args.channels, "results": results}, f, indent=2
+            )
+
+    if args.max_exponent is not None:
+        too_slow = []
+        for step in results[0]["timings"]:
+            exponent = growth_exponent(sizes, [r["timings"][step] for r in results])
+            if exponent is not None and exponent > args.max_exponent:
+                too_slow.append(f"{step} ({exponent:.2f})")
+        if too_slow:
+            sys.exit(
+                f"Growth exponent above {args.max_exponent}: {', '.join(too_slow)}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Synthetic system generator for the benchmarks.
+
+Builds a system revision folder that looks like the output of the two KiCad macros
+(`kicad_pro_to_bom` and `kicad_pro_to_system_connector_list`), so the rest of the system
+pipeline can run without kicad-cli or a schematic.
+
+A system of size (N devices, M channels per device, K disconnects) is made of N/2
+"source" devices with M balanced mic-level outputs each and N/2 "sink" devices with M
+mic-level inputs each, using the channel types, XLR connectors and the tascam-db25
+disconnect from `library_public`. Source i is wired to sink i, one net per channel. The
+first K groups of 8 channels (the capacity of a tascam-db25) are routed through a
+disconnect instead: their source connectors share a net with the disconnect's A side and
+their sink connectors share a net with its B side.
+
+The source and sink devices are generated into a scratch library that otherwise links
+back to `library_public`, so nothing is written into the repo.
+"""
+
+import os
+import csv
+import json
+import shutil
+
+HARNICE_REPO = "https://github.com/harnice/harnice"
+LIBRARY_PUBLIC = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "library_public"
+)
+
+SOURCE_CHANNEL_TYPE = (2, HARNICE_REPO)  # balanced audio mic level, out
+SINK_CHANNEL_TYPE = (1, HARNICE_REPO)  # balanced audio mic level, in
+SHIELD_CHANNEL_TYPE = (5, HARNICE_REPO)  # chassis ground
+XLR_PINOUT = {"pos": 2, "neg": 3, "chassis": 1}
+
+DISCONNECT_MPN = "tascam-db25"
+DISCONNECT_SUBPATH = "audio"
+DISCONNECT_CHANNELS = 8
+
+BOM_COLUMNS = [
+    "device_refdes",
+    "MFG",
+    "MPN",
+    "lib_repo",
+    "lib_subpath",
+    "rev",
+    "disconnect",
+]
+SYSTEM_CONNECTOR_LIST_COLUMNS = [
+    "device_refdes",
+    "connector",
+    "net",
+    "merged_net",
+    "disconnect",
+    "connector_mpn",
+]
+SIGNALS_LIST_COLUMNS = [
+    "channel_id",
+    "signal",
+    "connector_name",
+    "cavity",
+    "connector_mpn",
+    "channel_type",
+]
+REVISION_HISTORY_COLUMNS = [
+    "product",
+    "mfg",
+    "pn",
+    "desc",
+    "rev",
+    "status",
+    "releaseticket",
+    "library_repo",
+    "library_subpath",
+    "datestarted",
+    "datemodified",
+    "datereleased",
+    "git_hash_of_harnice_src",
+    "drawnby",
+    "checkedby",
+    "revisionupdates",
+    "affectedinstances",
+]
+
+
+def source_mpn(channels):
+    return f"bench_source_{channels}ch"
+
+
+def sink_mpn(channels):
+    return f"bench_sink_{channels}ch"
+
+
+def make_library(directory, channels_per_device):
+    """
+    Creates the scratch library the synthetic systems pull their parts from.
+
+    Every folder of `library_public` is linked in under its lower-case name (the name
+    `library_utils` looks for), and the source and sink devices for
+    `channels_per_device` are generated under `device/benchmark`.
+
+    **Args:**
+    - `directory` (str): Folder to create the library in.
+    - `channels_per_device` (int): Number of channels on each generated device.
+
+    **Returns:**
+    - `str`: Path to a library locations file mapping the harnice repo URL to the
+        library, for the `HARNICE_LIBRARY_LOCATIONS` environment variable.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(LIBRARY_PUBLIC):
+        source = os.path.join(LIBRARY_PUBLIC, name)
+        if not os.path.isdir(source):
+            continue
+        if name.lower() == "device":
+            # generated devices are added next to the public ones
+            os.makedirs(os.path.join(directory, "device"), exist_ok=True)
+            for device_folder in os.listdir(source):
+                _link(
+                    os.path.join(source, device_folder),
+                    os.path.join(directory, "device", device_folder),
+                )
+        else:
+            _link(source, os.path.join(directory, name.lower()))
+
+    _write_device(
+        directory,
+        source_mpn(channels_per_device),
+        "SYNTHETIC SOURCE",
+        "MIC",
+        [
+            (f"out{j}", "XLR3M", SOURCE_CHANNEL_TYPE)
+            for j in range(1, channels_per_device + 1)
+        ],
+    )
+    _write_device(
+        directory,
+        sink_mpn(channels_per_device),
+        "SYNTHETIC SINK",
+        "PREAMP",
+        [
+            (f"in{j}", "XLR3F", SINK_CHANNEL_TYPE)
+            for j in range(1, channels_per_device + 1)
+        ],
+    )
+
+    locations_path = os.path.join(directory, "library_locations.csv")
+    with open(locations_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["repo_url", "local_path"])
+        writer.writerow([HARNICE_REPO, directory])
+    return locations_path
+
+
+def make_system(rev_directory, pn_rev, devices, channels_per_device, disconnects):
+    """
+    Writes the BOM and system connector list of a synthetic system.
+
+    **Args:**
+    - `rev_directory` (str): The system's revision folder. Created if needed.
+    - `pn_rev` (str): Part number and revision of the system, e.g. `"bench-rev1"`. The
+        lists are named after it the way `system.file_structure()` names them.
+    - `devices` (int): Number of devices (N). Rounded up to an even number, half sources
+        and half sinks.
+    - `channels_per_device` (int): Channels on each device (M).
+    - `disconnects` (int): Number of disconnects (K). Disconnects beyond what the system
+        has channels for are still added to the BOM, just left unused.
+
+    **Returns:**
+    - `dict`: Counts of what was generated (`devices`, `disconnects`, `channels`,
+        `routed_through_disconnects`, `nets`, `connectors`).
+    """
+    pairs = max(1, (devices + 1) // 2)
+    lists_directory = os.path.join(rev_directory, "lists")
+    os.makedirs(lists_directory, exist_ok=True)
+
+    bom = []
+    for i in range(1, pairs + 1):
+        bom.append(_bom_row(f"MIC{i}", source_mpn(channels_per_device)))
+    for i in range(1, pairs + 1):
+        bom.append(_bom_row(f"PREAMP{i}", sink_mpn(channels_per_device)))
+    for k in range(1, disconnects + 1):
+        row = _bom_row(f"X{k}", DISCONNECT_MPN, DISCONNECT_SUBPATH)
+        row["MFG"] = "TASCAM"
+        row["disconnect"] = "TRUE"
+        bom.append(row)
+
+    # every (source, sink) channel pair in wiring order
+    channel_pairs = [
+        (f"MIC{i}", f"out{j}", f"PREAMP{i}", f"in{j}")
+        for i in range(1, pairs + 1)
+        for j in range(1, channels_per_device + 1)
+    ]
+
+    # nets: net name -> list of (device_refdes, connector, connector_mpn, disconnect)
+    nets = {}
+    merged_net_of = {}
+    routed = 0
+    for index, (src, src_conn, dst, dst_conn) in enumerate(channel_pairs):
+        k = index // DISCONNECT_CHANNELS + 1
+        if k <= disconnects:
+            a_net = f"/X{k}_A"
+            b_net = f"/X{k}_B"
+            if a_net not in nets:
+                # a disconnect's A side mates with its B side's connector and vice versa
+                nets[a_net] = [(f"X{k}", "A", "DB25M", "TRUE")]
+                nets[b_net] = [(f"X{k}", "B", "DB25F", "TRUE")]
+                merged_net_of[a_net] = merged_net_of[b_net] = f"{a_net}+{b_net}"
+            nets[a_net].append((src, src_conn, "XLR3M", ""))
+            nets[b_net].append((dst, dst_conn, "XLR3F", ""))
+            routed += 1
+        else:
+            net = f"/{src}_{src_conn}"
+            nets[net] = [
+                (src, src_conn, "XLR3M", ""),
+                (dst, dst_conn, "XLR3F", ""),
+            ]
+            merged_net_of[net] = net
+
+    connector_list = []
+    for net, connectors in nets.items():
+        for device_refdes, connector, connector_mpn, disconnect in connectors:
+            connector_list.append(
+                {
+                    "device_refdes": device_refdes,
+                    "connector": connector,
+                    "net": net,
+                    "merged_net": merged_net_of[net],
+                    "disconnect": disconnect,
+                    "connector_mpn": connector_mpn,
+                }
+            )
+
+    _write_tsv(os.path.join(lists_directory, f"{pn_rev}-bom.tsv"), BOM_COLUMNS, bom)
+    _write_tsv(
+        os.path.join(lists_directory, f"{pn_rev}-system_connector_list.tsv"),
+        SYSTEM_CONNECTOR_LIST_COLUMNS,
+        connector_list,
+    )
+
+    return {
+        "devices": pairs * 2,
+        "disconnects": disconnects,
+        "channels": len(channel_pairs),
+        "routed_through_disconnects": routed,
+        "nets": len(nets),
+        "connectors": len(connector_list),
+    }
+
+
+def _bom_row(refdes, mpn, lib_subpath="benchmark"):
+    return {
+        "device_refdes": refdes,
+        "MFG": "HARNICE BENCHMARKS",
+        "MPN": mpn,
+        "lib_repo": HARNICE_REPO,
+        "lib_subpath": lib_subpath,
+        "rev": "1",
+        "disconnect": "",
+    }
+
+
+def _write_device(library_directory, mpn, desc, default_refdes, connectors):
+    part_directory = os.path.join(library_directory, "device", "benchmark", mpn)
+    rev_directory = os.path.join(part_directory, f"{mpn}-rev1")
+    os.makedirs(rev_directory, exist_ok=True)
+
+    signals = []
+    for connector_name, connector_mpn, channel_type in connectors:
+        for signal in ["pos", "neg"]:
+            signals.append(
+                {
+                    "channel_id": connector_name,
+                    "signal": signal,
+                    "connector_name": connector_name,
+                    "cavity": XLR_PINOUT[signal],
+                    "connector_mpn": connector_mpn,
+                    "channel_type": channel_type,
+                }
+            )
+        signals.append(
+            {
+                "channel_id": f"{connector_name}-shield",
+                "signal": "chassis",
+                "connector_name": connector_name,
+                "cavity": XLR_PINOUT["chassis"],
+                "connector_mpn": connector_mpn,
+                "channel_type": SHIELD_CHANNEL_TYPE,
+            }
+        )
+    _write_tsv(
+        os.path.join(rev_directory, f"{mpn}-rev1-signals_list.tsv"),
+        SIGNALS_LIST_COLUMNS,
+        signals,
+    )
+
+    with open(
+        os.path.join(rev_directory, f"{mpn}-rev1-attributes.json"),
+        "w",
+        encoding="utf-8",
+    ) as f:
+        json.dump({"default_refdes": default_refdes}, f, indent=4)
+
+    _write_tsv(
+        os.path.join(part_directory, f"{mpn}-revision_history.tsv"),
+        REVISION_HISTORY_COLUMNS,
+        [
+            {
+                "product": "device",
+                "mfg": "HARNICE BENCHMARKS",
+                "pn": mpn,
+                "desc": desc,
+                "rev": "1",
+                "library_repo": HARNICE_REPO,
+                "library_subpath": "benchmark/",
+                "revisionupdates": "INITIAL RELEASE",
+            }
+        ],
+    )
+
+
+def _link(source, destination):
+    if os.path.lexists(destination):
+        return
+    try:
+        os.symlink(source, destination, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        # e.g. Windows without symlink privileges
+        shutil.copytree(source, destination)
+
+
+def _write_tsv(path, fieldnames, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter="\t")
+        writer.writeheader()
+        writer.writerows(rows)
@@ -6,6 +6,9 @@ from harnice.utils import (
     note_utils,
     svg_utils,
     system_utils,
+    query_utils,
+    formboard_utils,
+    tool_utils,
     appearance,
 )
 from harnice import fileio, state
@@ -20,9 +23,25 @@ def main():
     md = ["# Library Utilities"]
     md.append(docs_functions.commands_header(module_prefix))
     md.append(docs_functions.print_function_docs(library_utils.pull, module_prefix))
+    md.append(
+        docs_functions.print_function_docs(library_utils.import_part, module_prefix)
+    )
+    md.append(
+        docs_functions.print_function_docs(library_utils.apply_imports, module_prefix)
+    )
     md.append(
         docs_functions.print_function_docs(library_utils.get_local_path, module_prefix)
     )
+    md.append(
+        docs_functions.print_function_docs(
+            library_utils.import_library_rev, module_prefix
+        )
+    )
+    md.append(
+        docs_functions.print_function_docs(
+            library_utils.import_store_path, module_prefix
+        )
+    )
 
     path = docs_functions.harnice_dir() / "docs" / "commands" / "_library_utils.md"
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -70,6 +89,24 @@ def main():
             circuit_utils.assign_cable_conductor, module_prefix
         )
     )
+    md.append(
+        docs_functions.print_function_docs(circuit_utils.CircuitGraph, module_prefix)
+    )
+    for method in [
+        circuit_utils.CircuitGraph.circuit_ids,
+        circuit_utils.CircuitGraph.ports,
+        circuit_utils.CircuitGraph.circuit_of,
+        circuit_utils.CircuitGraph.instance_at,
+        circuit_utils.CircuitGraph.max_port,
+        circuit_utils.CircuitGraph.end_ports,
+        circuit_utils.CircuitGraph.squeeze,
+        circuit_utils.CircuitGraph.renumber,
+        circuit_utils.CircuitGraph.changes,
+        circuit_utils.CircuitGraph.write,
+    ]:
+        md.append(
+            docs_functions.print_function_docs(method, "circuit_utils.CircuitGraph")
+        )
     path = docs_functions.harnice_dir() / "docs" / "commands" / "_circuits_utils.md"
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text("".join(md), encoding="utf-8")
@@ -182,6 +219,7 @@ def main():
     md.append(
         docs_functions.print_function_docs(svg_utils.draw_styled_path, module_prefix)
     )
+    md.append(docs_functions.print_function_docs(svg_utils.export_pdfs, module_prefix))
 
     path = docs_functions.harnice_dir() / "docs" / "commands" / "_svg_utils.md"
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -229,6 +267,89 @@ def main():
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text("".join(md), encoding="utf-8")
 
+    # ========================================================
+    # QUERY UTILS
+    # ========================================================
+    module_prefix = "query_utils"
+    md = ["# Query Utilities"]
+    md.append(docs_functions.commands_header(module_prefix))
+    md.append(docs_functions.print_function_docs(query_utils.database, module_prefix))
+    md.append(docs_functions.print_function_docs(query_utils.query, module_prefix))
+    md.append(docs_functions.print_function_docs(query_utils.select, module_prefix))
+    for method in [
+        query_utils.Query.join,
+        query_utils.Query.where,
+        query_utils.Query.columns,
+        query_utils.Query.order_by,
+        query_utils.Query.limit,
+        query_utils.Query.sql,
+        query_utils.Query.all,
+        query_utils.Query.first,
+    ]:
+        md.append(docs_functions.print_function_docs(method, "query_utils.Query"))
+
+    path = docs_functions.harnice_dir() / "docs" / "commands" / "_query_utils.md"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(md), encoding="utf-8")
+
+    # ========================================================
+    # FORMBOARD UTILS
+    # ========================================================
+    module_prefix = "formboard_utils"
+    md = ["# Formboard Utilities"]
+    md.append(docs_functions.commands_header(module_prefix))
+    md.append(
+        docs_functions.print_function_docs(
+            formboard_utils.calculate_location, module_prefix
+        )
+    )
+    md.append(
+        docs_functions.print_function_docs(formboard_utils.locations, module_prefix)
+    )
+    md.append(
+        docs_functions.print_function_docs(
+            formboard_utils.TransformResolver, module_prefix
+        )
+    )
+    for method in [
+        formboard_utils.TransformResolver.world,
+        formboard_utils.TransformResolver.place,
+    ]:
+        md.append(
+            docs_functions.print_function_docs(
+                method, "formboard_utils.TransformResolver"
+            )
+        )
+    md.append(
+        docs_functions.print_function_docs(formboard_utils.draw_line, module_prefix)
+    )
+
+    path = docs_functions.harnice_dir() / "docs" / "commands" / "_formboard_utils.md"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(md), encoding="utf-8")
+
+    # ========================================================
+    # TOOL UTILS
+    # ========================================================
+    module_prefix = "tool_utils"
+    md = ["# External Tool Utilities"]
+    md.append(docs_functions.commands_header(module_prefix))
+    for function in [
+        tool_utils.run,
+        tool_utils.fingerprint,
+        tool_utils.store,
+        tool_utils.restore,
+        tool_utils.tool_version,
+        tool_utils.cache_directory,
+        tool_utils.timings,
+        tool_utils.clear_timings,
+    ]:
+        md.append(docs_functions.print_function_docs(function, module_prefix))
+
+    path = docs_functions.harnice_dir() / "docs" / "commands" / "_tool_utils.md"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(md), encoding="utf-8")
+
     # ========================================================
     # APPEARANCE
     # ========================================================
@@ -381,7 +502,15 @@ Behind the scenes, Harnice stores the current part number and revision number in
     md.append(
         docs_functions.print_function_docs(fileio.get_path_to_project, module_prefix)
     )
+    md.append(docs_functions.print_function_docs(fileio.location_files, module_prefix))
+    md.append(docs_functions.print_function_docs(fileio.lookup_location, module_prefix))
+    md.append(
+        docs_functions.print_function_docs(fileio.location_entries, module_prefix)
+    )
     md.append(docs_functions.print_function_docs(fileio.read_tsv, module_prefix))
+    md.append(docs_functions.print_function_docs(fileio.encode_cell, module_prefix))
+    md.append(docs_functions.print_function_docs(fileio.decode_cell, module_prefix))
+    md.append(docs_functions.print_function_docs(fileio.migrate_tsv, module_prefix))
     md.append(docs_functions.print_function_docs(fileio.drawnby, module_prefix))
     md.append(docs_functions.print_function_docs(fileio.today, module_prefix))
     md.append(
@@ -158,6 +158,13 @@ def main():
             instances_list.remove_instance, module_prefix
         )
     )
+    md.append(
+        docs_functions.print_function_docs(instances_list.bulk_new, module_prefix)
+    )
+    md.append(
+        docs_functions.print_function_docs(instances_list.bulk_modify, module_prefix)
+    )
+    md.append(docs_functions.print_function_docs(instances_list.rollup, module_prefix))
     md.append(docs_functions.print_function_docs(instances_list.new, module_prefix))
     md.append(
         docs_functions.print_function_docs(
@@ -177,6 +184,30 @@ def main():
             instances_list.list_of_uniques, module_prefix
         )
     )
+    md.append(docs_functions.print_function_docs(instances_list.where, module_prefix))
+    md.append(docs_functions.print_function_docs(instances_list.rows, module_prefix))
+    md.append(
+        docs_functions.print_function_docs(instances_list.open_session, module_prefix)
+    )
+    md.append(docs_functions.print_function_docs(instances_list.flush, module_prefix))
+    md.append(
+        docs_functions.print_function_docs(instances_list.close_session, module_prefix)
+    )
+    md.append(docs_functions.print_function_docs(instances_list.session, module_prefix))
+    md.append(
+        docs_functions.print_function_docs(
+            instances_list.set_debug_capture, module_prefix
+        )
+    )
+    md.append(
+        docs_functions.print_function_docs(instances_list.call_chain_of, module_prefix)
+    )
+    md.append(
+        docs_functions.print_function_docs(instances_list.set_sidecar, module_prefix)
+    )
+    md.append(
+        docs_functions.print_function_docs(instances_list.generation, module_prefix)
+    )
 
     path = (
         docs_functions.harnice_dir()
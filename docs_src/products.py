@@ -70,6 +70,21 @@ def main():
             chtype.is_or_is_compatible_with, module_prefix
         )
     )
+    md.append(
+        docs_functions.print_function_docs(
+            chtype.are_compatible, module_prefix
+        )
+    )
+    md.append(
+        docs_functions.print_function_docs(
+            chtype.registry, module_prefix
+        )
+    )
+    md.append(
+        docs_functions.print_function_docs(
+            chtype.clear_registries, module_prefix
+        )
+    )
     path = docs_functions.harnice_dir() / "docs" / "products" / "_channel_type.md"
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text("".join(md), encoding="utf-8")
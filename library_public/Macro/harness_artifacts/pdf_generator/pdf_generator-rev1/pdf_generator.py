@@ -1,6 +1,5 @@
 import os
 import json
-import subprocess
 from pypdf import PdfWriter
 
 from harnice import fileio, state
@@ -22,7 +21,8 @@ def macro_file_structure(page_name=None, page_counter=None):
         f"{artifact_id}-mastercontents.svg": "master contents svg",
         f"{state.partnumber('pn-rev')}-{artifact_id}.pdf": "output pdf",
         "page_svgs": {
-            f"{page_counter}-{page_name}-user-editable.svg": "user editable page svg"
+            f"{page_counter}-{page_name}-user-editable.svg": "user editable page svg",
+            "page_pdf_hashes.json": "page pdf hashes",
         },
     }
 
@@ -334,36 +334,28 @@ for page in page_data.get("pages", []):
 # ============================================
 #            PRODUCE MULTIPAGE PDF
 # ============================================
-temp_pdfs = []
-inkscape_bin = get_inkscape_bin()
-
+# page pdfs are kept between renders so pages whose svg hasn't changed aren't exported again
+page_svgs = []
+page_pdfs = []
 page_counter = 0
 for page_name in [p.get("name") for p in page_data.get("pages", [])]:
     page_counter += 1
     svg_path = path(
         "user editable page svg", page_name=page_name, page_counter=page_counter
     )
-    pdf_path = svg_path.replace(".svg", ".temp.pdf")
-
-    subprocess.run(
-        [
-            inkscape_bin,
-            svg_path,
-            "--export-type=pdf",
-            f"--export-filename={pdf_path}",
-        ],
-        check=True,
-    )
-
-    temp_pdfs.append(pdf_path)
+    page_svgs.append(svg_path)
+    page_pdfs.append(svg_path.replace(".svg", ".pdf"))
+
+svg_utils.export_pdfs(
+    page_svgs,
+    page_pdfs,
+    get_inkscape_bin(),
+    hash_file=path("page pdf hashes"),
+)
 
-# Merge all PDFs
+# Merge all PDFs, in page order
 writer = PdfWriter()
-for pdf_path in temp_pdfs:
+for pdf_path in page_pdfs:
     writer.append(pdf_path)
 writer.write(path("output pdf"))
 writer.close()
-
-# Optional cleanup
-for temp in temp_pdfs:
-    os.remove(temp)
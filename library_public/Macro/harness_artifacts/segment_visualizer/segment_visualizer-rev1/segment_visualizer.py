@@ -2,8 +2,7 @@ import math
 from collections import defaultdict
 import os
 from harnice import fileio, state
-from harnice.lists import instances_list
-from harnice.utils import svg_utils
+from harnice.utils import formboard_utils, svg_utils
 
 
 # =============== PATHS ===================================================================================
@@ -117,14 +116,23 @@ def average_coords(data):
             "y": v["y"] / v["count"],
         }
         averages[key]["angle"] = float(
-            instances_list.attribute_of(
-                instances_list.attribute_of(key, "segment_group"), "absolute_rotation"
-            )
+            attribute_of(attribute_of(key, "segment_group"), "absolute_rotation")
         )
-        averages[key]["text"] = instances_list.attribute_of(key, "print_name")
+        averages[key]["text"] = attribute_of(key, "print_name")
     return averages
 
 
+def attribute_of(instance_name, attribute):
+    # same as instances_list.attribute_of(), but from the list read at the start
+    instance = instances_by_name.get(instance_name)
+    if instance is None:
+        return None
+    raw = instance.get(attribute)
+    if isinstance(raw, str) and raw.lstrip()[:1] in ("[", "{"):
+        return fileio.decode_cell(raw)
+    return raw
+
+
 def circle_svg(x, y, r, color):
     y_svg = -y
     return f'<circle cx="{x:.3f}" cy="{y_svg:.3f}" r="{r:.3f}" fill="{color}" />'
@@ -141,61 +149,57 @@ if item_type is None:
 if scale is None:
     raise ValueError("scale is required")
 
-points_to_pass_through = {}
+# =============== INDEXES ===============
+# everything below looks instances up in these instead of scanning the list
+instances_by_name = {instance.get("instance_name"): instance for instance in instances}
+components = [
+    instance for instance in instances if instance.get("item_type") == item_type
+]
+
+# node -> (segment, flip_sort) of every segment that ends at it, in instances list order
+segments_at_node = defaultdict(list)
+for segment in instances:
+    if segment.get("item_type") != "segment":
+        continue
+    segments_at_node[segment.get("node_at_end_a")].append((segment, False))
+    if segment.get("node_at_end_b") != segment.get("node_at_end_a"):
+        segments_at_node[segment.get("node_at_end_b")].append((segment, True))
 
-# sort item_type instances alphabetically inside each segment
+# node -> parents of the item_type instances in the segments that end at it
+parents_at_node = defaultdict(set)
+# segment -> item_type instances in it, sorted alphabetically
 sorted_segment_contents = {
-    seg.get("instance_name"): []
-    for seg in instances
-    if seg.get("item_type") == "segment"
+    instance.get("instance_name"): []
+    for instance in instances
+    if instance.get("item_type") == "segment"
 }
-for inst in instances:
-    if inst.get("item_type") == item_type:
-        segment_name = inst.get("segment_group")
-        if segment_name in sorted_segment_contents:
-            sorted_segment_contents[segment_name].append(inst.get("instance_name"))
+# parent -> segment_order -> (position, instance) of the first item_type instance of that
+# parent with that order
+segment_chains = {}
+for position, component in enumerate(components):
+    segment_name = component.get("segment_group")
+    segment = instances_by_name.get(segment_name)
+    if segment is not None:
+        for node_name in {segment.get("node_at_end_a"), segment.get("node_at_end_b")}:
+            parents_at_node[node_name].add(component.get("parent_instance"))
+    if segment_name in sorted_segment_contents:
+        sorted_segment_contents[segment_name].append(component.get("instance_name"))
+    segment_chains.setdefault(component.get("parent_instance"), {}).setdefault(
+        component.get("segment_order"), (position, component)
+    )
 for seg_name in sorted_segment_contents:
     sorted_segment_contents[seg_name].sort()
 
+points_to_pass_through = {}
+
 # collect points to pass through
 for node in instances:
     if node.get("item_type") == "node":
+        node_name = node.get("instance_name")
         x_px, y_px, seg_angle = formboard_utils.calculate_location(node, instances)
         x_node, y_node = x_px * 96, y_px * 96
 
-        node_segment_angles = []
-        node_segments = []
-        flip_sort = {}
-        for instance in instances:
-            if instance.get("item_type") == "segment":
-                if instance.get("node_at_end_a") == node.get("instance_name"):
-                    node_segment_angles.append(float(instance.get("absolute_rotation")))
-                    node_segments.append(instance)
-                    flip_sort[instance.get("instance_name")] = False
-                elif instance.get("node_at_end_b") == node.get("instance_name"):
-                    temp_angle = float(instance.get("absolute_rotation")) + 180
-                    if temp_angle > 360:
-                        temp_angle -= 360
-                    node_segment_angles.append(temp_angle)
-                    node_segments.append(instance)
-                    flip_sort[instance.get("instance_name")] = True
-
-        components_in_node = 0
-        components_seen = []
-        for instance in instances:
-            if instance.get("item_type") == item_type:
-                segment_candidate = instance.get("segment_group")
-                if instance.get("parent_instance") in components_seen:
-                    continue
-                if instances_list.attribute_of(
-                    segment_candidate, "node_at_end_a"
-                ) == node.get("instance_name") or instances_list.attribute_of(
-                    segment_candidate, "node_at_end_b"
-                ) == node.get(
-                    "instance_name"
-                ):
-                    components_seen.append(instance.get("parent_instance"))
-                    components_in_node += 1
+        components_in_node = len(parents_at_node.get(node_name, ()))
 
         node_radius_inches = (
             1 + math.pow(components_in_node, 1.5) * segment_spacing_inches_scaled / 4
@@ -204,19 +208,21 @@ for node in instances:
         if print_circles_and_dots:
             svg_groups.append(circle_svg(x_node, y_node, node_radius_px, "gray"))
 
-        for seg_angle, seg in zip(node_segment_angles, node_segments):
+        for seg, flip_sort in segments_at_node.get(node_name, []):
             seg_name = seg.get("instance_name")
+            seg_angle = float(seg.get("absolute_rotation"))
+            if flip_sort:
+                seg_angle += 180
+                if seg_angle > 360:
+                    seg_angle -= 360
             component_names_sorted = (
                 sorted_segment_contents.get(seg_name, [])
-                if flip_sort.get(seg_name)
+                if flip_sort
                 else sorted_segment_contents.get(seg_name, [])[::-1]
             )
             num_seg_components = len(component_names_sorted)
 
             for idx, inst_name in enumerate(component_names_sorted, start=1):
-                component = next(
-                    i for i in instances if i.get("instance_name") == inst_name
-                )
                 center_offset_from_count_inches = (
                     idx - (num_seg_components / 2) - 0.5
                 ) * segment_spacing_inches_scaled
@@ -244,7 +250,6 @@ for node in instances:
                         )
                     )
 
-                node_name = node.get("instance_name")
                 points_to_pass_through.setdefault(node_name, {}).setdefault(
                     seg_name, {}
                 )[inst_name] = {
@@ -253,95 +258,36 @@ for node in instances:
                 }
 
 # === DRAW SPLINES ==============================================================
-unique_parents = []
-for instance1 in instances:
-    if instance1.get("item_type") != item_type:
-        continue
-    parent_name = instance1.get("parent_instance")
-    if parent_name in unique_parents:
-        continue
-    unique_parents.append(parent_name)
-
+for parent_name, chain in segment_chains.items():
     point_chain = []
     segment_order = 0
-    another_segment_exists_after = True
 
-    while another_segment_exists_after:
+    while True:
         segment_order += 1
-        ab_lookup_key = f"{segment_order}-ab"
-        ba_lookup_key = f"{segment_order}-ba"
-        found_this_step = False
-
-        for instance2 in instances:
-            if instance2.get("item_type") != item_type:
-                continue
-            if instance2.get("parent_instance") != parent_name:
-                continue
-
-            seg_group = instance2.get("segment_group")
-            if instance2.get("segment_order") == ab_lookup_key:
-                tangent = float(
-                    instances_list.attribute_of(seg_group, "absolute_rotation")
-                )
-                point_chain.extend(
-                    [
-                        {
-                            "x": points_to_pass_through[
-                                instances_list.attribute_of(seg_group, "node_at_end_a")
-                            ][seg_group][instance2.get("instance_name")]["x"],
-                            "y": points_to_pass_through[
-                                instances_list.attribute_of(seg_group, "node_at_end_a")
-                            ][seg_group][instance2.get("instance_name")]["y"],
-                            "tangent": tangent,
-                        },
-                        {
-                            "x": points_to_pass_through[
-                                instances_list.attribute_of(seg_group, "node_at_end_b")
-                            ][seg_group][instance2.get("instance_name")]["x"],
-                            "y": points_to_pass_through[
-                                instances_list.attribute_of(seg_group, "node_at_end_b")
-                            ][seg_group][instance2.get("instance_name")]["y"],
-                            "tangent": tangent,
-                        },
-                    ]
-                )
-                found_this_step = True
-                break
-
-            elif instance2.get("segment_order") == ba_lookup_key:
-                tangent = (
-                    float(instances_list.attribute_of(seg_group, "absolute_rotation"))
-                    + 180
-                )
-                if tangent > 360:
-                    tangent -= 360
-                point_chain.extend(
-                    [
-                        {
-                            "x": points_to_pass_through[
-                                instances_list.attribute_of(seg_group, "node_at_end_b")
-                            ][seg_group][instance2.get("instance_name")]["x"],
-                            "y": points_to_pass_through[
-                                instances_list.attribute_of(seg_group, "node_at_end_b")
-                            ][seg_group][instance2.get("instance_name")]["y"],
-                            "tangent": tangent,
-                        },
-                        {
-                            "x": points_to_pass_through[
-                                instances_list.attribute_of(seg_group, "node_at_end_a")
-                            ][seg_group][instance2.get("instance_name")]["x"],
-                            "y": points_to_pass_through[
-                                instances_list.attribute_of(seg_group, "node_at_end_a")
-                            ][seg_group][instance2.get("instance_name")]["y"],
-                            "tangent": tangent,
-                        },
-                    ]
-                )
-                found_this_step = True
-                break
-
-        if not found_this_step:
-            another_segment_exists_after = False
+        # if a parent has both, the one that comes first in the instances list wins
+        steps = [
+            chain[key]
+            for key in [f"{segment_order}-ab", f"{segment_order}-ba"]
+            if key in chain
+        ]
+        if not steps:
+            break
+        step = min(steps, key=lambda position_and_step: position_and_step[0])[1]
+        seg_group = step.get("segment_group")
+        segment = instances_by_name[seg_group]
+        if step.get("segment_order").endswith("-ab"):
+            tangent = float(segment.get("absolute_rotation"))
+            ends = ["node_at_end_a", "node_at_end_b"]
+        else:
+            tangent = float(segment.get("absolute_rotation")) + 180
+            if tangent > 360:
+                tangent -= 360
+            ends = ["node_at_end_b", "node_at_end_a"]
+        for end in ends:
+            point = points_to_pass_through[segment.get(end)][seg_group][
+                step.get("instance_name")
+            ]
+            point_chain.append({"x": point["x"], "y": point["y"], "tangent": tangent})
 
     cleaned_chain = [pt for pt in point_chain if isinstance(pt, dict)]
 
@@ -349,18 +295,18 @@ for instance1 in instances:
     svg_utils.draw_styled_path(
         cleaned_chain,
         0.02 / scale,
-        instances_list.attribute_of(parent_name, "appearance"),
+        attribute_of(parent_name, "appearance"),
         svg_groups,
     )
 
     for order in [0, -1]:
         if order == 0:
-            text = instances_list.attribute_of(
-                instances_list.attribute_of(parent_name, "node_at_end_a"), "print_name"
+            text = attribute_of(
+                attribute_of(parent_name, "node_at_end_a"), "print_name"
             )
         else:
-            text = instances_list.attribute_of(
-                instances_list.attribute_of(parent_name, "node_at_end_b"), "print_name"
+            text = attribute_of(
+                attribute_of(parent_name, "node_at_end_b"), "print_name"
             )
         svg_groups.append(
             label_svg(
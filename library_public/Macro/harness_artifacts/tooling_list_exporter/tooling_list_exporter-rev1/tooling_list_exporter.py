@@ -1,6 +1,5 @@
 import os
 import csv
-import ast
 from harnice import fileio, state
 from harnice.utils import svg_utils
 
@@ -60,9 +59,8 @@ tool_table_contents.append(
 for instance in instances:
     tools = instance.get("lib_tools")
     if tools not in ["", None]:
-        try:
-            parsed_tools = ast.literal_eval(str(tools))
-        except (ValueError, SyntaxError):
+        parsed_tools = fileio.decode_cell(str(tools))
+        if isinstance(parsed_tools, str):
             continue
 
         tools_to_add = (
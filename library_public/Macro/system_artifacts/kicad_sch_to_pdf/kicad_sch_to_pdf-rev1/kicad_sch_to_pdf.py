@@ -1,6 +1,6 @@
 import os
-import subprocess
 from harnice import fileio, state
+from harnice.utils import tool_utils
 from harnice.paths import get_kicad_cli
 
 build_macro_mpn = "kicad_pro_to_pdf"
@@ -35,5 +35,21 @@ cmd = [
     fileio.path("kicad sch", structure_dict=file_structure()),
 ]
 
-# Run silently
-subprocess.run(cmd, check=True, capture_output=True)
+# every sheet of the schematic (and the project file) can change the export
+kicad_directory = os.path.dirname(
+    fileio.path("kicad sch", structure_dict=file_structure())
+)
+kicad_files = [
+    os.path.join(kicad_directory, filename)
+    for filename in sorted(os.listdir(kicad_directory))
+    if filename.endswith((".kicad_sch", ".kicad_pro"))
+]
+
+# Run silently; replays the last export if the schematic hasn't changed
+tool_utils.run(
+    cmd,
+    inputs=kicad_files,
+    outputs=[fileio.path("schematic pdf", structure_dict=file_structure())],
+    check=True,
+    capture_output=True,
+)
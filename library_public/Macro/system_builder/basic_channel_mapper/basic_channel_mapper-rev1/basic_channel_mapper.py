@@ -46,9 +46,7 @@ for merged_net in unique_merged_nets:
                 print("          From key already mapped")
             continue
 
-        # Parse channel types
         from_type = chtype.parse(from_channel.get("from_channel_type"))
-        compatibles_from = chtype.compatibles(from_channel.get("from_channel_type"))
 
         for to_channel_candidate in net_channels:
             to_key = (
@@ -71,14 +69,10 @@ for merged_net in unique_merged_nets:
                     print("               To key candidate is the same as from key")
                 continue
 
-            # Parse "to" type and its compatibles
             to_type = chtype.parse(to_channel_candidate.get("from_channel_type"))
-            compatibles_to = chtype.compatibles(
-                to_channel_candidate.get("from_channel_type")
-            )
 
             # Backwards-compatible check: either side may declare compatibility
-            if not (to_type in compatibles_from or from_type in compatibles_to):
+            if not chtype.are_compatible(from_type, to_type):
                 if verbose:
                     print("               To key candidate is not compatible")
                 continue
@@ -6,6 +6,7 @@ import csv
 from typing import Dict
 from harnice import fileio, state
 from harnice.paths import get_kicad_cli
+from harnice.utils import tool_utils
 
 build_macro_mpn = "kicad_pro_to_system_connector_list"
 
@@ -60,9 +61,19 @@ def export_netlist() -> str:
     if not os.path.isfile(kicad_cli):
         kicad_cli = shutil.which(kicad_cli) or kicad_cli
 
+    # every sheet of the schematic (and the project file) can change the netlist
+    kicad_directory = os.path.dirname(sch_file)
+    kicad_files = [
+        os.path.join(kicad_directory, filename)
+        for filename in sorted(os.listdir(kicad_directory))
+        if filename.endswith((".kicad_sch", ".kicad_pro"))
+    ]
+
     try:
-        proc = subprocess.run(
+        proc = tool_utils.run(
             [kicad_cli, "sch", "export", "netlist", sch_file, "--output", net_file],
+            inputs=kicad_files,
+            outputs=[net_file],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True,
@@ -92,36 +103,51 @@ def merge_disconnect_nets(
     """
     Merge nets connected through any chain of disconnects.
     Returns {merged_net: [(conn_string, orig_net), ...]}.
-    """
-    adjacency: Dict[str, set[str]] = {k: set() for k in nets}
-
-    for refdes in disconnect_refdes:
-        involved = [k for k, conns in nets.items() if any(refdes in c for c in conns)]
-        for i in range(len(involved)):
-            for j in range(i + 1, len(involved)):
-                a, b = involved[i], involved[j]
-                adjacency[a].add(b)
-                adjacency[b].add(a)
-
-    visited = set()
-    groups: list[set[str]] = []
 
+    A connection belongs to a disconnect when its refdes (the part of "ref:pinfunction"
+    before the colon) is exactly the disconnect's refdes. Nets sharing a disconnect are
+    joined with union-find, so merging takes about one step per connection.
+    """
+    # disconnect refdes -> nets it has a connection on, in netlist order
+    nets_of_disconnect: Dict[str, list[str]] = {}
+    for net, conns in nets.items():
+        for conn in conns:
+            refdes = conn.split(":", 1)[0]
+            if refdes in disconnect_refdes:
+                involved = nets_of_disconnect.setdefault(refdes, [])
+                if not involved or involved[-1] != net:
+                    involved.append(net)
+
+    parent = {net: net for net in nets}
+    size = {net: 1 for net in nets}
+
+    def find(net: str) -> str:
+        root = net
+        while parent[root] != root:
+            root = parent[root]
+        while parent[net] != root:
+            parent[net], net = root, parent[net]
+        return root
+
+    for involved in nets_of_disconnect.values():
+        first = find(involved[0])
+        for net in involved[1:]:
+            root = find(net)
+            if root == first:
+                continue
+            if size[root] > size[first]:
+                first, root = root, first
+            parent[root] = first
+            size[first] += size[root]
+
+    # groups in the order of their first net, nets within a group in netlist order
+    groups: Dict[str, list[str]] = {}
     for net in nets:
-        if net not in visited:
-            stack = [net]
-            group = set()
-            while stack:
-                cur = stack.pop()
-                if cur in visited:
-                    continue
-                visited.add(cur)
-                group.add(cur)
-                stack.extend(adjacency[cur])
-            groups.append(group)
+        groups.setdefault(find(net), []).append(net)
 
     merged: Dict[str, list[tuple[str, str]]] = {}
-    for group in groups:
-        merged_key = "+".join(sorted(group)) if len(group) > 1 else next(iter(group))
+    for group in groups.values():
+        merged_key = "+".join(sorted(group)) if len(group) > 1 else group[0]
         merged[merged_key] = [(c, net) for net in group for c in nets[net]]
 
     return merged
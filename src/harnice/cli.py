@@ -1,4 +1,5 @@
 import argparse
+import csv
 import os
 import sys
 import shutil
@@ -76,12 +77,36 @@ def main():
         help="Launch the Harnice console",
     )
 
+    group.add_argument(
+        "--migrate-cells",
+        nargs="*",
+        metavar="TSV",
+        help="Rewrite dict and list cells of TSVs written by older versions of Harnice as JSON. "
+        "Defaults to every TSV in and under the current directory",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="With -r or -l, reuse outputs of macros whose inputs haven't changed since the last render",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="With -r or -l, time each stage of the render and write a report to the rev folder",
+    )
+
     args = parser.parse_args()
 
     if args.console:
         _run_console()
         return
 
+    if args.migrate_cells is not None:
+        migrate_cells(args.migrate_cells)
+        return
+
     # -----------------------------
     # Handle new revision creation and exit
     # -----------------------------
@@ -126,17 +151,67 @@ def main():
     # -----------------------------
     # Execute render logic
     # -----------------------------
-    if args.lightweight:
-        try:
-            product_module.render(lightweight=True)
-        except TypeError:
-            sys.exit(f"Product '{item_type}' does not support lightweight rendering")
-    else:
-        product_module.render()
+    if args.incremental:
+        from harnice.utils import incremental_utils
+
+        incremental_utils.enable()
+
+    if args.profile:
+        from harnice.utils import profile_utils
+
+        profile_utils.enable()
+
+    try:
+        if args.lightweight:
+            try:
+                product_module.render(lightweight=True)
+            except TypeError:
+                sys.exit(
+                    f"Product '{item_type}' does not support lightweight rendering"
+                )
+        else:
+            product_module.render()
+    finally:
+        if args.profile:
+            # a failed report mustn't hide why the render failed
+            try:
+                profile_utils.finish()
+            except Exception as e:
+                print(f"Could not write the render profile: {e}", file=sys.stderr)
+
+    if args.incremental:
+        incremental_utils.finish()
 
     return
 
 
+def migrate_cells(paths):
+    """Run `fileio.migrate_tsv()` on each TSV in **paths**, or on every TSV under the current directory if empty."""
+    if not paths:
+        for dirpath, dirnames, filenames in os.walk(os.getcwd()):
+            # skip caches and hidden folders such as .git and .incremental_cache
+            dirnames[:] = sorted(
+                d for d in dirnames if not d.startswith(".") and d != "__pycache__"
+            )
+            paths.extend(
+                os.path.join(dirpath, filename)
+                for filename in sorted(filenames)
+                if filename.endswith(".tsv")
+            )
+
+    total = 0
+    for path in paths:
+        try:
+            changed = fileio.migrate_tsv(path)
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            print(f"Skipped {path}: {e}")
+            continue
+        if changed:
+            print(f"Migrated {changed} cell(s) in {path}")
+        total += changed
+    print(f"Migrated {total} cell(s) in {len(paths)} file(s)")
+
+
 def _run_console():
     """Launch the Harnice console (can be run from any directory)."""
     # Ensure function_index.json is up to date for the editor dropdowns
@@ -126,7 +126,7 @@ flattened_network.build_flattened_network(
 
 
 # ===========================================================================
-#                  ASSING CABLES AND CONDUCTORS
+#                  ASSIGN CABLES AND CONDUCTORS
 # ===========================================================================
 
 instances = fileio.read_tsv("instances list")
@@ -154,17 +154,11 @@ for instance in instances:
                     )
                     break
 
-for instance in fileio.read_tsv("instances list"):
-    if instance.get("item_type") in ["conductor", "cable"]:
-        length = 0
-        for instance2 in fileio.read_tsv("instances list"):
-            if instance2.get("parent_instance") == instance.get("instance_name"):
-                if instance2.get("length", "").strip():
-                    if instance.get("item_type") == "conductor":
-                        length += float(instance2.get("length").strip())
-                    else:
-                        length = max(length, float(instance2.get("length").strip()))
-        instances_list.modify(instance.get("instance_name"), {"length": length})
+# a conductor is as long as its segments put together, a cable as long as its longest conductor
+instances_list.rollup(
+    "parent_instance", "length", "sum", filter={"item_type": "conductor"}
+)
+instances_list.rollup("parent_instance", "length", "max", filter={"item_type": "cable"})
 
 # ===========================================================================
 #                   ASSIGN BOM LINE NUMBERS
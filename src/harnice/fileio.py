@@ -1,11 +1,18 @@
 import os
 import os.path
+import ast
 import datetime
+import time
 import shutil
 import csv
 import json
+import marshal
 import subprocess
+import tempfile
+from collections import OrderedDict
+from threading import Lock
 from harnice import state
+from harnice.utils import profile_utils
 
 # standard punctuation:
 #  .  separates between name hierarchy levels
@@ -161,24 +168,7 @@ def path(target_value, structure_dict=None, base_directory=None):
     if structure_dict is None:
         structure_dict = state.file_structure
 
-    def recursive_search(data, path):
-        if isinstance(data, dict):
-            for key, value in data.items():
-                if value == target_value:
-                    return path + [key]
-                result = recursive_search(value, path + [key])
-                if result:
-                    return result
-        elif isinstance(data, list):
-            for index, item in enumerate(data):
-                if item == target_value:
-                    return path + [f"[{index}]"]
-                result = recursive_search(item, path + [f"[{index}]"])
-                if result:
-                    return result
-        return None
-
-    path_value = recursive_search(structure_dict, [])
+    path_value = _structure_index(structure_dict)[0].get(target_value)
 
     if not path_value:
         raise TypeError(f"Could not find filepath of '{target_value}'.")
@@ -227,24 +217,7 @@ def dirpath(target_key, structure_dict=None, base_directory=None):
     if structure_dict is None:
         structure_dict = state.file_structure
 
-    def recursive_search(data, path):
-        if isinstance(data, dict):
-            for key, value in data.items():
-                # if the current key matches, return its path immediately
-                if key == target_key:
-                    return path + [key]
-                # otherwise, keep descending
-                result = recursive_search(value, path + [key])
-                if result:
-                    return result
-        elif isinstance(data, list):
-            for index, item in enumerate(data):
-                result = recursive_search(item, path + [f"[{index}]"])
-                if result:
-                    return result
-        return None
-
-    path_key = recursive_search(structure_dict, [])
+    path_key = _structure_index(structure_dict)[1].get(target_key)
     if not path_key:
         raise TypeError(f"Could not find directory '{target_key}'.")
     if base_directory in [None, ""]:
@@ -253,6 +226,79 @@ def dirpath(target_key, structure_dict=None, base_directory=None):
         return os.path.join(rev_directory(), base_directory, *path_key)
 
 
+# Reverse indexes of structure dicts, keyed by fingerprint (the dict's repr), and the
+# same indexes keyed by the id() of the dicts they were looked up for, so a dict that is
+# used again (such as state.file_structure) is found without computing its repr. Both
+# are cleared whenever state.pn, state.rev or state.file_structure changes.
+_structure_indexes = {}
+_structure_indexes_by_id = {}
+_STRUCTURE_INDEXES_MAX_ENTRIES = 256
+_structure_indexes_generation = None
+
+
+def _structure_index(structure_dict):
+    """Return `(paths_by_value, paths_by_key)` for **structure_dict**.
+
+    Each maps a file key (a value in the structure) or a directory name (a key in the
+    structure) to the list of path parts leading to it. Built with the same depth-first,
+    first-match order that a recursive search of the structure would use.
+
+    A structure dict is fingerprinted the first time it is seen after the structure was
+    last set; later lookups with the same dict object cost one dict lookup. Structure
+    dicts are not expected to be edited in place; pass a new dict (or call
+    `state.set_file_structure()`) instead.
+    """
+    global _structure_indexes_generation
+    if _structure_indexes_generation != state.generation:
+        _structure_indexes.clear()
+        _structure_indexes_by_id.clear()
+        _structure_indexes_generation = state.generation
+
+    # the dict itself is kept with its index, so its id can't be reused by another dict
+    cached = _structure_indexes_by_id.get(id(structure_dict))
+    if cached is not None and cached[0] is structure_dict:
+        return cached[1]
+
+    if len(_structure_indexes_by_id) >= _STRUCTURE_INDEXES_MAX_ENTRIES:
+        _structure_indexes_by_id.clear()
+    fingerprint = repr(structure_dict)
+    index = _structure_indexes.get(fingerprint)
+    if index is None:
+        if len(_structure_indexes) >= _STRUCTURE_INDEXES_MAX_ENTRIES:
+            _structure_indexes.clear()
+        index = _build_structure_index(structure_dict)
+        _structure_indexes[fingerprint] = index
+    _structure_indexes_by_id[id(structure_dict)] = (structure_dict, index)
+    return index
+
+
+def _build_structure_index(structure_dict):
+    paths_by_value = {}
+    paths_by_key = {}
+
+    def add_value(value, path):
+        try:
+            paths_by_value.setdefault(value, path)
+        except TypeError:
+            pass  # dicts and lists are containers, not file keys
+
+    def walk(data, path):
+        if isinstance(data, dict):
+            for key, value in data.items():
+                child_path = path + [key]
+                paths_by_key.setdefault(key, child_path)
+                add_value(value, child_path)
+                walk(value, child_path)
+        elif isinstance(data, list):
+            for index, item in enumerate(data):
+                child_path = path + [f"[{index}]"]
+                add_value(item, child_path)
+                walk(item, child_path)
+
+    walk(structure_dict, [])
+    return paths_by_value, paths_by_key
+
+
 def verify_revision_structure():
     """Ensure the current directory is a valid revision folder and set `state.pn` and `state.rev`.
 
@@ -356,9 +402,9 @@ def get_git_hash_of_harnice_src():
 def get_path_to_project(traceable_key):
     """Return the local filesystem path for a project identified by a traceable key.
 
-    Reads `project_locations.csv` (at `fileio.path("project locations")`) and returns
-    the expanded local path for the row whose **traceable_key** matches. Used to
-    resolve paths to systems, libraries, or other projects by part number or URL.
+    Looks **traceable_key** up in the project locations files (see `location_files`) and
+    returns the expanded local path of the first matching row. Used to resolve paths to
+    systems, libraries, or other projects by part number or URL.
 
     **Args:**
 
@@ -369,41 +415,283 @@ def get_path_to_project(traceable_key):
 
     **Raises:**
 
-    - `FileNotFoundError` — If `project_locations.csv` does not exist.
+    - `FileNotFoundError` — If no project locations file exists.
     - `ValueError` — If **traceable_key** is not found or has no local path.
     """
-    from harnice import fileio
+    traceable_key = traceable_key.strip()
+
+    # the harnice root file is only consulted (and offered for creation) when the
+    # environment variable and per-project files don't list the key
+    local = lookup_location("project locations", traceable_key)
+    if local is None:
+        root_file = os.path.join(
+            harnice_root(), _LOCATIONS_FILENAMES["project locations"]
+        )
+        if not _overriding_location_files("project locations") and not os.path.isfile(
+            root_file
+        ):
+            raise FileNotFoundError(
+                "Make a CSV at the root of your Harnice repo called project_locations.csv "
+                "with the following format (no headers):\n\n"
+                "    traceable_key,local_path\n"
+            )
+        raise ValueError(
+            f"Could not find project traceable key '{traceable_key}' in the project_locations.csv file. Add it here: {path('project locations')}"
+        )
+    if not local:
+        raise ValueError(f"No project local path found for '{traceable_key}'")
+    return os.path.expanduser(local)
+
 
-    path = fileio.path("project locations")  # resolves to project_locations.csv
+# Environment variables that put extra locations files (separated by os.pathsep) in
+# front of the per-project and harnice root files, e.g. to point CI at a local mirror.
+LOCATIONS_ENV_VARS = {
+    "library locations": "HARNICE_LIBRARY_LOCATIONS",
+    "project locations": "HARNICE_PROJECT_LOCATIONS",
+}
+_LOCATIONS_FILENAMES = {
+    "library locations": "library_locations.csv",
+    "project locations": "project_locations.csv",
+}
 
-    if not os.path.exists(path):
-        raise FileNotFoundError(
-            "Make a CSV at the root of your Harnice repo called project_locations.csv "
-            "with the following format (no headers):\n\n"
-            "    traceable_key,local_path\n"
+# Parsed locations files. Maps real path -> (mtime_ns, size, {normalized key: local path}).
+_locations_cache = {}
+
+
+def location_files(target_value):
+    """Return the locations files for **target_value**, in the order they are searched.
+
+    1. Files listed in the environment variable (`HARNICE_LIBRARY_LOCATIONS` or
+        `HARNICE_PROJECT_LOCATIONS`), separated by `os.pathsep`.
+    2. The nearest `library_locations.csv` / `project_locations.csv` in the current
+        directory or one of its parents (a per-project file).
+    3. The file at the root of the harnice repo (`fileio.path(target_value)`), which the
+        CLI offers to create if it is missing.
+
+    Files that do not exist are left out, except the harnice root file.
+
+    **Args:**
+
+    - **target_value** — `"library locations"` or `"project locations"`.
+
+    **Returns:** List of file paths (`list[str]`).
+    """
+    files = _overriding_location_files(target_value)
+    files.append(path(target_value))
+    return [f for f in files if os.path.isfile(f)]
+
+
+def _overriding_location_files(target_value):
+    """The locations files searched before the harnice root file (steps 1 and 2 of `location_files`)."""
+    files = []
+    for env_path in os.environ.get(LOCATIONS_ENV_VARS[target_value], "").split(
+        os.pathsep
+    ):
+        if env_path.strip():
+            files.append(os.path.expanduser(env_path.strip()))
+
+    root_file = os.path.join(harnice_root(), _LOCATIONS_FILENAMES[target_value])
+    directory = os.getcwd()
+    while True:
+        candidate = os.path.join(directory, _LOCATIONS_FILENAMES[target_value])
+        if candidate != root_file and os.path.isfile(candidate):
+            files.append(candidate)
+            break
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+
+    return [f for f in files if os.path.isfile(f)]
+
+
+def lookup_location(target_value, key, files=None):
+    """Return the local path recorded for **key** in the locations files, or `None`.
+
+    Files are searched in `location_files` order and the first file that lists **key**
+    wins. Each file is parsed once and re-read only when its modification time or size
+    changes. Library repo URLs match case-insensitively and ignore a trailing `/` or
+    `.git`; project keys match exactly (after stripping whitespace).
+
+    **Args:**
+
+    - **target_value** — `"library locations"` or `"project locations"`.
+    - **key** — Library repo URL or project traceable key.
+    - **files** — Optional. Files to search instead of `location_files(target_value)`.
+
+    **Returns:** The local path as written in the file (`str`, may be `""`), or `None`
+    if no file lists **key**.
+    """
+    normalized_key = _normalize_location_key(target_value, key)
+    if files is None:
+        # the harnice root file is only needed (and only offered for creation) if no
+        # other file lists the key
+        found = _lookup_location_in(
+            target_value, normalized_key, _overriding_location_files(target_value)
         )
+        if found is not None:
+            return found
+        files = [path(target_value)]
+    return _lookup_location_in(target_value, normalized_key, files)
 
-    traceable_key = traceable_key.strip()
 
-    with open(path, newline="", encoding="utf-8") as f:
-        reader = csv.reader(f, delimiter=",")
-        for row in reader:
-            # skip blank or comment lines
-            if not row or len(row) < 2 or row[0].strip().startswith("#"):
-                continue
+def _lookup_location_in(target_value, normalized_key, files):
+    for filepath in files:
+        if not os.path.isfile(filepath):
+            continue
+        entry = _location_entries(target_value, filepath).get(normalized_key)
+        if entry is not None:
+            return entry[1]
+    return None
 
-            key, local = row[0].strip(), row[1].strip()
 
-            if key == traceable_key:
-                if not local:
-                    raise ValueError(
-                        f"No project local path found for '{traceable_key}'"
-                    )
-                return os.path.expanduser(local)
+def location_entries(target_value):
+    """Return every `(key, local path)` pair from the locations files, in search order.
 
-    raise ValueError(
-        f"Could not find project traceable key '{traceable_key}' in the project_locations.csv file. Add it here: {fileio.path('project locations')}"
-    )
+    Keys listed in more than one file are only returned from the first file. Used for
+    reverse lookups such as finding which library repo a directory belongs to.
+
+    **Args:**
+
+    - **target_value** — `"library locations"` or `"project locations"`.
+
+    **Returns:** List of `(key, local_path)` tuples with keys as written in the file.
+    """
+    seen = set()
+    result = []
+    for filepath in location_files(target_value):
+        for normalized_key, (key, local) in _location_entries(
+            target_value, filepath
+        ).items():
+            if normalized_key not in seen:
+                seen.add(normalized_key)
+                result.append((key, local))
+    return result
+
+
+def _normalize_location_key(target_value, key):
+    key = str(key).strip()
+    if target_value == "library locations":
+        key = key.lower().rstrip("/")
+        if key.endswith(".git"):
+            key = key[: -len(".git")]
+    return key
+
+
+def _location_entries(target_value, filepath):
+    """Return `{normalized key: (key, local path)}` for one locations file, re-reading it only if it changed."""
+    stat = os.stat(filepath)
+    real_path = os.path.realpath(filepath)
+    cached = _locations_cache.get(real_path)
+    if cached is None or cached[:2] != (stat.st_mtime_ns, stat.st_size):
+        entries = {}
+        with open(filepath, newline="", encoding="utf-8-sig") as f:
+            for row in csv.reader(f, delimiter=","):
+                # skip blank or comment lines
+                if not row or len(row) < 2 or row[0].strip().startswith("#"):
+                    continue
+                key, local = row[0].strip(), row[1].strip()
+                if key in ["repo_url", "traceable_key"]:
+                    continue  # header row
+                entries.setdefault(
+                    _normalize_location_key(target_value, key), (key, local)
+                )
+        cached = (stat.st_mtime_ns, stat.st_size, entries)
+        _locations_cache[real_path] = cached
+    return cached[2]
+
+
+# Tables held in memory (e.g. an open instances list session) that stand in for their
+# file on disk until they are flushed. Maps absolute file path -> callable returning rows.
+_live_tables = {}
+
+
+def register_live_table(filepath, rows_getter):
+    """Serve `read_tsv` calls for **filepath** from memory instead of from disk.
+
+    Used by `instances_list.open_session()` so that reads see unflushed changes.
+
+    **Args:**
+
+    - **filepath** — Path of the file the in-memory table stands in for.
+    - **rows_getter** — Callable with no arguments returning a list of row dicts.
+    """
+    _live_tables[os.path.abspath(filepath)] = rows_getter
+
+
+def unregister_live_table(filepath):
+    """Stop serving **filepath** from memory. No-op if it was never registered."""
+    _live_tables.pop(os.path.abspath(filepath), None)
+
+
+def _live_table_rows(filepath):
+    """Return rows of a registered in-memory table matching **filepath** (a path or file key), else `None`."""
+    rows_getter = _live_tables.get(os.path.abspath(filepath))
+    if rows_getter is None and not os.path.exists(filepath):
+        try:
+            rows_getter = _live_tables.get(os.path.abspath(path(filepath)))
+        except TypeError:
+            return None
+    if rows_getter is None:
+        return None
+    return rows_getter()
+
+
+# Parsed TSV files, most recently used last. Maps (real path, delimiter) ->
+# (mtime_ns, size, rows). Entries are only trusted while the file's mtime and size match.
+_tsv_cache = OrderedDict()
+_tsv_cache_lock = Lock()
+_TSV_CACHE_MAX_ENTRIES = 64
+# Files modified less than this long ago are parsed but not cached: a rewrite within the
+# filesystem's timestamp granularity could otherwise leave mtime and size unchanged.
+_TSV_CACHE_RACY_WINDOW_NS = 1_000_000_000
+
+
+def invalidate_tsv_cache(filepath=None):
+    """Drop cached `read_tsv` results for **filepath**, or for every file if `None`.
+
+    Harnice functions that write TSVs call this after writing. Scripts that write a TSV
+    themselves and read it back within the same second should call it too.
+
+    **Args:**
+
+    - **filepath** — Path of the file that changed. Optional.
+    """
+    with _tsv_cache_lock:
+        if filepath is None:
+            _tsv_cache.clear()
+            return
+        real_path = os.path.realpath(filepath)
+        for key in [key for key in _tsv_cache if key[0] == real_path]:
+            del _tsv_cache[key]
+
+
+def _read_tsv_cached(filepath, delimiter):
+    stat = os.stat(filepath)
+    key = (os.path.realpath(filepath), delimiter)
+
+    with _tsv_cache_lock:
+        entry = _tsv_cache.get(key)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            _tsv_cache.move_to_end(key)
+            rows = entry[2]
+        else:
+            rows = None
+
+    if rows is None:
+        with open(filepath, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f, delimiter=delimiter))
+        with _tsv_cache_lock:
+            if time.time_ns() - stat.st_mtime_ns > _TSV_CACHE_RACY_WINDOW_NS:
+                _tsv_cache[key] = (stat.st_mtime_ns, stat.st_size, rows)
+                _tsv_cache.move_to_end(key)
+                while len(_tsv_cache) > _TSV_CACHE_MAX_ENTRIES:
+                    _tsv_cache.popitem(last=False)
+            else:
+                _tsv_cache.pop(key, None)
+
+    # callers are free to edit the rows they get back, so hand out copies
+    return [dict(row) for row in rows]
 
 
 def read_tsv(filepath, delimiter="\t"):
@@ -413,27 +701,174 @@ def read_tsv(filepath, delimiter="\t"):
     treated as a file key and `fileio.path(filepath)` is used to resolve the path
     (e.g. `"instances list"` or `"signals list"`).
 
+    If the file is currently held in memory by an open session (see
+    `instances_list.open_session()`), the in-memory rows are returned instead.
+
+    Parsed files are cached by path, modification time and size, so reading an unchanged
+    file again only costs a copy of its rows. See `invalidate_tsv_cache()`.
+
     **Args:**
 
     - **filepath** — Path to a TSV file, or a file key (e.g. `"instances list"`).
     - **delimiter** — Column delimiter; default `"\\t"`.
 
     **Returns:** List of dicts, one per data row, with keys from the header row (`list`).
+    Each call returns new dicts; changing them does not affect the file or the cache.
 
     **Raises:** `FileNotFoundError` if the path does not exist or the resolved path does not exist.
     """
+    if _live_tables:
+        live_rows = _live_table_rows(filepath)
+        if live_rows is not None:
+            profile_utils.count_rows(read=len(live_rows))
+            return live_rows
+
     try:
-        with open(filepath, newline="", encoding="utf-8") as f:
-            return list(csv.DictReader(f, delimiter=delimiter))
+        rows = _read_tsv_cached(filepath, delimiter)
     except FileNotFoundError:
         filepath = path(filepath)
         try:
-            with open(filepath, newline="", encoding="utf-8") as f:
-                return list(csv.DictReader(f, delimiter=delimiter))
+            rows = _read_tsv_cached(filepath, delimiter)
         except FileNotFoundError:
             raise FileNotFoundError(
                 f"Expected csv or tsv file with delimiter '{delimiter}' at path or key {filepath}"
             )
+    profile_utils.count_rows(read=len(rows))
+    return rows
+
+
+_decoded_cells = {}
+_decoded_cells_lock = Lock()
+_DECODED_CELLS_MAX_ENTRIES = 65536
+
+
+def encode_cell(value):
+    """Return the text to store in a TSV cell for **value**.
+
+    Dicts and lists are written as JSON. Tuples, and dicts or lists that hold anything
+    JSON can't represent exactly (tuples, sets, non-string dict keys), are written as
+    Python literals instead, so channel types keep their `(1, 'https://...')` form and
+    read back as tuples. Strings are stored as they are; `None` becomes a blank cell and
+    anything else is stored as `str(value)`.
+
+    **Args:**
+
+    - **value** — The value to store.
+
+    **Returns:** The cell text (`str`). `decode_cell()` turns it back into **value**.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)) and _json_exact(value):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _json_exact(value):
+    if isinstance(value, dict):
+        return all(
+            isinstance(key, str) and _json_exact(item) for key, item in value.items()
+        )
+    if isinstance(value, list):
+        return all(_json_exact(item) for item in value)
+    return value is None or isinstance(value, (str, int, float))
+
+
+def decode_cell(raw):
+    """Return the value stored in a TSV cell by `encode_cell()`.
+
+    Cells starting with `{`, `[` or `(` are decoded as JSON, or failing that as a Python
+    literal, which is how older versions of Harnice wrote them. Anything else, including
+    cells that only look like a structure, is returned unchanged. Decoded values are
+    cached by cell text, so reading the same cell again is cheap; each call still returns
+    its own copy, which the caller may edit.
+
+    **Args:**
+
+    - **raw** — The cell text. Values that aren't strings are returned unchanged.
+
+    **Returns:** The decoded dict, list or tuple, or **raw** itself.
+    """
+    if not isinstance(raw, str) or raw.lstrip()[:1] not in ("{", "[", "("):
+        return raw
+    decoded = _decode_cell_shared(raw)
+    if decoded is raw:
+        return raw
+    # the cached value is shared between callers, so hand out a copy
+    return marshal.loads(marshal.dumps(decoded))
+
+
+def _decode_cell_shared(raw):
+    """`decode_cell()` without the copy: the returned value must not be edited."""
+    decoded = _decoded_cells.get(raw)
+    if decoded is not None:
+        return decoded
+
+    decoded = raw
+    text = raw.strip()
+    if text[:1] in ("{", "["):
+        try:
+            decoded = json.loads(text)
+        except ValueError:
+            pass
+    if decoded is raw and text[:1] in ("{", "[", "("):
+        try:
+            decoded = ast.literal_eval(text)
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            pass
+    if not isinstance(decoded, (dict, list, tuple)):
+        decoded = raw
+
+    with _decoded_cells_lock:
+        if len(_decoded_cells) >= _DECODED_CELLS_MAX_ENTRIES:
+            _decoded_cells.clear()
+        _decoded_cells[raw] = decoded
+    return decoded
+
+
+def migrate_tsv(filepath, delimiter="\t"):
+    """Rewrite the dict and list cells of a TSV written by an older Harnice as JSON.
+
+    Cells holding a Python literal dict or list (e.g. `{'default_refdes': 'MIC'}`) are
+    re-encoded with `encode_cell()`. Every other cell, including channel type tuples, is
+    left exactly as it is. The file is only rewritten if something changed, and is
+    replaced in one step.
+
+    **Args:**
+
+    - **filepath** — Path to the TSV file.
+    - **delimiter** — Column delimiter; default `"\\t"`.
+
+    **Returns:** Number of cells rewritten (`int`).
+    """
+    with open(filepath, newline="", encoding="utf-8") as f:
+        lines = list(csv.reader(f, delimiter=delimiter))
+
+    changed = 0
+    for line in lines[1:]:
+        for position, cell in enumerate(line):
+            decoded = decode_cell(cell)
+            if not isinstance(decoded, (dict, list)):
+                continue
+            encoded = encode_cell(decoded)
+            if encoded != cell:
+                line[position] = encoded
+                changed += 1
+
+    if changed:
+        directory = os.path.dirname(os.path.abspath(filepath))
+        tmp_fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(tmp_fd, "w", newline="", encoding="utf-8") as f:
+                csv.writer(f, delimiter=delimiter).writerows(lines)
+            os.replace(tmp, filepath)
+        except BaseException:
+            silentremove(tmp)
+            raise
+        invalidate_tsv_cache(filepath)
+    return changed
 
 
 def drawnby():
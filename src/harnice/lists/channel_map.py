@@ -70,6 +70,7 @@ def new():
         writer = csv.DictWriter(f, fieldnames=COLUMNS, delimiter="\t")
         writer.writeheader()
         writer.writerows(channel_map)
+    fileio.invalidate_tsv_cache(fileio.path("channel map"))
 
     # initialize mapped channels set TSV (empty, single column)
     with open(
@@ -154,6 +155,7 @@ def map(from_key, to_key=None, multi_ch_junction_key=""):
         writer = csv.DictWriter(f, fieldnames=COLUMNS, delimiter="\t")
         writer.writeheader()
         writer.writerows(updated_channels)
+    fileio.invalidate_tsv_cache(fileio.path("channel map"))
 
 
 def already_mapped_set_append(key):
@@ -300,3 +300,4 @@ def new():
         writer = csv.DictWriter(f, fieldnames=COLUMNS, delimiter="\t")
         writer.writeheader()
         writer.writerows(circuits_list)
+    fileio.invalidate_tsv_cache(fileio.path("circuits list"))
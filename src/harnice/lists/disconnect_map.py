@@ -92,6 +92,7 @@ def new():
         writer = csv.DictWriter(f, fieldnames=COLUMNS, delimiter="\t")
         writer.writeheader()
         writer.writerows(disconnect_map_rows)
+    fileio.invalidate_tsv_cache(fileio.path("disconnect map"))
 
     # initialize mapped disconnect channels set (empty TSV)
     with open(
@@ -159,6 +160,7 @@ def assign(a_side_key, disconnect_key):
         writer = csv.DictWriter(f, fieldnames=COLUMNS, delimiter="\t")
         writer.writeheader()
         writer.writerows(updated_channels)
+    fileio.invalidate_tsv_cache(fileio.path("disconnect map"))
 
 
 def already_assigned_channels_through_disconnects_set_append(key, disconnect_refdes):
@@ -1,11 +1,16 @@
-import ast
 import csv
+import io
 import os
 import inspect
+import sys
+import hashlib
+import marshal
+from contextlib import contextmanager
 from threading import Lock
 import tempfile
 import time
 from harnice import fileio, state
+from harnice.utils import profile_utils
 
 COLUMNS = [
     "net",  # the physical harness (represented by a net in Kicad) that this instance is part of
@@ -83,6 +88,684 @@ COLUMNS = [
 ]
 
 
+DEBUG_CAPTURE_MODES = ["off", "cheap", "full"]
+
+# columns that get a hash index in InstancesListSession so `where()` avoids full scans
+INDEXED_COLUMNS = [
+    "item_type",
+    "net",
+    "circuit_id",
+    "connector_group",
+    "parent_instance",
+]
+
+
+# columns most instances fill in. Every row keeps a fixed slot for each of these; any
+# other column is only stored on rows where it is non-empty
+DENSE_COLUMNS = [
+    "net",
+    "instance_name",
+    "print_name",
+    "mpn",
+    "item_type",
+    "parent_instance",
+    "location_type",
+    "connector_group",
+    "channel_group",
+    "circuit_id",
+    "circuit_port_number",
+    "node_at_end_a",
+    "node_at_end_b",
+    "parent_csys_instance_name",
+    "parent_csys_outputcsys_name",
+    "lib_repo",
+    "debug",
+    "debug_cutoff",
+]
+_DENSE_POSITIONS = {column: i for i, column in enumerate(DENSE_COLUMNS)}
+
+# columns whose values repeat across many rows. Their strings are interned so every row
+# holding the same value shares one copy of it
+INTERNED_COLUMNS = {
+    "net",
+    "mfg",
+    "mpn",
+    "item_type",
+    "location_type",
+    "connector_group",
+    "channel_group",
+    "parent_instance",
+    "parent_csys_instance_name",
+    "parent_csys_outputcsys_name",
+    "cable_group",
+    "segment_group",
+    "lib_repo",
+    "lib_subpath",
+    "lib_desc",
+    "lib_latest_rev",
+    "lib_rev_used_here",
+    "lib_status",
+    "lib_datestarted",
+    "lib_datemodified",
+    "lib_drawnby",
+    "project_editable_lib_modified",
+    "this_channel_from_channel_type",
+    "this_channel_to_channel_type",
+    "signal_of_channel_type",
+    "debug",
+    "debug_cutoff",
+}
+
+
+# columns whose cells hold encoded dicts and lists rather than plain text (see
+# fileio.encode_cell). The sidecar stores them already parsed; see `set_sidecar()`
+LITERAL_COLUMNS = [
+    "attributes_json",
+    "csys_children",
+    "appearance",
+    "note_affected_instances",
+    "lib_build_notes",
+    "lib_tools",
+]
+
+# bumped whenever the sidecar layout changes, so old sidecars are simply rebuilt
+SIDECAR_FORMAT = 2
+
+
+class _Schema:
+    """The columns of one table, shared by all of its rows."""
+
+    __slots__ = ("fieldnames", "known")
+
+    def __init__(self, fieldnames=()):
+        self.fieldnames = []
+        self.known = set()
+        for column in fieldnames:
+            self.add(column)
+
+    def add(self, column):
+        if column not in self.known:
+            self.known.add(column)
+            self.fieldnames.append(column)
+
+
+class InstanceRow:
+    """One row of an `InstancesListSession`, stored compactly and readable like a dict.
+
+    Columns in `DENSE_COLUMNS` live in a fixed-size slot list; every other column is only stored when non-empty. Column names come from a schema shared by the whole table, and values of `INTERNED_COLUMNS` are interned, so a row costs a few hundred bytes instead of a full dict per row.
+
+    Reading works like a `fileio.read_tsv` row: `row.get("mpn")`, `row["mpn"]`, `"mpn" in row`, `keys()`, `items()`, iteration and `dict(row)` all see every column of the table, with `""` for blank cells. Rows are read-only and always show the current contents of the instances list; use `copy()` (or `dict(row)`) for a plain dict to edit or keep.
+    """
+
+    __slots__ = ("_schema", "_dense", "_sparse")
+
+    def __init__(self, schema, dense=None, sparse=None):
+        self._schema = schema
+        self._dense = [None] * len(DENSE_COLUMNS) if dense is None else dense
+        self._sparse = sparse
+
+    def _stored(self, key):
+        """The cell as written to the TSV: the stored string, or `""` if blank."""
+        position = _DENSE_POSITIONS.get(key)
+        if position is not None:
+            value = self._dense[position]
+        elif self._sparse is not None:
+            value = self._sparse.get(key)
+        else:
+            value = None
+        return "" if value is None else value
+
+    def _set(self, key, value):
+        """Store one cell. **value** must already be a string (see `_cell`)."""
+        if value == "":
+            value = None
+        elif key in INTERNED_COLUMNS:
+            value = sys.intern(value)
+        position = _DENSE_POSITIONS.get(key)
+        if position is not None:
+            self._dense[position] = value
+        elif value is not None:
+            if self._sparse is None:
+                self._sparse = {}
+            self._sparse[key] = value
+        elif self._sparse is not None:
+            self._sparse.pop(key, None)
+
+    def get(self, key, default=None):
+        if key in self._schema.known:
+            return self._stored(key)
+        return default
+
+    def __getitem__(self, key):
+        if key in self._schema.known:
+            return self._stored(key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._schema.known
+
+    def __iter__(self):
+        return iter(list(self._schema.fieldnames))
+
+    def __len__(self):
+        return len(self._schema.fieldnames)
+
+    def keys(self):
+        return dict.fromkeys(self._schema.fieldnames).keys()
+
+    def values(self):
+        return list(self.copy().values())
+
+    def items(self):
+        return list(self.copy().items())
+
+    def copy(self):
+        """Return the row as a plain dict, the same as `fileio.read_tsv` would."""
+        row = dict.fromkeys(self._schema.fieldnames, "")
+        for column, value in zip(DENSE_COLUMNS, self._dense):
+            if value is not None and column in row:
+                row[column] = value
+        if self._sparse:
+            row.update(self._sparse)
+        return row
+
+    def __eq__(self, other):
+        if isinstance(other, InstanceRow):
+            return self.copy() == other.copy()
+        if isinstance(other, dict):
+            return self.copy() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"InstanceRow({self.copy()!r})"
+
+
+class InstancesListSession:
+    """In-memory copy of one instances list file.
+
+    Rows are held as `InstanceRow` records in a dict keyed by `instance_name` (insertion ordered, so the file keeps its row order). Mutations only touch memory; `flush()` writes the whole table back atomically once. While a session is open, `fileio.read_tsv("instances list")` is answered from memory, so feature trees and macros see every change without the file being rewritten.
+
+    Each column in `INDEXED_COLUMNS` has a hash index (value -> instance names) that is kept up to date on every mutation, so `where()` only looks at the rows that can match.
+
+    Use it through the module-level functions (`open_session()`, `flush()`, `close_session()` or the `session()` context manager) rather than instantiating it directly.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.schema = _Schema()
+        self.rows = {}
+        self.order = {}  # instance_name -> sequence number, keeps results in file order
+        self._next_order = 0
+        self.indexes = {column: {} for column in INDEXED_COLUMNS}
+        self.call_chains = {}  # call chain -> interned id, see set_debug_capture()
+        self.literals = {}  # raw cell -> parsed value, see literal()
+        self.dirty = False
+        self.call_chains_dirty = False
+        self.load()
+
+    @property
+    def fieldnames(self):
+        return self.schema.fieldnames
+
+    @property
+    def call_chains_path(self):
+        return f"{os.path.splitext(self.path)[0]}_call_chains.tsv"
+
+    @property
+    def sidecar_path(self):
+        return f"{os.path.splitext(self.path)[0]}.marshal"
+
+    def load(self):
+        """(Re)load the table from disk, discarding any unflushed changes.
+
+        With the sidecar on, the rows come from the sidecar when it was written from the TSV as it is now, and the sidecar is rebuilt otherwise.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = None
+
+        self.rows = {}
+        self.order = {}
+        self._next_order = 0
+        self.indexes = {column: {} for column in INDEXED_COLUMNS}
+        self.literals = {}
+
+        tsv_hash = None
+        if data is not None and _sidecar:
+            tsv_hash = hashlib.sha256(data).hexdigest()
+        if tsv_hash is None or not self._load_sidecar(tsv_hash):
+            header = []
+            lines = []
+            if data is not None:
+                reader = csv.reader(
+                    io.StringIO(data.decode("utf-8"), newline=""), delimiter="\t"
+                )
+                header = next(reader, [])
+                lines = reader
+            self.schema = _Schema(header)
+            for line in lines:
+                if not line:
+                    continue  # csv.DictReader skips blank lines too
+                row = InstanceRow(self.schema)
+                for key, value in zip(header, line):
+                    row._set(key, value)
+                self._add_loaded_row(row)
+            if tsv_hash is not None:
+                self._write_sidecar(tsv_hash)
+        self.dirty = False
+        _changed()
+
+        self.call_chains = {}
+        try:
+            with open(self.call_chains_path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f, delimiter="\t"):
+                    self.call_chains[row.get("call_chain")] = row.get("call_chain_id")
+        except FileNotFoundError:
+            pass
+        self.call_chains_dirty = False
+
+    def _add_loaded_row(self, row):
+        instance_name = row._stored("instance_name")
+        if instance_name in self.rows:
+            raise ValueError(
+                f"Instance '{instance_name}' appears more than once in {self.path}"
+            )
+        self._add_row(instance_name, row)
+
+    def literal(self, raw):
+        """Return the dict, list or tuple stored in the cell text **raw** (see `fileio.decode_cell()`), or **raw** unchanged if it doesn't hold one.
+
+        Values the sidecar already holds parsed are not decoded again.
+        """
+        parsed = self.literals.get(raw)
+        if parsed is None:
+            return fileio.decode_cell(raw)
+        # callers may edit what they get back, so never hand out the cached object
+        return marshal.loads(marshal.dumps(parsed))
+
+    def as_rows(self):
+        """Return every row as a fresh dict, shaped exactly like `fileio.read_tsv` would return it."""
+        return [row.copy() for row in self.rows.values()]
+
+    def get(self, instance_name):
+        return self.rows.get(instance_name)
+
+    def where(self, criteria):
+        """Return the stored rows whose columns equal every value in **criteria**, in file order."""
+        criteria = {column: _cell(value) for column, value in criteria.items()}
+
+        candidates = None
+        for column, value in criteria.items():
+            if column in self.indexes:
+                bucket = self.indexes[column].get(value, {})
+                if candidates is None or len(bucket) < len(candidates):
+                    candidates = bucket
+        if candidates is None:
+            names = self.rows
+        else:
+            names = sorted(candidates, key=self.order.__getitem__)
+
+        matches = []
+        for instance_name in names:
+            row = self.rows[instance_name]
+            if all(row._stored(c) == v for c, v in criteria.items()):
+                matches.append(row)
+        return matches
+
+    def shaped(self, row):
+        """Return a copy of a stored row with every column present, like `fileio.read_tsv` rows."""
+        return row.copy()
+
+    def insert(self, instance_name, instance_data):
+        self._intern_debug(instance_data)
+        for key in COLUMNS:
+            self.schema.add(key)
+        self._add_fieldnames(instance_data)
+        row = InstanceRow(self.schema)
+        for key, value in instance_data.items():
+            row._set(key, _cell(value))
+        self._add_row(instance_name, row)
+        self.dirty = True
+        _changed()
+        profile_utils.count_rows(changed=1)
+
+    def update(self, instance_name, instance_data):
+        row = self.rows.get(instance_name)
+        if row is None:
+            raise ValueError(f"Instance '{instance_name}' not found")
+        self._intern_debug(instance_data)
+        self._add_fieldnames(instance_data)
+        for key, value in instance_data.items():
+            value = _cell(value)
+            if key in self.indexes:
+                self._unindex(key, row._stored(key), instance_name)
+                self.indexes[key].setdefault(value, {})[instance_name] = None
+            row._set(key, value)
+        self.dirty = True
+        _changed()
+        profile_utils.count_rows(changed=1)
+
+    def delete(self, instance_name):
+        row = self.rows.pop(instance_name, None)
+        if row is None:
+            return
+        del self.order[instance_name]
+        for column in self.indexes:
+            self._unindex(column, row._stored(column), instance_name)
+        self.dirty = True
+        _changed()
+        profile_utils.count_rows(changed=1)
+
+    def flush(self):
+        """Write the table (and any newly interned call chains) to disk if anything changed since the last load or flush."""
+        if self.call_chains_dirty:
+            _write_rows_atomically(
+                self.call_chains_path,
+                ["call_chain_id", "call_chain"],
+                [
+                    {"call_chain_id": call_chain_id, "call_chain": call_chain}
+                    for call_chain, call_chain_id in self.call_chains.items()
+                ],
+            )
+            self.call_chains_dirty = False
+        if not self.dirty:
+            return
+        _write_lines_atomically(
+            self.path,
+            self.fieldnames,
+            (row.values() for row in self.rows.values()),
+        )
+        self.dirty = False
+        if _sidecar:
+            with open(self.path, "rb") as f:
+                self._write_sidecar(hashlib.sha256(f.read()).hexdigest())
+
+    def intern_call_chain(self, call_chain):
+        """Return the short id standing in for **call_chain**, assigning a new one if needed."""
+        call_chain_id = self.call_chains.get(call_chain)
+        if call_chain_id is None:
+            call_chain_id = f"cc{len(self.call_chains) + 1}"
+            self.call_chains[call_chain] = call_chain_id
+            self.call_chains_dirty = True
+        return call_chain_id
+
+    def _write_sidecar(self, tsv_hash):
+        """Save the rows as they are stored in memory, and the parsed values of their `LITERAL_COLUMNS`, as the sidecar of the TSV whose contents hash to **tsv_hash**."""
+        literals = {}
+        for column in LITERAL_COLUMNS:
+            if column not in self.schema.known:
+                continue
+            for row in self.rows.values():
+                raw = row._stored(column)
+                if raw in literals or raw.strip()[:1] not in ("[", "{", "("):
+                    continue
+                if raw in self.literals:
+                    literals[raw] = self.literals[raw]
+                    continue
+                parsed = fileio.decode_cell(raw)
+                if parsed is not raw:
+                    literals[raw] = parsed
+        self.literals = literals
+
+        sidecar = {
+            "format": SIDECAR_FORMAT,
+            "python": list(sys.version_info[:2]),
+            "dense_columns": DENSE_COLUMNS,
+            "tsv_sha256": tsv_hash,
+            "fieldnames": self.schema.fieldnames,
+            "rows": [(row._dense, row._sparse) for row in self.rows.values()],
+            "literals": literals,
+        }
+        # the sidecar is only a cache, so failing to write it must not fail the render
+        try:
+            tmp_fd, tmp = tempfile.mkstemp(
+                dir=os.path.dirname(self.sidecar_path), suffix=".tmp"
+            )
+        except OSError:
+            return
+        try:
+            with os.fdopen(tmp_fd, "wb") as f:
+                f.write(marshal.dumps(sidecar))
+            os.replace(tmp, self.sidecar_path)
+        except (OSError, ValueError):
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    def _load_sidecar(self, tsv_hash):
+        """Load the rows from the sidecar if it was written for the TSV whose contents hash to **tsv_hash**.
+
+        ## Returns
+        True if the rows were loaded, False if the sidecar is missing, unreadable or out of date.
+        """
+        try:
+            with open(self.sidecar_path, "rb") as f:
+                # marshal.load() reads a file in tiny pieces; loads() is much faster
+                sidecar = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+        if (
+            not isinstance(sidecar, dict)
+            or sidecar.get("format") != SIDECAR_FORMAT
+            or sidecar.get("python") != list(sys.version_info[:2])
+            or sidecar.get("dense_columns") != DENSE_COLUMNS
+            or sidecar.get("tsv_sha256") != tsv_hash
+        ):
+            return False
+
+        self.schema = _Schema(sidecar["fieldnames"])
+        for dense, sparse in sidecar["rows"]:
+            self._add_loaded_row(InstanceRow(self.schema, dense, sparse))
+        self.literals = sidecar["literals"]
+        return True
+
+    def _add_fieldnames(self, instance_data):
+        for key in instance_data:
+            self.schema.add(key)
+
+    def _intern_debug(self, instance_data):
+        if _intern_call_chains and instance_data.get("debug"):
+            instance_data["debug"] = self.intern_call_chain(instance_data["debug"])
+
+    def _add_row(self, instance_name, row):
+        self.rows[instance_name] = row
+        self.order[instance_name] = self._next_order
+        self._next_order += 1
+        for column, index in self.indexes.items():
+            index.setdefault(row._stored(column), {})[instance_name] = None
+
+    def _unindex(self, column, value, instance_name):
+        bucket = self.indexes[column].get(value)
+        if bucket is not None:
+            bucket.pop(instance_name, None)
+            if not bucket:
+                del self.indexes[column][value]
+
+
+def _cell(value):
+    """Return `value` the way it is stored in the TSV: dicts and lists as JSON, see `fileio.encode_cell()`."""
+    return fileio.encode_cell(value)
+
+
+def _write_rows_atomically(path, fieldnames, rows):
+    _write_lines_atomically(
+        path, fieldnames, ([row.get(key, "") for key in fieldnames] for row in rows)
+    )
+
+
+def _write_lines_atomically(path, fieldnames, lines):
+    """Write a header and lists of cells (in **fieldnames** order) to **path**, replacing it in one step."""
+    tmp_fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(tmp_fd, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, delimiter="\t")
+            writer.writerow(fieldnames)
+            writer.writerows(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+        for attempt in range(10):
+            try:
+                os.replace(tmp, path)
+                break
+            except PermissionError:
+                if attempt == 9:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+    except:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    fileio.invalidate_tsv_cache(path)
+
+
+_instances_lock = Lock()
+_session = None
+_debug_capture = "full"
+_intern_call_chains = False
+_sidecar = False
+# bumped whenever a table held in memory is loaded or changed, see generation()
+_generation = 0
+
+
+def _changed():
+    global _generation
+    _generation += 1
+
+
+def generation():
+    """Return a number that changes every time the instances list held in memory is loaded or changed.
+
+    Lets code that derives something from the instances list (e.g. `query_utils.database()`) tell whether it is still current while a session is open, when the file itself is not rewritten.
+    """
+    return _generation
+
+
+def open_session():
+    """Start holding the instances list in memory until `flush()` or `close_session()` is called.
+
+    Every `new_instance`, `modify` and `remove_instance` call made while the session is open edits the in-memory table instead of re-reading and rewriting the TSV, and `fileio.read_tsv("instances list")` reads from the same table. Product `render()` functions open a session around the feature tree, so existing feature trees and macros pick this up without changes.
+
+    ## Returns
+    The open `InstancesListSession`. Calling this while a session is already open returns the existing one.
+    """
+    global _session
+    with _instances_lock:
+        if _session is None:
+            _session = InstancesListSession(fileio.path("instances list"))
+            fileio.register_live_table(_session.path, _session.as_rows)
+        return _session
+
+
+def flush():
+    """Write pending in-memory changes to the instances list file. No-op when no session is open."""
+    with _instances_lock:
+        if _session is not None:
+            _session.flush()
+
+
+def close_session():
+    """Flush and close the open session. Later calls go straight to the file again."""
+    global _session
+    with _instances_lock:
+        if _session is None:
+            return
+        try:
+            _session.flush()
+        finally:
+            fileio.unregister_live_table(_session.path)
+            _session = None
+
+
+def reload():
+    """Re-read the instances list file into the open session, dropping unflushed changes. No-op when no session is open."""
+    with _instances_lock:
+        if _session is not None:
+            _session.load()
+
+
+@contextmanager
+def session():
+    """Context manager around `open_session()` / `close_session()`. Changes are flushed on exit, even if the block raises."""
+    open_session()
+    try:
+        yield _session
+    finally:
+        close_session()
+
+
+def _session_for(path):
+    """The open session if it holds the instances list at **path**, else `None`.
+
+    The session belongs to the list it was opened on. If `fileio.path("instances list")` points somewhere else later on (another product, another rev), calls go to that file directly instead of reading or writing the session's list.
+    """
+    if _session is None:
+        return None
+    if os.path.abspath(_session.path) != os.path.abspath(path):
+        return None
+    return _session
+
+
+def _apply(operation, *args):
+    """Run one session operation against the open session, or against a one-shot session that is written back immediately."""
+    with _instances_lock, profile_utils.stage("instances_list", operation.__name__):
+        path = fileio.path("instances list")
+        live = _session_for(path)
+        if live is not None:
+            return operation(live, *args)
+        table = InstancesListSession(path)
+        result = operation(table, *args)
+        table.flush()
+        return result
+
+
+def _read(operation, *args):
+    """Run a read-only operation against the open session, or against a freshly loaded table."""
+    with _instances_lock:
+        path = fileio.path("instances list")
+        live = _session_for(path)
+        if live is not None:
+            return operation(live, *args)
+        return operation(InstancesListSession(path), *args)
+
+
+def where(**criteria):
+    """Return every instance whose columns equal all of the given values.
+
+    ## Usage
+    `where(item_type="conductor", net="/MIC_CABLE_1")`
+
+    ## Args
+    - `**criteria`: Column names mapped to the value that column must hold. Values are compared the way they are stored in the TSV, so `circuit_id=5` and `circuit_id="5"` match the same rows.
+
+    ## Returns
+    List of instance row dicts in instances list order (copies; editing them does not change the list). Criteria on `INDEXED_COLUMNS` are answered from a hash index, so the cost scales with the number of matches rather than the size of the list.
+    """
+    return _read(lambda table: [table.shaped(row) for row in table.where(criteria)])
+
+
+def rows(**criteria):
+    """Return instances without copying them, as read-only dict-like `InstanceRow` views.
+
+    ## Usage
+    `for instance in instances_list.rows(item_type="connector"): print(instance.get("mpn"))`
+
+    ## Args
+    - `**criteria`: Optional. Same as `where()`; with no criteria every instance is returned.
+
+    ## Returns
+    List of `InstanceRow` in instances list order. They support `get`, `[]`, `in`, `keys()`, `items()` and iteration like the dicts `where()` returns, but share storage with the instances list, so holding on to many of them costs almost nothing. They show later changes to the list; use `row.copy()` for a plain dict snapshot. Without an open session the views come from a freshly loaded copy of the file.
+    """
+    return _read(lambda table: table.where(criteria))
+
+
 def new_instance(instance_name, instance_data, ignore_duplicates=False):
     """Add a new instance to the instances list.
 
@@ -110,11 +793,7 @@ def new_instance(instance_name, instance_data, ignore_duplicates=False):
             f"Inconsistent instance_name: argument='{instance_name}' vs data['instance_name']='{instance_data['instance_name']}'"
         )
 
-    try:
-        existing_rows = fileio.read_tsv("instances list")
-    except FileNotFoundError:
-        existing_rows = []
-    if any(row.get("instance_name") == instance_name for row in existing_rows):
+    if _read(InstancesListSession.get, instance_name) is not None:
         if not ignore_duplicates:
             raise ValueError(
                 f"An instance with the name '{instance_name}' already exists"
@@ -122,44 +801,22 @@ def new_instance(instance_name, instance_data, ignore_duplicates=False):
         else:
             return -1
 
-    if instance_data.get("net") is None:
-        try:
-            instance_data["net"] = state.net
-        except AttributeError:  # no net has been set
-            pass
-
-    # Add debug call chain
-    instance_data["debug"] = _get_call_chain_str()
-    instance_data["debug_cutoff"] = " "
+    # Add default net and debug call chain
+    _prepare_new(instance_data, _get_call_chain_str())
 
     # add argumet to data added
     instance_data["instance_name"] = instance_name
 
-    path = fileio.path("instances list")
-    try:
-        with open(path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f, delimiter="\t")
-            fieldnames = list(reader.fieldnames or [])
-            rows = list(reader)
-    except FileNotFoundError:
-        fieldnames = []
-        rows = []
-    # Ensure we have COLUMNS (for new file) and allow unknown headers from instance_data
-    for key in COLUMNS:
-        if key not in fieldnames:
-            fieldnames.append(key)
-    for key in instance_data:
-        if key not in fieldnames:
-            fieldnames.append(key)
-    rows.append({key: instance_data.get(key, "") for key in fieldnames})
-
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter="\t")
-        writer.writeheader()
-        writer.writerows(rows)
-
+    def insert(table, instance_name, instance_data):
+        if table.get(instance_name) is not None:
+            if not ignore_duplicates:
+                raise ValueError(
+                    f"An instance with the name '{instance_name}' already exists"
+                )
+            return -1
+        table.insert(instance_name, instance_data)
 
-_instances_lock = Lock()
+    return _apply(insert, instance_name, instance_data)
 
 
 def modify(instance_name, instance_data):
@@ -172,58 +829,178 @@ def modify(instance_name, instance_data):
     ## Raises
     ValueError if no instance with `instance_name` exists.
     """
-    with _instances_lock:
-        path = fileio.path("instances list")
+    # --- Add debug info before updating ---
+    instance_data["debug"] = _get_call_chain_str()
+    instance_data["debug_cutoff"] = " "
+
+    _apply(InstancesListSession.update, instance_name, instance_data)
 
-        # --- Read once ---
-        with open(path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f, delimiter="\t")
-            rows = list(reader)
-            fieldnames = list(reader.fieldnames or [])
 
-        # --- Add debug info before updating ---
-        instance_data["debug"] = _get_call_chain_str()
+def bulk_new(rows, ignore_duplicates=False):
+    """Add many new instances at once, writing the instances list a single time.
+
+    ## Usage
+    `bulk_new([{"instance_name": "X1.B.node", "item_type": "node"}, ...])`
+
+    ## Args
+    - `rows`: Iterable of instance data dicts (same as the `instance_data` argument of `new_instance`). Each must contain a non-blank `instance_name`.
+    - `ignore_duplicates`: If True, rows whose `instance_name` already exists, either in the list or earlier in `rows`, are skipped. If False (default), any duplicate raises before anything is added.
+
+    ## Returns
+    The number of instances added.
+    """
+    debug = _get_call_chain_str()
+    batch = []
+    for instance_data in rows:
+        if instance_data.get("instance_name") in ["", None]:
+            raise ValueError(
+                "Every row passed to bulk_new needs an 'instance_name' to idenitify a unique instance"
+            )
+        batch.append(_prepare_new(instance_data, debug))
+
+    def insert_all(table):
+        added = {}
+        for instance_data in batch:
+            instance_name = instance_data["instance_name"]
+            if instance_name in added or table.get(instance_name) is not None:
+                if ignore_duplicates:
+                    continue
+                raise ValueError(
+                    f"An instance with the name '{instance_name}' already exists"
+                )
+            added[instance_name] = instance_data
+        for instance_name, instance_data in added.items():
+            table.insert(instance_name, instance_data)
+        return len(added)
+
+    return _apply(insert_all)
+
+
+def bulk_modify(changes, on_missing="raise"):
+    """Update many instances at once, writing the instances list a single time.
+
+    ## Usage
+    `bulk_modify({"X1.B.conn": {"mpn": "D38999_26ZB98PN"}, "X2.A.conn": {"mpn": "D38999_26ZA98PN"}})`
+
+    ## Args
+    - `changes`: Dict of `instance_name` to a dict of column names to new values (same as the `instance_data` argument of `modify`).
+    - `on_missing`: What to do with names that are not in the list. `"raise"` (default) raises before anything is changed, `"skip"` ignores them and `"create"` adds them as new instances.
+
+    ## Raises
+    ValueError if `on_missing` is `"raise"` and any instance is not found, or if `on_missing` is not one of the options above.
+    """
+    if on_missing not in ["raise", "skip", "create"]:
+        raise ValueError(
+            f"on_missing must be 'raise', 'skip' or 'create', not '{on_missing}'"
+        )
+    debug = _get_call_chain_str()
+    for instance_data in changes.values():
+        instance_data["debug"] = debug
         instance_data["debug_cutoff"] = " "
 
-        # Ensure any new keys (including unknown headers) are part of the header
-        for key in instance_data:
-            if key not in fieldnames:
-                fieldnames.append(key)
-
-        # --- Modify in-place ---
-        found = False
-        for row in rows:
-            if row.get("instance_name") == instance_name:
-                row.update(instance_data)
-                found = True
-                break
-        if not found:
-            raise ValueError(f"Instance '{instance_name}' not found")
+    def update_all(table):
+        missing = [name for name in changes if table.get(name) is None]
+        if missing and on_missing == "raise":
+            raise ValueError(f"Instances not found: {', '.join(map(str, missing))}")
+        for instance_name, instance_data in changes.items():
+            if table.get(instance_name) is not None:
+                table.update(instance_name, instance_data)
+            elif on_missing == "create" and instance_name not in ["", None]:
+                instance_data["instance_name"] = instance_name
+                table.insert(instance_name, _prepare_new(instance_data, debug))
 
-        # --- Write atomically ---
-        tmp_fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
-        try:
-            with os.fdopen(tmp_fd, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter="\t")
-                writer.writeheader()
-                writer.writerows(rows)
-                f.flush()
-                os.fsync(f.fileno())
-
-            for attempt in range(10):
-                try:
-                    os.replace(tmp, path)
-                    break
-                except PermissionError:
-                    if attempt == 9:
-                        raise
-                    time.sleep(0.05 * (attempt + 1))
-        except:
+    _apply(update_all)
+
+
+# aggregates rollup() can apply to the values of an instance's children; both start from 0
+ROLLUP_AGGREGATES = {"sum": lambda a, b: a + b, "max": max}
+
+
+def rollup(
+    child_col="parent_instance",
+    value_col="length",
+    agg="sum",
+    filter=None,
+    target_col=None,
+):
+    """Set a column of every parent instance to the sum or max of its children's values, writing the instances list a single time.
+
+    ## Usage
+    `rollup("parent_instance", "length", "sum", filter={"item_type": "conductor"})`
+
+    ## Args
+    - `child_col`: Column of the children that holds the `instance_name` of their parent. Defaults to `"parent_instance"`.
+    - `value_col`: Numeric column of the children to aggregate. Children with a blank value are left out. Defaults to `"length"`.
+    - `agg`: `"sum"` (default) or `"max"`. Both start from 0, so `"max"` of only negative values is 0.
+    - `filter`: Which instances get a value: a dict of column names to values, matched like `where()`, or a function that takes an instance row and returns True for the ones to set. Matching instances without any children with a value are set to 0. By default every instance that some other instance names in `child_col` is set.
+    - `target_col`: Column of the parents to write the result to. Defaults to `value_col`.
+
+    ## Returns
+    Dict of `instance_name` to the value written.
+
+    ## Raises
+    ValueError if `agg` is not one of `ROLLUP_AGGREGATES`, or if a child's value is not a number.
+    """
+    if agg not in ROLLUP_AGGREGATES:
+        raise ValueError(
+            f"agg must be one of {', '.join(ROLLUP_AGGREGATES)}, not '{agg}'"
+        )
+    aggregate = ROLLUP_AGGREGATES[agg]
+    if target_col is None:
+        target_col = value_col
+    debug = _get_call_chain_str()
+
+    def roll_up(table):
+        # parent instance_name -> values of its children, in one pass over the list
+        values = {}
+        for row in table.rows.values():
+            parent = row._stored(child_col)
+            value = row._stored(value_col).strip()
+            if parent == "" or value == "":
+                continue
             try:
-                os.unlink(tmp)
-            except OSError:
-                pass
-            raise
+                values.setdefault(parent, []).append(float(value))
+            except ValueError:
+                raise ValueError(
+                    f"{value_col} of {row._stored('instance_name')} is not a number: '{value}'"
+                )
+
+        if filter is None:
+            parents = [name for name in values if table.get(name) is not None]
+        elif callable(filter):
+            parents = [name for name, row in table.rows.items() if filter(row)]
+        else:
+            parents = [row._stored("instance_name") for row in table.where(filter)]
+
+        results = {}
+        for instance_name in parents:
+            result = 0
+            for value in values.get(instance_name, []):
+                result = aggregate(result, value)
+            results[instance_name] = result
+            table.update(
+                instance_name,
+                {
+                    target_col: results[instance_name],
+                    "debug": debug,
+                    "debug_cutoff": " ",
+                },
+            )
+        return results
+
+    return _apply(roll_up)
+
+
+def _prepare_new(instance_data, debug):
+    """Fill in the columns every new instance gets (default net and debug info)."""
+    if instance_data.get("net") is None:
+        try:
+            instance_data["net"] = state.net
+        except AttributeError:  # no net has been set
+            pass
+    instance_data["debug"] = debug
+    instance_data["debug_cutoff"] = " "
+    return instance_data
 
 
 def remove_instance(instance_to_delete):
@@ -232,63 +1009,96 @@ def remove_instance(instance_to_delete):
     ## Args
     - `instance_to_delete`: Instance row dict (or any dict) whose `instance_name` key identifies the instance to remove. Matching is done by `instance_name` only.
     """
-    path = fileio.path("instances list")
-    with open(path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f, delimiter="\t")
-        fieldnames = list(reader.fieldnames or [])
-        instances_list = list(reader)
-    new_list = []
-    for instance in instances_list:
-        if instance.get("instance_name") == instance_to_delete.get("instance_name"):
-            continue
-        new_list.append(instance)
-
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter="\t")
-        writer.writeheader()
-        writer.writerows(new_list)
+    _apply(InstancesListSession.delete, instance_to_delete.get("instance_name"))
 
 
 def new():
-    """Create a new empty instances list file with only the standard header (COLUMNS). Overwrites existing file if present."""
-    with open(fileio.path("instances list"), "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=COLUMNS, delimiter="\t")
-        writer.writeheader()
-        writer.writerows([])
+    """Create a new empty instances list file with only the standard header (COLUMNS). Overwrites existing file if present. An open session is reset to the empty list."""
+    with profile_utils.stage("instances_list", "new"):
+        path = fileio.path("instances list")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS, delimiter="\t")
+            writer.writeheader()
+            writer.writerows([])
+        fileio.invalidate_tsv_cache(path)
+        fileio.silentremove(f"{os.path.splitext(path)[0]}_call_chains.tsv")
+        with _instances_lock:
+            live = _session_for(path)
+            if live is not None:
+                live.load()
 
 
-def assign_bom_line_numbers():
+# how assign_bom_line_numbers() orders the BOM lines
+BOM_ORDERS = ["first", "sorted"]
+
+
+def assign_bom_line_numbers(group_by=("mpn",), order="first"):
     """Assign sequential BOM line numbers to instances that have `bom_line_number` set to "True".
 
-    Groups by MPN and assigns the same line number to all instances sharing an MPN. Requires every such instance to have a non-empty `mpn`. Line numbers are assigned in order of first occurrence of each MPN.
+    Groups by MPN and assigns the same line number to all instances sharing an MPN. Requires every such instance to have a non-empty `mpn`. Line numbers are assigned in order of first occurrence of each MPN. The list is read once and written once.
+
+    ## Usage
+    `assign_bom_line_numbers(group_by=("mpn", "lib_subpath"), order="sorted")`
+
+    ## Args
+    - `group_by`: Columns that together make one BOM line. Defaults to `("mpn",)`. Every instance whose values in these columns match a line gets that line's number, whether or not it was marked itself.
+    - `order`: `"first"` (default) numbers the lines in order of the first instance of each, `"sorted"` by their `group_by` values, so the numbers don't depend on the order instances were added. A function can also be passed; it gets the tuple of `group_by` values of a line and returns its sort key.
 
     ## Raises
-    ValueError if any instance marked for BOM has an empty `mpn`.
+    ValueError if any instance marked for BOM has an empty `mpn`, or if `order` is not one of `BOM_ORDERS` or a function.
     """
-    bom = []
-    for instance in fileio.read_tsv("instances list"):
-        if instance.get("bom_line_number") == "True":
-            if instance.get("mpn") == "":
+    if isinstance(group_by, str):
+        group_by = (group_by,)
+    group_by = tuple(group_by)
+    if not callable(order) and order not in BOM_ORDERS:
+        raise ValueError(
+            f"order must be one of {', '.join(BOM_ORDERS)} or a function, not '{order}'"
+        )
+    debug = _get_call_chain_str()
+
+    def assign(table):
+        # BOM line key -> None, in order of first occurrence
+        lines = {}
+        for row in table.rows.values():
+            if row._stored("bom_line_number") != "True":
+                continue
+            if row._stored("mpn") == "":
                 raise ValueError(
-                    f"You've chosen to add {instance.get('instance_name')} to the bom, but haven't specified an MPN"
+                    f"You've chosen to add {row._stored('instance_name')} to the bom, but haven't specified an MPN"
                 )
-            if instance.get("mpn") not in bom:
-                bom.append(instance.get("mpn"))
-
-    bom_line_number = 1
-    for bom_item in bom:
-        for instance in fileio.read_tsv("instances list"):
-            if instance.get("mpn") == bom_item:
-                modify(
-                    instance.get("instance_name"), {"bom_line_number": bom_line_number}
-                )
-        bom_line_number += 1
+            lines[tuple(row._stored(column) for column in group_by)] = None
+
+        if order == "sorted":
+            lines = sorted(lines)
+        elif callable(order):
+            lines = sorted(lines, key=order)
+        line_numbers = {key: number for number, key in enumerate(lines, 1)}
+
+        changes = {}
+        for instance_name, row in table.rows.items():
+            line_number = line_numbers.get(
+                tuple(row._stored(column) for column in group_by)
+            )
+            if line_number is not None:
+                changes[instance_name] = line_number
+        for instance_name, line_number in changes.items():
+            table.update(
+                instance_name,
+                {
+                    "bom_line_number": line_number,
+                    "debug": debug,
+                    "debug_cutoff": " ",
+                },
+            )
+        return line_numbers
+
+    _apply(assign)
 
 
 def attribute_of(target_instance, attribute):
     """Return the value of one column for a single instance.
 
-        String values that look like Python literals (list or dict, e.g. starting with `[` or `{`) are parsed with `ast.literal_eval` and the parsed value is returned; otherwise the raw string is returned.
+        Cells holding a dict or list (starting with `[` or `{`) are decoded with `fileio.decode_cell()`, which reads both the JSON written by `new_instance`/`modify` and the Python literals of older instances lists; otherwise the raw string is returned.
 
     ## Args
     - `target_instance`: The `instance_name` of the instance to look up.
@@ -297,17 +1107,15 @@ def attribute_of(target_instance, attribute):
     ## Returns
     The value of that column for the matching instance, or None if not found or attribute missing. List/dict-like strings are returned as list/dict.
     """
-    for instance in fileio.read_tsv("instances list"):
-        if instance.get("instance_name") == target_instance:
-            raw = instance.get(attribute)
-            if isinstance(raw, str) and raw.strip():
-                s = raw.strip()
-                if s.startswith("[") or s.startswith("{"):
-                    try:
-                        return ast.literal_eval(raw)
-                    except (ValueError, SyntaxError):
-                        pass
-            return raw
+
+    def lookup(table):
+        row = table.get(target_instance)
+        raw = None if row is None else row.get(attribute)
+        if isinstance(raw, str) and raw.lstrip()[:1] in ("[", "{"):
+            return table.literal(raw)
+        return raw
+
+    return _read(lookup)
 
 
 def instance_in_connector_group_with_item_type(connector_group, item_type):
@@ -327,36 +1135,100 @@ def instance_in_connector_group_with_item_type(connector_group, item_type):
         raise ValueError("Connector group is blank")
     if item_type in ["", None]:
         raise ValueError("Suffix is blank")
-    match = 0
-    output = None
-    for instance in fileio.read_tsv("instances list"):
-        if instance.get("connector_group") == connector_group:
-            if instance.get("item_type") == item_type:
-                match = match + 1
-                output = instance
-    if match == 0:
+    matches = where(connector_group=connector_group, item_type=item_type)
+    if len(matches) == 0:
         return 0
-    if match > 1:
+    if len(matches) > 1:
         raise ValueError(
             f"Multiple instances found in connector_group '{connector_group}' with item type '{item_type}'."
         )
-    return output
+    return matches[0]
+
+
+def set_debug_capture(mode, intern_call_chains=False):
+    """Choose what `new_instance`, `modify` and the bulk functions record in the `debug` column.
+
+    The defaults come from the `HARNICE_DEBUG_CAPTURE` and `HARNICE_INTERN_CALL_CHAINS` environment variables, so a render can be switched without editing the feature tree.
+
+    ## Args
+    - `mode`: One of `DEBUG_CAPTURE_MODES`:
+        - `"off"`: leave the column blank.
+        - `"cheap"`: `filename:line -> filename:line ...`, collected by walking `sys._getframe`. Much faster than `"full"`; set `HARNICE_DEBUG_CAPTURE=cheap` to use it for a whole render.
+        - `"full"` (default): `filename:line in function() -> ...`, collected with `inspect.stack()`.
+    - `intern_call_chains`: If True, the column holds a short ID such as `cc12` and each distinct call chain is written once to `*-instances_list_call_chains.tsv` next to the instances list. Look an ID up with `call_chain_of()`.
+
+    ## Raises
+    ValueError if `mode` is not one of `DEBUG_CAPTURE_MODES`.
+    """
+    global _debug_capture, _intern_call_chains
+    if mode not in DEBUG_CAPTURE_MODES:
+        raise ValueError(
+            f"Debug capture mode must be one of {DEBUG_CAPTURE_MODES}, not '{mode}'"
+        )
+    _debug_capture = mode
+    _intern_call_chains = bool(intern_call_chains)
+
+
+def set_sidecar(enabled):
+    """Turn the binary sidecar of the instances list on or off.
+
+    The sidecar is `*-instances_list.marshal` next to `*-instances_list.tsv`. It holds the rows already split into cells, plus the parsed value of every dict/list cell in `LITERAL_COLUMNS`, so loading the instances list skips the TSV parser and `attribute_of()` skips decoding them. It records the hash of the TSV it was written from and is only used while the TSV still has that hash; otherwise it is rebuilt on the next load. It is rewritten every time the instances list is flushed.
+
+    The TSV stays the only file that matters: the sidecar can be deleted at any time and should be left out of git. The default comes from the `HARNICE_INSTANCES_SIDECAR` environment variable.
+
+    ## Args
+    - `enabled`: True to read and maintain the sidecar, False to ignore it.
+    """
+    global _sidecar
+    _sidecar = bool(enabled)
+
+
+def call_chain_of(debug):
+    """Return the full call chain for a `debug` column value.
+
+    ## Args
+    - `debug`: Value of an instance's `debug` column.
+
+    ## Returns
+    The call chain the interned ID points to, or `debug` unchanged if it is not an interned ID.
+    """
+
+    def lookup(table):
+        for call_chain, call_chain_id in table.call_chains.items():
+            if call_chain_id == debug:
+                return call_chain
+        return debug
+
+    return _read(lookup)
 
 
 def _get_call_chain_str():
-    """Return the current call chain as a single readable string.
+    """Return the current call chain as a single readable string, per `set_debug_capture()`.
 
     ## Returns
-    A string of the form `filename:line in function() -> filename:line in function() ...` for the current stack (excluding this function).
+    A string of the form `filename:line -> filename:line ...` (`"cheap"`) or `filename:line in function() -> filename:line in function() ...` (`"full"`) for the current stack (excluding this function), or `""` when capture is `"off"`.
     """
-    stack = inspect.stack()
+    if _debug_capture == "off":
+        return ""
+
+    if _debug_capture == "full":
+        stack = inspect.stack()
+        chain_parts = []
+        for frame_info in reversed(stack[1:]):  # skip this function itself
+            filename = os.path.basename(frame_info.filename)
+            lineno = frame_info.lineno
+            function = frame_info.function
+            chain_parts.append(f"{filename}:{lineno} in {function}()")
+        return " -> ".join(chain_parts)
+
     chain_parts = []
-    for frame_info in reversed(stack[1:]):  # skip this function itself
-        filename = os.path.basename(frame_info.filename)
-        lineno = frame_info.lineno
-        function = frame_info.function
-        chain_parts.append(f"{filename}:{lineno} in {function}()")
-    return " -> ".join(chain_parts)
+    frame = sys._getframe(1)  # skip this function itself
+    while frame is not None:
+        chain_parts.append(
+            f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno}"
+        )
+        frame = frame.f_back
+    return " -> ".join(reversed(chain_parts))
 
 
 def list_of_uniques(attribute):
@@ -368,9 +1240,21 @@ def list_of_uniques(attribute):
     ## Returns
     List of unique values; blanks and None are omitted. Order follows first occurrence in the instances list.
     """
-    output = []
-    for instance in fileio.read_tsv("instances list"):
-        if instance.get(attribute) not in output:
-            if instance.get(attribute) not in [None, ""]:
-                output.append(instance.get(attribute))
-    return output
+
+    def uniques(table):
+        output = {}
+        for instance in table.rows.values():
+            value = instance.get(attribute)
+            if value not in [None, ""]:
+                output[value] = None
+        return list(output)
+
+    return _read(uniques)
+
+
+set_debug_capture(
+    os.environ.get("HARNICE_DEBUG_CAPTURE", "full"),
+    intern_call_chains=os.environ.get("HARNICE_INTERN_CALL_CHAINS", "")
+    not in ["", "0"],
+)
+set_sidecar(os.environ.get("HARNICE_INSTANCES_SIDECAR", "") not in ["", "0"])
@@ -26,6 +26,7 @@ def new():
         writer = csv.DictWriter(f, fieldnames=COLUMNS, delimiter="\t")
         writer.writeheader()
         writer.writerows([])
+    fileio.invalidate_tsv_cache(fileio.path("library history"))
 
 
 def append(instance_name, instance_data):
@@ -38,3 +39,28 @@ def append(instance_name, instance_data):
     with open(fileio.path("library history"), "a", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=COLUMNS, delimiter="\t")
         writer.writerow({key: instance_data.get(key, "") for key in COLUMNS})
+    fileio.invalidate_tsv_cache(fileio.path("library history"))
+
+
+def bulk_append(entries):
+    """Append several imports to the library history with one read and one write.
+
+    ## Args
+    - `entries`: List of `(instance_name, instance_data)` pairs, as passed to `append`, in the order they should be recorded.
+
+    ## Raises
+    ValueError if an instance_name is already in the library history or appears more than once in `entries`. Nothing is written in that case.
+    """
+    existing = {row.get("instance_name") for row in fileio.read_tsv("library history")}
+    for instance_name, instance_data in entries:
+        instance_data["instance_name"] = instance_name
+        if instance_name in existing:
+            raise ValueError(
+                f"You're trying to import something with instance_name '{instance_name}' but it has already been imported."
+            )
+        existing.add(instance_name)
+    with open(fileio.path("library history"), "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS, delimiter="\t")
+        for instance_name, instance_data in entries:
+            writer.writerow({key: instance_data.get(key, "") for key in COLUMNS})
+    fileio.invalidate_tsv_cache(fileio.path("library history"))
@@ -59,6 +59,7 @@ def new():
         for row in updated_manifest:
             full_row = {col: row.get(col, "") for col in COLUMNS}
             writer.writerow(full_row)
+    fileio.invalidate_tsv_cache(manifest_path)
 
 
 def update_upstream(path_to_system_rev, system_pn_rev, manifest_nets, harness_pn):
@@ -91,3 +92,4 @@ def update_upstream(path_to_system_rev, system_pn_rev, manifest_nets, harness_pn
         writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter="\t")
         writer.writeheader()
         writer.writerows(manifest)
+    fileio.invalidate_tsv_cache(manifest_path)
@@ -66,4 +66,5 @@ def push(path_to_system_rev, system_pn_rev):
     path_to_harness_dir_of_system = os.path.join(
         path_to_system_rev, f"{system_pn_rev[0]}-{system_pn_rev[1]}", "harnesses"
     )
+    instances_list.flush()
     shutil.copy(fileio.path("instances list"), path_to_harness_dir_of_system)
@@ -1,6 +1,5 @@
 import os
 import csv
-import ast
 import importlib
 from harnice import fileio, state
 
@@ -113,6 +112,7 @@ The function will update the revision history file as referenced by the current
         writer = csv.DictWriter(f, fieldnames=COLUMNS, delimiter="\t")
         writer.writeheader()
         writer.writerows(rows)
+    fileio.invalidate_tsv_cache(path)
 
 
 def info(rev=None, path=None, field=None, all=False):
@@ -170,11 +170,9 @@ def info(rev=None, path=None, field=None, all=False):
                 if field == "affectedinstances":
                     if not val or val.strip() == "":
                         return []
-                    try:
-                        return ast.literal_eval(val)
-                    except Exception:
-                        # fallback: return empty list if malformed
-                        return []
+                    parsed = fileio.decode_cell(val)
+                    # fallback: return empty list if malformed
+                    return parsed if isinstance(parsed, list) else []
 
                 # other fields unchanged
                 return val
@@ -185,10 +183,10 @@ def info(rev=None, path=None, field=None, all=False):
             full_row = dict(row)
             ai = row.get("affectedinstances")
             if ai and ai.strip() != "":
-                try:
-                    full_row["affectedinstances"] = ast.literal_eval(ai)
-                except Exception:
-                    full_row["affectedinstances"] = []
+                parsed = fileio.decode_cell(ai)
+                full_row["affectedinstances"] = (
+                    parsed if isinstance(parsed, list) else []
+                )
             else:
                 full_row["affectedinstances"] = []
 
@@ -314,6 +312,7 @@ def new(ignore_product=False, path=None):
         with open(path, "w", newline="", encoding="utf-8") as f:
             writer = csv.DictWriter(f, fieldnames=columns, delimiter="\t")
             writer.writeheader()
+        fileio.invalidate_tsv_cache(path)
 
     else:
         raise ValueError(
@@ -420,14 +419,13 @@ def append(next_rev=None):
     # Normalize path separators for comparison (handle both forward and backslashes)
     cwd = str(os.getcwd()).lower().replace("\\", "/").strip("~")
 
-    for row in fileio.read_tsv("library locations", delimiter=","):
+    for repo_url, lib_local_path_raw in fileio.location_entries("library locations"):
         # Normalize path separators and expand user home directory if needed
-        lib_local_path_raw = str(row.get("local_path", "")).strip()
         lib_local_path = (
             os.path.expanduser(lib_local_path_raw).lower().replace("\\", "/").strip("~")
         )
         if lib_local_path in cwd:
-            library_repo = row.get("repo_url")
+            library_repo = repo_url
 
             # keep only the portion AFTER local_path
             idx = cwd.find(lib_local_path)
@@ -477,6 +475,7 @@ def append(next_rev=None):
         writer = csv.DictWriter(f, fieldnames=columns, delimiter="\t")
         writer.writeheader()
         writer.writerows(rows)
+    fileio.invalidate_tsv_cache(fileio.path("revision history"))
 
 
 def part_family_append(content_dict, rev_history_path):
@@ -539,3 +538,4 @@ def part_family_append(content_dict, rev_history_path):
         writer = csv.DictWriter(f, fieldnames=COLUMNS, delimiter="\t")
         writer.writeheader()
         writer.writerows(rows)
+    fileio.invalidate_tsv_cache(rev_history_path)
@@ -55,6 +55,7 @@ def new():
     with open(signals_path, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f, delimiter="\t")
         writer.writerow(COLUMNS)
+    fileio.invalidate_tsv_cache(signals_path)
 
 
 def append(**kwargs):
@@ -114,6 +115,7 @@ def append(**kwargs):
     with open(signals_path, "a", newline="", encoding="utf-8") as f:
         writer = csv.writer(f, delimiter="\t", lineterminator="\n")
         writer.writerow(row)
+    fileio.invalidate_tsv_cache(signals_path)
 
 
 def cavity_of_signal(channel_id, signal, path_to_signals_list):
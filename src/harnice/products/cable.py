@@ -149,6 +149,7 @@ def render():
         )
         writer.writeheader()
         writer.writerows(rows)
+    fileio.invalidate_tsv_cache(conductor_list_path)
 
     print(
         f"\ncable rendered successfully! wrote {len(rows)} rows to:\n{conductor_list_path}\n"
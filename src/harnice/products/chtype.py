@@ -1,5 +1,4 @@
 import os
-import ast
 from harnice import fileio
 from harnice.utils import library_utils
 
@@ -48,7 +47,9 @@ def parse(val):
     if isinstance(val, tuple):
         chid, lib_repo = val
     else:
-        parsed = ast.literal_eval(str(val))
+        parsed = fileio.decode_cell(str(val))
+        if isinstance(parsed, str):
+            raise ValueError(f"Invalid channel type: {val!r}")
         # If it's a list, take the first tuple
         if isinstance(parsed, list):
             chid, lib_repo = parsed[0]
@@ -81,28 +82,8 @@ channel type.
     - Single tuple: `(1, "library_repo")`
     - List of tuples: `[(1, "library_repo"), (2, "library_repo")]`
     """
-    channel_type_id, lib_repo = parse(channel_type)
-
-    for row in fileio.read_tsv(path((channel_type_id, lib_repo))):
-        if int(row.get("channel_type_id")) == channel_type_id:
-            signals_str = row.get("compatible_channel_types", "").strip()
-            if not signals_str:
-                return []
-
-            # Parse the AST-formatted string
-            parsed_value = ast.literal_eval(signals_str)
-
-            # Normalize to list format
-            if isinstance(parsed_value, tuple):
-                # Single tuple, wrap it in a list
-                return [parsed_value]
-            elif isinstance(parsed_value, list):
-                # Already a list of tuples
-                return parsed_value
-            else:
-                return []
-
-    return []
+    channel_type = parse(channel_type)
+    return list(registry(channel_type[1]).declared_compatibles(channel_type[0]))
 
 
 def is_or_is_compatible_with(channel_type):
@@ -135,6 +116,33 @@ with it.
     return output
 
 
+def are_compatible(channel_type_a, channel_type_b):
+    """
+Return whether two channel types can be mapped to each other.
+
+**Args**
+
+- `channel_type_a`, `channel_type_b`: Channel type identifiers in standard
+    tuple format `(channel_type_id, lib_repo)` or any string representation
+    that `parse` can understand.
+
+**Returns**
+
+- `bool`: `True` if either one lists the other in its
+    `compatible_channel_types` column. Compatibility only has to be declared on
+    one side. A channel type is only compatible with itself if it lists itself.
+    """
+    channel_type_a = parse(channel_type_a)
+    channel_type_b = parse(channel_type_b)
+    if channel_type_b in registry(channel_type_a[1]).compatible_with(
+        channel_type_a[0]
+    ):
+        return True
+    return channel_type_a in registry(channel_type_b[1]).compatible_with(
+        channel_type_b[0]
+    )
+
+
 def signals(channel_type):
     """
 Return the list of signal names associated with a specific channel type.
@@ -157,17 +165,7 @@ Return the list of signal names associated with a specific channel type.
     example: `"CAN_H, CAN_L, SHIELD"`.
     """
     chid, lib_repo = parse(channel_type)
-
-    ch_types_tsv_path = os.path.join(
-        library_utils.get_local_path(lib_repo), "channel_types", "channel_types.tsv"
-    )
-
-    for row in fileio.read_tsv(ch_types_tsv_path):
-        if str(row.get("channel_type_id", "")).strip() == str(chid):
-            return [
-                sig.strip() for sig in row.get("signals", "").split(",") if sig.strip()
-            ]
-    return []
+    return list(registry(lib_repo).signals.get(chid, []))
 
 
 def attribute(channel_type, attribute):
@@ -196,12 +194,129 @@ type.
     `compatible_channel_types`.
     """
     chid, lib_repo = parse(channel_type)
+    row = registry(lib_repo).rows.get(chid)
+    if row is None:
+        return []
+    return row.get(attribute)
 
-    ch_types_tsv_path = os.path.join(
-        library_utils.get_local_path(lib_repo), "channel_types", "channel_types.tsv"
-    )
 
-    for row in fileio.read_tsv(ch_types_tsv_path):
-        if str(row.get("channel_type_id", "")).strip() == str(chid):
-            return row.get(attribute)
-    return []
+class ChannelTypeRegistry:
+    """
+All channel types defined by one library repo, read once from its
+`channel_types.tsv`.
+
+Get one with `registry(lib_repo)` rather than constructing it directly so
+each repo is only read and parsed once per run.
+
+**Attributes**
+
+- `lib_repo`: Library repo URL the channel types belong to.
+- `path`: Path to the `channel_types.tsv` the registry was read from.
+- `rows`: `channel_type_id` (`int`) -> row dict from `channel_types.tsv`.
+- `signals`: `channel_type_id` -> list of signal names.
+- `compatibles`: `channel_type_id` -> list of `(channel_type_id, lib_repo)`
+    tuples declared in its `compatible_channel_types` column.
+    """
+
+    def __init__(self, lib_repo):
+        self.lib_repo = lib_repo
+        self.path = path((0, lib_repo))
+        self.rows = {}
+        self.signals = {}
+        self.compatibles = {}
+        # chid -> set of channel types declared compatible in either direction
+        # within this repo
+        self._compatible_with = {}
+        # chid -> exception raised while parsing its compatible_channel_types
+        self._errors = {}
+
+        for row in fileio.read_tsv(self.path):
+            try:
+                chid = int(str(row.get("channel_type_id", "")).strip())
+            except ValueError:
+                continue
+            if chid in self.rows:
+                continue
+            self.rows[chid] = row
+            self.signals[chid] = [
+                sig.strip() for sig in row.get("signals", "").split(",") if sig.strip()
+            ]
+            try:
+                self.compatibles[chid] = _parse_compatibles(
+                    row.get("compatible_channel_types", "")
+                )
+            except (ValueError, SyntaxError, TypeError) as e:
+                # only an error for lookups that actually need this channel type
+                self._errors[chid] = e
+
+        for chid, declared in self.compatibles.items():
+            self._compatible_with.setdefault(chid, set()).update(declared)
+            for other in declared:
+                if other[1] == lib_repo:
+                    self._compatible_with.setdefault(other[0], set()).add(
+                        (chid, lib_repo)
+                    )
+
+    def declared_compatibles(self, chid):
+        """Return the `(channel_type_id, lib_repo)` tuples `chid` lists as compatible."""
+        if chid in self._errors:
+            raise self._errors[chid]
+        return self.compatibles.get(chid, [])
+
+    def compatible_with(self, chid):
+        """Return the `(channel_type_id, lib_repo)` tuples compatible with `chid`, whichever side declared it."""
+        if chid in self._errors:
+            raise self._errors[chid]
+        return self._compatible_with.get(chid, frozenset())
+
+
+# lib_repo -> ChannelTypeRegistry
+_registries = {}
+
+
+def registry(lib_repo):
+    """
+Return the `ChannelTypeRegistry` for a library repo, reading its
+`channel_types.tsv` on first use.
+
+**Args**
+
+- `lib_repo`: Library repo URL (for example
+    `"https://github.com/harnice/harnice"`).
+    """
+    lib_repo = str(lib_repo).strip()
+    if lib_repo not in _registries:
+        _registries[lib_repo] = ChannelTypeRegistry(lib_repo)
+    return _registries[lib_repo]
+
+
+def clear_registries():
+    """
+Forget every loaded `ChannelTypeRegistry` so the next lookup re-reads
+`channel_types.tsv`. Call this after editing a channel types file in the
+same run.
+    """
+    _registries.clear()
+
+
+def _parse_compatibles(value):
+    value = value.strip()
+    if not value:
+        return []
+
+    # Parse the AST-formatted string
+    parsed_value = fileio.decode_cell(value)
+    if isinstance(parsed_value, str):
+        raise ValueError(f"Invalid compatible channel types: {value!r}")
+
+    # Normalize to list format
+    if isinstance(parsed_value, tuple):
+        if parsed_value and all(isinstance(item, tuple) for item in parsed_value):
+            # Several tuples separated by commas: "(1, 'repo'),(2, 'repo')"
+            parsed_value = list(parsed_value)
+        else:
+            # Single tuple, wrap it in a list
+            parsed_value = [parsed_value]
+    elif not isinstance(parsed_value, list):
+        return []
+    return [parse(compatible) for compatible in parsed_value]
@@ -543,6 +543,7 @@ def _remove_details_from_signals_list():
         writer = csv.DictWriter(f, fieldnames=signals_list.COLUMNS, delimiter="\t")
         writer.writeheader()
         writer.writerows(new_list)
+    fileio.invalidate_tsv_cache(path)
 
 
 def _next_free_number(seen_numbers, start=1):
@@ -165,9 +165,8 @@ def _validate_signals_list():
             )
 
         # make sure A and B sides are compatible
-        if B_channel_type not in chtype.compatibles(A_channel_type):
-            if A_channel_type not in chtype.compatibles(B_channel_type):
-                raise ValueError("A and B channel types are not compatible")
+        if not chtype.are_compatible(A_channel_type, B_channel_type):
+            raise ValueError("A and B channel types are not compatible")
 
         expected_signals = chtype.signals(A_channel_type)
         found_signals = set()
@@ -199,19 +199,20 @@ def render():
     # ======================================================================
     library_history.new()
     instances_list.new()
-    instances_list.new_instance(
-        "origin",
-        {
-            "instance_name": "origin",
-            "item_type": "origin",
-            "location_type": "node",
-        },
-    )
+    with instances_list.session():
+        instances_list.new_instance(
+            "origin",
+            {
+                "instance_name": "origin",
+                "item_type": "origin",
+                "location_type": "node",
+            },
+        )
 
-    # ======================================================================
-    # 3. Run the feature tree
-    # ======================================================================
-    cli.print_import_status_headers()
-    runpy.run_path(fileio.path("feature tree"), run_name="__main__")
+        # ==================================================================
+        # 3. Run the feature tree
+        # ==================================================================
+        cli.print_import_status_headers()
+        runpy.run_path(fileio.path("feature tree"), run_name="__main__")
 
     print(f"Harnice: harness {state.partnumber('pn')} rendered successfully!\n")
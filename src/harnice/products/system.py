@@ -8,7 +8,8 @@ default_desc = "SYSTEM, SCOPE, etc."
 button_color = "#86e1eb"
 
 system_feature_tree_utils_default = """from harnice import fileio
-from harnice.utils import system_utils, feature_tree_utils
+from harnice.utils import system_utils, feature_tree_utils, circuit_utils
+from harnice.products import chtype
 from harnice.lists import instances_list, manifest, channel_map, circuits_list, disconnect_map
 
 #===========================================================================
@@ -73,46 +74,28 @@ circuits_list.new()
 system_utils.make_instances_for_connectors_cavities_nodes_channels_circuits()
 
 # assign mating connectors
-for instance in fileio.read_tsv("instances list"):
-    if instance.get("item_type") == "connector":
-        if instance.get("this_instance_mating_device_connector_mpn") == "XLR3M":
-            instances_list.modify(
-                instance.get("instance_name"),
-                {
-                    "mpn": "D38999_26ZA98PN",
-                    "lib_repo": "https://github.com/harnice/harnice",
-                },
-            )
-        elif instance.get("this_instance_mating_device_connector_mpn") == "XLR3F":
-            instances_list.modify(
-                instance.get("instance_name"),
-                {
-                    "mpn": "D38999_26ZB98PN",
-                    "lib_repo": "https://github.com/harnice/harnice",
-                },
-            )
-        elif instance.get("this_instance_mating_device_connector_mpn") == "DB25M":
-            instances_list.modify(
-                instance.get("instance_name"),
-                {
-                    "mpn": "D38999_26ZC35PN",
-                    "lib_repo": "https://github.com/harnice/harnice",
-                },
-            )
-        elif instance.get("this_instance_mating_device_connector_mpn") == "DB25F":
-            instances_list.modify(
-                instance.get("instance_name"),
-                {
-                    "mpn": "D38999_26ZE6PN",
-                    "lib_repo": "https://github.com/harnice/harnice",
-                },
-            )
+mating_connector_mpns = {
+    "XLR3M": "D38999_26ZA98PN",
+    "XLR3F": "D38999_26ZB98PN",
+    "DB25M": "D38999_26ZC35PN",
+    "DB25F": "D38999_26ZE6PN",
+}
+mating_connectors = {}
+for instance in instances_list.where(item_type="connector"):
+    mpn = mating_connector_mpns.get(instance.get("this_instance_mating_device_connector_mpn"))
+    if mpn:
+        mating_connectors[instance.get("instance_name")] = {
+            "mpn": mpn,
+            "lib_repo": "https://github.com/harnice/harnice",
+        }
+instances_list.bulk_modify(mating_connectors)
 
 # ===========================================================================
 #                   ASSIGN CONDUCTORS
 # ===========================================================================
 
 # add one conductor per circuit
+circuits = circuit_utils.CircuitGraph()
 for instance in fileio.read_tsv("instances list"):
     if instance.get("item_type") == "circuit":
         circuit_id = instance.get("circuit_id")
@@ -124,20 +107,17 @@ for instance in fileio.read_tsv("instances list"):
                 "item_type": "conductor",
                 "location_type": "segment",
                 "channel_group": instance.get("channel_group"),
-                "node_at_end_a": circuit_utils.instance_of_circuit_port_number(
+                "node_at_end_a": circuits.instance_at(
                     circuit_id, 0 # assume the only existing ports at this point are cavities at 0 and 1
                 ),
-                "node_at_end_b": circuit_utils.instance_of_circuit_port_number(
-                    circuit_id, 1
-                ),
+                "node_at_end_b": circuits.instance_at(circuit_id, 1),
                 "this_channel_from_channel_type": instance.get("this_channel_from_channel_type"),
                 "this_channel_to_channel_type": instance.get("this_channel_to_channel_type"),
                 "signal_of_channel_type": instance.get("signal_of_channel_type")
             },
         )
-        circuit_utils.squeeze_instance_between_ports_in_circuit(
-            conductor_name, instance.get("circuit_id"), 1
-        )
+        circuits.squeeze(conductor_name, circuit_id, 1)
+circuits.write()
 
 # define the cable types we want to use here
 audio_cable = {
@@ -145,6 +125,7 @@ audio_cable = {
     "mpn": "8762 0602000",
     "lib_subpath": "belden",
 }
+audio_channel_type = (1, "https://github.com/harnice/harnice")
 
 # assign conductors to cable-id
 cable_id_counter = 1
@@ -161,7 +142,8 @@ for net in instances_list.list_of_uniques("net"):
             if instance.get("item_type") != "conductor":
                 continue
 
-            if chtype.parse(instance.get("this_channel_from_channel_type")) in chtype.is_or_is_compatible_with((1, 'https://github.com/harnice/harnice')):
+            this_channel_type = chtype.parse(instance.get("this_channel_from_channel_type"))
+            if this_channel_type == audio_channel_type or chtype.are_compatible(this_channel_type, audio_channel_type):
                 if instance.get("signal_of_channel_type") in ["pos"]:
                     circuit_utils.assign_cable_conductor(
                         cable_name,
@@ -201,29 +183,26 @@ shield_channel_style = {
     "base_color": "#4039A1",
 }
 
+channel_styles = {}
 for instance in fileio.read_tsv("instances list"):
     if instance.get("item_type") in ["channel", "net-channel"]:
         if instance.get("this_channel_from_channel_type") in ["(1, 'https://github.com/harnice/harnice')", "(2, 'https://github.com/harnice/harnice')"]:
-            instances_list.modify(
-                instance.get("instance_name"),
-                {
-                    "appearance": audio_channel_style
-                }
-            )
+            channel_styles[instance.get("instance_name")] = {
+                "appearance": audio_channel_style
+            }
         if instance.get("this_channel_from_channel_type") == "(5, 'https://github.com/harnice/harnice')":
-            instances_list.modify(
-                instance.get("instance_name"),
-                {
-                    "appearance": shield_channel_style
-                }
-            )
-
-for instance in fileio.read_tsv("instances list"):
-    if instance.get("item_type") == "net-channel":
-        instances_list.modify(instance.get("instance_name"), {
-            "print_name_at_end_a": instance.get("this_net_from_device_channel_id"),
-            "print_name_at_end_b": instance.get("this_net_to_device_channel_id")
-        })
+            channel_styles[instance.get("instance_name")] = {
+                "appearance": shield_channel_style
+            }
+instances_list.bulk_modify(channel_styles)
+
+net_channel_print_names = {}
+for instance in instances_list.where(item_type="net-channel"):
+    net_channel_print_names[instance.get("instance_name")] = {
+        "print_name_at_end_a": instance.get("this_net_from_device_channel_id"),
+        "print_name_at_end_b": instance.get("this_net_to_device_channel_id")
+    }
+instances_list.bulk_modify(net_channel_print_names)
 
 # ===========================================================================
 #                   SYSTEM ARTIFACT GENERATORS
@@ -292,8 +271,9 @@ def render():
 
     library_history.new()
     instances_list.new()
-    cli.print_import_status_headers()
-    runpy.run_path(fileio.path("feature tree"))
+    with instances_list.session():
+        cli.print_import_status_headers()
+        runpy.run_path(fileio.path("feature tree"))
 
     post_harness_instances_list.rebuild()
 
@@ -7,18 +7,33 @@ when resolving path keys.
 
 import re
 
+# Bumped whenever pn, rev or the file structure changes, so that anything derived from
+# them (e.g. the path index in `fileio`) knows to rebuild.
+generation = 0
+
+# partnumber() results for the current pn and rev, keyed by format
+_partnumber_cache = {}
+
+
+def _changed():
+    global generation
+    generation += 1
+    _partnumber_cache.clear()
+
 
 # not initializing these variables so that a NameError is raised if they are not set
 def set_pn(x):
     """Set the current part number (e.g. `"mypart"`). Called by `fileio.verify_revision_structure()`."""
     global pn
     pn = x
+    _changed()
 
 
 def set_rev(x):
     """Set the current revision (number or string, e.g. 1 or \"A\"). Called by `fileio.verify_revision_structure()`."""
     global rev
     rev = x
+    _changed()
 
 
 def set_product(x):
@@ -40,6 +55,7 @@ def set_file_structure(x):
     """
     global file_structure
     file_structure = x
+    _changed()
 
 
 def partnumber(format):
@@ -60,6 +76,14 @@ def partnumber(format):
 
     **Raises:** `ValueError` if **format** is not one of the options above.
     """
+    if format in _partnumber_cache:
+        return _partnumber_cache[format]
+    result = _partnumber(format)
+    _partnumber_cache[format] = result
+    return result
+
+
+def _partnumber(format):
     pn_rev = f"{pn}-rev{rev}"
 
     if format == "pn-rev":
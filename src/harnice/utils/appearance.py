@@ -1,5 +1,5 @@
-import ast
 import webcolors
+from harnice import fileio
 
 """
 Appearance guide:
@@ -22,7 +22,9 @@ def parse(val):
     if not val:
         return None
 
-    data = val if isinstance(val, dict) else ast.literal_eval(str(val))
+    data = val if isinstance(val, dict) else fileio.decode_cell(str(val))
+    if not isinstance(data, dict):
+        raise ValueError(f"Appearance is not a dictionary: {val!r}")
     result = {}
 
     for key, value in data.items():
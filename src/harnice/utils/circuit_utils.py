@@ -6,6 +6,201 @@ import os
 conductor_documentation_description = "A conductor is a piece of copper"
 circuit_documentation_description = 'A circuit is the requirement that there must exist an electrical path between two signals of connected devices. You can assign conductors or other electrical elements along it. Instances assigned along the circuit have "circuit ids" which represent the order in which the circuit passes through them.'
 
+
+class CircuitGraph:
+    """
+    The port order of every circuit, read once from the instances list.
+
+    Each circuit is held as a list of `[circuit_port_number, instance_name]` pairs sorted
+    by port number, so its end ports can be looked up directly and inserting an instance
+    only touches the ports after it. Changes are kept in memory until `write()` saves the
+    changed `circuit_id` and `circuit_port_number` values with a single
+    `instances_list.bulk_modify()`.
+
+    Circuit instances (`item_type=="circuit"`) are not ports and are left out.
+
+    ```python
+    circuits = circuit_utils.CircuitGraph()
+    for circuit_id in circuits.circuit_ids():
+        circuits.squeeze(f"conductor-{circuit_id}", circuit_id, 1)
+    circuits.write()
+    ```
+
+    **Args:**
+    - `instances` (iterable, optional): Instance rows to build the graph from. Defaults to
+        every row of the instances list.
+    """
+
+    def __init__(self, instances=None):
+        if instances is None:
+            instances = instances_list.rows()
+        # circuit_id -> sorted [[circuit_port_number, instance_name], ...]
+        self._ports = {}
+        # circuit_id -> names of instances in the circuit that have no port number yet
+        self._unnumbered = {}
+        # instance_name -> circuit_id, for every instance in a circuit
+        self._circuit_of = {}
+        # instance_name -> columns to write back
+        self._changes = {}
+        for instance in instances:
+            circuit_id = _circuit_key(instance.get("circuit_id"))
+            if circuit_id == "" or instance.get("item_type") == "circuit":
+                continue
+            instance_name = instance.get("instance_name")
+            self._circuit_of[instance_name] = circuit_id
+            port = str(instance.get("circuit_port_number") or "").strip()
+            if port == "":
+                self._unnumbered.setdefault(circuit_id, []).append(instance_name)
+            else:
+                self._ports.setdefault(circuit_id, []).append(
+                    [int(port), instance_name]
+                )
+        for ports in self._ports.values():
+            ports.sort(key=lambda port: port[0])
+
+    def circuit_ids(self):
+        """Returns the IDs of every circuit that has at least one port, as strings."""
+        return list(self._ports)
+
+    def ports(self, circuit_id):
+        """
+        Returns the ports of a circuit in order.
+
+        **Returns:**
+        - `list`: `(circuit_port_number, instance_name)` tuples, lowest port first.
+        """
+        return [tuple(port) for port in self._ports.get(_circuit_key(circuit_id), [])]
+
+    def circuit_of(self, instance_name):
+        """Returns the circuit ID an instance is a port of, or `None`."""
+        return self._circuit_of.get(instance_name)
+
+    def instance_at(self, circuit_id, circuit_port_number):
+        """
+        Returns the instance name at a port of a circuit.
+
+        **Raises:**
+        - `ValueError`: If no instance is at that port.
+        """
+        number = int(circuit_port_number)
+        for port, instance_name in self._ports.get(_circuit_key(circuit_id), []):
+            if port == number:
+                return instance_name
+            if port > number:
+                break
+        raise ValueError(
+            f"No instance found for circuit {circuit_id} and port number {circuit_port_number}"
+        )
+
+    def max_port(self, circuit_id):
+        """
+        Returns the highest port number of a circuit (`0` if it has no ports).
+
+        **Raises:**
+        - `ValueError`: If an instance of the circuit has a blank `circuit_port_number`.
+        """
+        circuit_id = _circuit_key(circuit_id)
+        unnumbered = self._unnumbered.get(circuit_id)
+        if unnumbered:
+            raise ValueError(f"Circuit port number is blank for {unnumbered[0]}")
+        ports = self._ports.get(circuit_id)
+        return ports[-1][0] if ports else 0
+
+    def end_ports(self, circuit_id):
+        """
+        Returns the instance names at port 0 and at the highest port of a circuit.
+
+        **Returns:**
+        - `tuple`: `(zero_port, max_port)` instance names. Either is an empty string if the
+            circuit has no instance there.
+        """
+        ports = self._ports.get(_circuit_key(circuit_id))
+        if not ports:
+            return "", ""
+        zero_port = ports[0][1] if ports[0][0] == 0 else ""
+        return zero_port, ports[-1][1]
+
+    def squeeze(self, instance_name, circuit_id, circuit_port_number):
+        """
+        Puts an instance at a port of a circuit, moving the instances at that port and
+        after it up by one. Same as `squeeze_instance_between_ports_in_circuit()`, but only
+        in memory until `write()`.
+        """
+        circuit_id = _circuit_key(circuit_id)
+        number = int(circuit_port_number)
+        self._remove(instance_name)
+        ports = self._ports.setdefault(circuit_id, [])
+        index = len(ports)
+        while index > 0 and ports[index - 1][0] >= number:
+            index -= 1
+            ports[index][0] += 1
+            self._changed(ports[index][1])["circuit_port_number"] = ports[index][0]
+        ports.insert(index, [number, instance_name])
+        self._circuit_of[instance_name] = circuit_id
+        self._changed(instance_name).update(
+            {"circuit_id": circuit_id, "circuit_port_number": number}
+        )
+
+    def renumber(self, circuit_id, start=0):
+        """
+        Closes gaps in the port numbers of a circuit, keeping their order, so they run
+        from `start` up by one.
+        """
+        for number, port in enumerate(
+            self._ports.get(_circuit_key(circuit_id), []), start
+        ):
+            if port[0] != number:
+                port[0] = number
+                self._changed(port[1])["circuit_port_number"] = number
+
+    def changes(self):
+        """Returns the changes not written yet: instance_name -> changed columns."""
+        return {name: dict(columns) for name, columns in self._changes.items()}
+
+    def write(self):
+        """
+        Writes the changed port numbers to the instances list in one go. Instances that
+        aren't in the instances list are skipped.
+
+        **Returns:**
+        - `int`: Number of instances changed.
+        """
+        if not self._changes:
+            return 0
+        changes = self.changes()
+        instances_list.bulk_modify(changes, on_missing="skip")
+        self._changes = {}
+        return len(changes)
+
+    def _changed(self, instance_name):
+        return self._changes.setdefault(instance_name, {})
+
+    def _remove(self, instance_name):
+        circuit_id = self._circuit_of.pop(instance_name, None)
+        if circuit_id is None:
+            return
+        unnumbered = self._unnumbered.get(circuit_id, [])
+        if instance_name in unnumbered:
+            unnumbered.remove(instance_name)
+        ports = self._ports.get(circuit_id, [])
+        for index, port in enumerate(ports):
+            if port[1] == instance_name:
+                del ports[index]
+                break
+
+
+def _circuit_key(circuit_id):
+    """Circuit IDs are compared as the text the instances list stores."""
+    if circuit_id is None:
+        return ""
+    return str(circuit_id).strip()
+
+
+def _graph_of_circuit(circuit_id):
+    """A `CircuitGraph` of one circuit, read through the instances list index."""
+    return CircuitGraph(instances_list.rows(circuit_id=_circuit_key(circuit_id)))
+
+
 def end_ports_of_circuit(circuit_id):
     """
     Returns the instance names at the end ports (port 0 and maximum port) of a circuit.
@@ -27,17 +222,7 @@ def end_ports_of_circuit(circuit_id):
         int(circuit_id)
     except ValueError:
         raise ValueError(f"Pass an integer circuit_id, not '{circuit_id}'")
-    zero_port = ""
-    max_port = ""
-    for instance in fileio.read_tsv("instances list"):
-        if instance.get("circuit_id") == circuit_id:
-            if instance.get("circuit_port_number") == 0:
-                zero_port = instance.get("instance_name")
-            if instance.get("circuit_port_number") == max_port_number_in_circuit(
-                circuit_id
-            ):
-                max_port = instance.get("instance_name")
-    return zero_port, max_port
+    return _graph_of_circuit(circuit_id).end_ports(circuit_id)
 
 
 def max_port_number_in_circuit(circuit_id):
@@ -57,19 +242,7 @@ def max_port_number_in_circuit(circuit_id):
     **Raises:**
     - `ValueError`: If any non-circuit instance has a blank `circuit_port_number`.
     """
-    max_port_number = 0
-    for instance in fileio.read_tsv("instances list"):
-        if instance.get("circuit_id") == circuit_id:
-            if instance.get("circuit_port_number") == "":
-                if instance.get("item_type") == "circuit":
-                    continue
-                raise ValueError(
-                    f"Circuit port number is blank for {instance.get('instance_name')}"
-                )
-            max_port_number = max(
-                max_port_number, int(instance.get("circuit_port_number"))
-            )
-    return max_port_number
+    return _graph_of_circuit(circuit_id).max_port(circuit_id)
 
 
 def squeeze_instance_between_ports_in_circuit(
@@ -81,6 +254,8 @@ def squeeze_instance_between_ports_in_circuit(
     Assigns the specified instance to a port number in the circuit, incrementing
     the port numbers of all instances that were at or after that port number.
     Circuit instances (`item_type=="circuit"`) are skipped and not renumbered.
+    All changed port numbers are written in one instances list update. To insert
+    into many circuits, use a `CircuitGraph` and write it once at the end.
 
     **Args:**
     - `instance_name` (str): Name of the instance to insert into the circuit.
@@ -89,30 +264,9 @@ def squeeze_instance_between_ports_in_circuit(
         instances at this port number or higher will have their port numbers
         incremented by 1.
     """
-    instances = fileio.read_tsv("instances list")
-    for instance in instances:
-        if instance.get("instance_name") == instance_name:
-            continue
-        if instance.get("circuit_id") == circuit_id:
-            if instance.get("item_type") == "circuit":
-                continue
-            old_port_number = instance.get("circuit_port_number")
-            if int(instance.get("circuit_port_number")) < new_circuit_port_number:
-                continue
-            else:
-                instances_list.modify(
-                    instance.get("instance_name"),
-                    {"circuit_port_number": int(old_port_number) + 1},
-                )
-    for instance in instances:
-        if instance.get("instance_name") == instance_name:
-            instances_list.modify(
-                instance_name,
-                {
-                    "circuit_id": circuit_id,
-                    "circuit_port_number": new_circuit_port_number,
-                },
-            )
+    graph = _graph_of_circuit(circuit_id)
+    graph.squeeze(instance_name, circuit_id, new_circuit_port_number)
+    graph.write()
 
 
 def instances_of_circuit(circuit_id):
@@ -130,11 +284,10 @@ def instances_of_circuit(circuit_id):
     - `list`: List of instance dictionaries, sorted by `circuit_port_number` in ascending order.
     """
     instances = []
-    for instance in fileio.read_tsv("instances list"):
-        if instance.get("circuit_id") == circuit_id:
-            if instance.get("item_type") == "circuit":
-                continue
-            instances.append(instance)
+    for instance in instances_list.where(circuit_id=circuit_id):
+        if instance.get("item_type") == "circuit":
+            continue
+        instances.append(instance)
 
     # sort numerically by circuit_port_number, treating missing as large number
     instances.sort(key=lambda x: int(x.get("circuit_port_number") or 999999))
@@ -166,13 +319,12 @@ def instance_of_circuit_port_number(circuit_id, circuit_port_number):
     if circuit_port_number in ["", None]:
         raise ValueError("Circuit port number is blank")
 
-    for instance in fileio.read_tsv("instances list"):
-        if instance.get("circuit_id").strip() == str(circuit_id).strip():
-            if (
-                instance.get("circuit_port_number").strip()
-                == str(circuit_port_number).strip()
-            ):
-                return instance.get("instance_name")
+    for instance in instances_list.where(circuit_id=str(circuit_id).strip()):
+        if (
+            instance.get("circuit_port_number").strip()
+            == str(circuit_port_number).strip()
+        ):
+            return instance.get("instance_name")
 
     raise ValueError(
         f"No instance found for circuit {circuit_id} and port number {circuit_port_number}"
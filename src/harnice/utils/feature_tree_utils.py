@@ -4,7 +4,10 @@ import math
 import json
 import shutil
 from harnice import fileio
-from harnice.utils import library_utils
+from harnice.utils import library_utils, incremental_utils, profile_utils
+
+# attributes JSON path -> ((mtime_ns, size), parsed contents), see _read_attributes()
+_attributes_cache = {}
 
 
 def run_macro(
@@ -26,6 +29,11 @@ def run_macro(
         defaults to `instance_data/macro/{artifact_id}`.
     - `**kwargs`: Additional keyword arguments to pass as global variables to the macro script.
 
+    When rendering with `harnice -r --incremental`, a macro whose script, arguments and
+    input files are unchanged since the last render isn't run again; its outputs are
+    restored instead (see `incremental_utils.run_cached`). With `harnice -r --profile`, the
+    call is timed as a `run_macro` stage named after `artifact_id`.
+
     **Raises:**
     - `ValueError`: If `artifact_id` is `None`, `macro_part_number` is `None`, `lib_repo` is `None`,
         or if a macro with the given `artifact_id` already exists in library history.
@@ -37,40 +45,53 @@ def run_macro(
     if lib_repo is None:
         raise ValueError("lib_repo is required")
 
-    for instance in fileio.read_tsv("library history"):
-        if instance.get("instance_name") == artifact_id:
-            raise ValueError(f"Macro with ID {artifact_id} already exists")
-
-    if base_directory is None:
-        base_directory = os.path.join("instance_data", "macro", artifact_id)
-
-    os.makedirs(fileio.dirpath(None, base_directory), exist_ok=True)
-
-    library_utils.pull(
-        {
-            "mpn": macro_part_number,
-            "lib_repo": lib_repo,
-            "lib_subpath": lib_subpath,
-            "item_type": "macro",
-            "instance_name": artifact_id,
-        },
-        destination_directory=fileio.dirpath(None, base_directory=base_directory),
-        update_instances_list=False,
-    )
-
-    script_path = os.path.join(
-        fileio.dirpath(None, base_directory=base_directory), f"{macro_part_number}.py"
-    )
+    with profile_utils.stage("run_macro", artifact_id):
+        for instance in fileio.read_tsv("library history"):
+            if instance.get("instance_name") == artifact_id:
+                raise ValueError(f"Macro with ID {artifact_id} already exists")
+
+        if base_directory is None:
+            base_directory = os.path.join("instance_data", "macro", artifact_id)
+
+        os.makedirs(fileio.dirpath(None, base_directory), exist_ok=True)
+
+        library_utils.pull(
+            {
+                "mpn": macro_part_number,
+                "lib_repo": lib_repo,
+                "lib_subpath": lib_subpath,
+                "item_type": "macro",
+                "instance_name": artifact_id,
+            },
+            destination_directory=fileio.dirpath(None, base_directory=base_directory),
+            update_instances_list=False,
+        )
 
-    # always pass the basics, but let kwargs override/extend
-    init_globals = {
-        "artifact_id": artifact_id,
-        "artifact_path": base_directory,
-        "base_directory": base_directory,
-        **kwargs,  # merges/overrides
-    }
+        script_path = os.path.join(
+            fileio.dirpath(None, base_directory=base_directory),
+            f"{macro_part_number}.py",
+        )
 
-    runpy.run_path(script_path, run_name="__main__", init_globals=init_globals)
+        # always pass the basics, but let kwargs override/extend
+        init_globals = {
+            "artifact_id": artifact_id,
+            "artifact_path": base_directory,
+            "base_directory": base_directory,
+            **kwargs,  # merges/overrides
+        }
+
+        if incremental_utils.enabled():
+            incremental_utils.run_cached(
+                artifact_id,
+                [macro_part_number, lib_subpath, lib_repo, base_directory, kwargs],
+                script_path,
+                fileio.dirpath(None, base_directory=base_directory),
+                lambda: runpy.run_path(
+                    script_path, run_name="__main__", init_globals=init_globals
+                ),
+            )
+        else:
+            runpy.run_path(script_path, run_name="__main__", init_globals=init_globals)
 
 
 def lookup_outputcsys_from_lib_used(instance, outputcsys, base_directory=None):
@@ -106,10 +127,8 @@ def lookup_outputcsys_from_lib_used(instance, outputcsys, base_directory=None):
         f"{instance.get('instance_name')}-attributes.json",
     )
 
-    try:
-        with open(attributes_path, "r", encoding="utf-8") as f:
-            attributes_data = json.load(f)
-    except FileNotFoundError:
+    attributes_data = _read_attributes(attributes_path)
+    if attributes_data is None:
         return 0, 0, 0
 
     csys_children = attributes_data.get("csys_children", {})
@@ -138,6 +157,28 @@ def lookup_outputcsys_from_lib_used(instance, outputcsys, base_directory=None):
     return x, y, rotation
 
 
+def _read_attributes(attributes_path):
+    """
+    The parsed attributes JSON at `attributes_path`, or `None` if there is no such file.
+
+    Parsed files are cached and read again only when their size or modification time
+    changes. The returned dict is shared between callers and must not be edited.
+    """
+    try:
+        stat = os.stat(attributes_path)
+    except FileNotFoundError:
+        _attributes_cache.pop(attributes_path, None)
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _attributes_cache.get(attributes_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with open(attributes_path, "r", encoding="utf-8") as f:
+        attributes_data = json.load(f)
+    _attributes_cache[attributes_path] = (signature, attributes_data)
+    return attributes_data
+
+
 def copy_pdfs_to_cwd():
     """
     Copies all PDF files from `instance_data` directory to the current working directory.
@@ -0,0 +1,299 @@
+import math
+from harnice.utils import feature_tree_utils
+
+"""
+Formboard placement
+
+Every instance on the formboard is placed relative to another one, its "parent csys":
+`parent_csys_instance_name` names the parent, `parent_csys_outputcsys_name` the output
+coordinate system of the parent (from the parent's attributes JSON) it is attached to,
+and `translate_x`, `translate_y` and `rotate_csys` move it from there. A non-blank
+`absolute_rotation` replaces the rotation accumulated along the way. Instances without a
+parent csys, or whose parent is `origin`, are placed relative to the formboard origin.
+
+These parent links form a tree. `locations()` resolves the whole tree in one pass,
+computing each instance's world transform once; `calculate_location()` resolves one
+instance, reusing the transforms of its parents from earlier calls with the same list.
+"""
+
+# the instances list last passed to calculate_location() and the resolver built for it
+_last_resolver = None
+
+
+def calculate_location(lookup_instance, instances):
+    """
+    Calculates world coordinates for an instance by accumulating transforms through the CSYS chain.
+
+    Traces the coordinate system hierarchy from the instance up to the origin, accumulating
+    translations and rotations at each level. Applies child coordinate system transforms,
+    instance translations, and rotations to compute the final world position and angle.
+
+    The function handles both Cartesian (`x`, `y`) and polar (`distance`, `angle`) coordinate
+    specifications for child coordinate systems. Absolute rotation overrides accumulated rotation.
+
+    The world transforms of the parents are remembered between calls that pass the same
+    `instances` list, so placing every instance of a list one by one reads each parent's
+    attributes only once. The `lookup_instance` itself is always placed from its current
+    values, so it may be edited between calls.
+
+    **Args:**
+    - `lookup_instance` (dict): The instance dictionary to calculate coordinates for.
+    - `instances` (list): List of all instance dictionaries needed to resolve the parent chain.
+
+    **Returns:**
+    - `tuple`: A tuple of `(x_pos, y_pos, angle)` representing the world coordinates and
+        rotation angle in degrees.
+
+    **Raises:**
+    - `ValueError`: If parent coordinate system information is missing or invalid, if
+        parent instances cannot be found in the instances list, or if the parent chain
+        loops back on itself.
+    """
+    global _last_resolver
+    if (
+        _last_resolver is None
+        or _last_resolver.instances is not instances
+        or _last_resolver.count != len(instances)
+    ):
+        _last_resolver = TransformResolver(instances)
+    return _last_resolver.place(lookup_instance)
+
+
+def locations(instances):
+    """
+    Calculates world coordinates for every instance of a list at once.
+
+    Each instance's world transform is computed once, parents before their children, so
+    the cost grows with the number of instances rather than with the depth of their
+    parent chains.
+
+    **Args:**
+    - `instances` (list): Instance dictionaries to place.
+
+    **Returns:**
+    - `dict`: `instance_name` -> `(x_pos, y_pos, angle)`, as `calculate_location()` returns.
+
+    **Raises:**
+    - `ValueError`: As `calculate_location()`.
+    """
+    resolver = TransformResolver(instances)
+    return {
+        instance.get("instance_name"): resolver.world(instance.get("instance_name"))
+        for instance in instances
+    }
+
+
+class TransformResolver:
+    """
+    Resolves and remembers the world transforms of the instances of one list.
+
+    Use `calculate_location()` or `locations()` unless you need to keep a resolver
+    around yourself. The resolver assumes the instances in the list don't change while it
+    is in use.
+
+    **Args:**
+    - `instances` (list): Instance dictionaries to resolve parent names against.
+    - `base_directory` (str, optional): Passed to
+        `feature_tree_utils.lookup_outputcsys_from_lib_used()` to find attributes files.
+    """
+
+    def __init__(self, instances, base_directory=None):
+        self.instances = instances
+        self.count = len(instances)
+        self.base_directory = base_directory
+        self._by_name = {}
+        for instance in instances:
+            self._by_name.setdefault(instance.get("instance_name"), instance)
+        # instance_name -> (x, y, angle) in world coordinates
+        self._world = {}
+        # (parent instance_name, outputcsys name) -> (x, y, rotation) in the parent's csys
+        self._outputcsys = {}
+
+    def world(self, instance_name):
+        """
+        Returns the world transform of a named instance of the list.
+
+        **Returns:**
+        - `tuple`: `(x_pos, y_pos, angle)`.
+        """
+        world = self._world.get(instance_name)
+        if world is not None:
+            return world
+
+        # walk up to the first parent already placed (or the origin) ...
+        chain = []
+        in_chain = set()
+        name = instance_name
+        while name is not None and name not in self._world:
+            if name in in_chain:
+                loop = chain[chain.index(name) :] + [name]
+                raise ValueError(
+                    f"Coordinate systems loop back on themselves: {' -> '.join(loop)}"
+                )
+            instance = self._by_name.get(name)
+            if instance is None:
+                raise ValueError(
+                    f"Parent csys instance '{name}' not found in the instances list"
+                )
+            chain.append(name)
+            in_chain.add(name)
+            name = _parent_name(instance)
+
+        # ... then place the chain back down from there
+        for name in reversed(chain):
+            self._world[name] = self._place(self._by_name[name])
+        return self._world[instance_name]
+
+    def place(self, instance):
+        """
+        Returns the world transform of an instance from its current values, resolving its
+        parent through the list. The instance doesn't have to be in the list.
+        """
+        parent_name = _parent_name(instance)
+        if parent_name is not None:
+            if parent_name == instance.get("instance_name"):
+                raise ValueError(
+                    f"Instance '{parent_name}' is its own parent csys instance"
+                )
+            self.world(parent_name)
+        return self._place(instance)
+
+    def _place(self, instance):
+        """Transform of an instance whose parent has already been placed."""
+        parent_name = _parent_name(instance)
+        if parent_name is None:
+            x, y, angle = 0.0, 0.0, 0.0
+        else:
+            x, y, angle = self._world[parent_name]
+            x, y, angle = _compose(
+                (x, y, angle),
+                self._output_csys(
+                    parent_name, instance.get("parent_csys_outputcsys_name")
+                ),
+            )
+
+        x, y, angle = _compose(
+            (x, y, angle),
+            (
+                _number(instance, "translate_x"),
+                _number(instance, "translate_y"),
+                _number(instance, "rotate_csys"),
+            ),
+        )
+
+        absolute_rotation = instance.get("absolute_rotation")
+        if absolute_rotation not in ["", None]:
+            angle = _number(instance, "absolute_rotation")
+        return x, y, angle
+
+    def _output_csys(self, parent_name, outputcsys):
+        if outputcsys in ["", None, "origin"]:
+            return 0, 0, 0
+        key = (parent_name, outputcsys)
+        transform = self._outputcsys.get(key)
+        if transform is None:
+            transform = feature_tree_utils.lookup_outputcsys_from_lib_used(
+                self._by_name[parent_name], outputcsys, self.base_directory
+            )
+            self._outputcsys[key] = transform
+        return transform
+
+
+def _parent_name(instance):
+    """The parent csys instance name, or `None` for instances placed at the origin."""
+    parent_name = instance.get("parent_csys_instance_name")
+    if parent_name in ["", None, "origin"]:
+        return None
+    return parent_name
+
+
+def _number(instance, column):
+    value = instance.get(column)
+    if value in ["", None]:
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(
+            f"{column} of '{instance.get('instance_name')}' is not a number: '{value}'"
+        )
+
+
+def _compose(frame, offset):
+    """Moves `frame` by `offset`, given in `frame`'s own coordinates."""
+    x, y, angle = frame
+    dx, dy, rotation = offset
+    radians = math.radians(angle)
+    cos_a, sin_a = math.cos(radians), math.sin(radians)
+    return (
+        x + dx * cos_a - dy * sin_a,
+        y + dx * sin_a + dy * cos_a,
+        angle + float(rotation),
+    )
+
+
+def draw_line(
+    from_coords,
+    to_coords,
+    scale=1,
+    from_leader=False,
+    to_leader=True,
+    indent=6,
+    stroke="black",
+    thickness=1,
+):
+    """
+    Generates SVG markup for a line with optional arrowheads.
+
+    Creates SVG elements for a line connecting two points, with optional arrowheads
+    at either or both ends. Coordinates are converted from inches to pixels (96 dpi)
+    with Y-axis flipped for SVG coordinate system.
+
+    **Args:**
+    - `from_coords` (tuple): Starting coordinates as `(x, y)` in inches.
+    - `to_coords` (tuple): Ending coordinates as `(x, y)` in inches.
+    - `scale` (float, optional): Scale factor for arrowhead size and line thickness. Defaults to `1`.
+    - `from_leader` (bool, optional): If `True`, draw an arrowhead at the start. Defaults to `False`.
+    - `to_leader` (bool, optional): If `True`, draw an arrowhead at the end. Defaults to `True`.
+    - `indent` (int, optional): Unused parameter (maintained for compatibility). Defaults to `6`.
+    - `stroke` (str, optional): Stroke color. Defaults to `"black"`.
+    - `thickness` (float, optional): Line thickness in pixels (before scaling). Defaults to `1`.
+
+    **Returns:**
+    - `str`: SVG markup string containing the line and arrowhead elements, or empty
+        string if coordinates are identical (zero-length line).
+    """
+    x1, y1 = from_coords[0] * 96, from_coords[1] * -96
+    x2, y2 = to_coords[0] * 96, to_coords[1] * -96
+    if (x1, y1) == (x2, y2):
+        return ""
+
+    stroke_width = thickness / scale
+    arrow_length = 8 / scale
+    arrow_width = 6 / scale
+
+    def arrowhead(tip_x, tip_y, from_x, from_y):
+        angle = math.atan2(tip_y - from_y, tip_x - from_x)
+        base_x = tip_x - arrow_length * math.cos(angle)
+        base_y = tip_y - arrow_length * math.sin(angle)
+        offset_x = arrow_width / 2 * math.sin(angle)
+        offset_y = arrow_width / 2 * -math.cos(angle)
+        points = [
+            (tip_x, tip_y),
+            (base_x + offset_x, base_y + offset_y),
+            (base_x - offset_x, base_y - offset_y),
+        ]
+        return (
+            f'<polygon points="{" ".join(f"{px:.3f},{py:.3f}" for px, py in points)}" '
+            f'fill="{stroke}"/>'
+        )
+
+    lines = [
+        f'<line x1="{x1:.3f}" y1="{y1:.3f}" x2="{x2:.3f}" y2="{y2:.3f}" '
+        f'stroke="{stroke}" stroke-width="{stroke_width:.3f}"/>'
+    ]
+    if from_leader:
+        lines.append(arrowhead(x1, y1, x2, y2))
+    if to_leader:
+        lines.append(arrowhead(x2, y2, x1, y1))
+    return "\n".join(lines)
@@ -0,0 +1,336 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from harnice import fileio
+
+"""
+incremental rendering (`harnice -r --incremental`)
+
+Every run_macro() call is recorded while it runs: which files it read, which files it
+wrote, and the contents of both. The record is stored under a key made of the macro's
+artifact_id, arguments and script. Next render, if a macro is called with the same key
+and every file it read still has the same contents, its outputs are restored from the
+record instead of running it again.
+
+Tracked automatically:
+    files opened from Python (open(), read_tsv, json.load, ...), for reading or writing
+    directory listings (compared as they stood at the end of the render that recorded them)
+    files passed as arguments to subprocesses (e.g. kicad-cli inputs)
+    the instances list, which is flushed at the start and end of each macro
+    every file under the macro's own directory, which catches subprocess outputs
+
+Not tracked: files a subprocess writes outside the macro's directory, and anything a
+macro does besides writing files.
+"""
+
+CACHE_DIRNAME = ".incremental_cache"
+
+_enabled = False
+_hook_installed = False
+
+# what the currently running macro has touched, or None outside of a recording
+_recording = None
+_recording_lock = threading.Lock()
+# set while the hook itself is reading files, so its own reads aren't recorded
+_in_hook = threading.local()
+
+# records waiting for finish() to fill in the directory listings they depend on
+_pending_records = []
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_TRUNC | os.O_APPEND
+
+
+def enable():
+    """
+    Turns on incremental rendering for the rest of this run.
+
+    Called by the CLI for `harnice -r --incremental`. From then on,
+    `feature_tree_utils.run_macro()` reuses the outputs of macros whose inputs haven't
+    changed since the last render.
+    """
+    global _enabled, _hook_installed
+    _enabled = True
+    if not _hook_installed:
+        sys.addaudithook(_audit_hook)
+        _hook_installed = True
+
+
+def finish():
+    """
+    Completes the records made during this render.
+
+    Directory listings a macro depended on are saved as they stand at the end of the
+    render, since later macros add their own files to the same folders. Records are only
+    reused once this has run, and the CLI only runs it after a render succeeds, so a
+    failed or interrupted render leaves nothing to reuse.
+    """
+    while _pending_records:
+        record_path, record, listings = _pending_records.pop(0)
+        for path in listings:
+            record["inputs"][path] = _file_hash(path)
+        record["complete"] = True
+        _write_json_atomically(record_path, record)
+
+
+def enabled():
+    """Returns `True` if incremental rendering is on."""
+    return _enabled
+
+
+def cache_directory():
+    """Returns the directory incremental render records are kept in: `.incremental_cache` in the rev directory."""
+    return os.path.join(fileio.rev_directory(), CACHE_DIRNAME)
+
+
+def run_cached(artifact_id, identity, script_path, artifact_directory, run):
+    """
+    Runs `run()`, or restores its outputs from a previous render if nothing it depends on changed.
+
+    **Args:**
+    - `artifact_id` (str): ID of the macro call, used in status messages and the cache key.
+    - `identity` (list): Everything else that identifies the call, e.g. part number, library and
+        keyword arguments. Compared by `repr`, so values should have a stable `repr`.
+    - `script_path` (str): Path of the script being run. Its contents are part of the cache key.
+    - `artifact_directory` (str): Directory the macro writes its outputs to. Everything in it is
+        treated as an output.
+    - `run` (callable): Runs the macro.
+    """
+    from harnice.lists import instances_list
+
+    key = _cache_key(artifact_id, identity, script_path)
+    record_path = os.path.join(cache_directory(), "records", f"{key}.json")
+    instances_list_path = fileio.path("instances list")
+
+    instances_list.flush()
+
+    record = _read_json(record_path)
+    if record.get("complete") and _inputs_unchanged(record.get("inputs", {})):
+        _restore_outputs(record.get("outputs", {}))
+        if _relative(instances_list_path) in record.get("outputs", {}):
+            instances_list.reload()
+        print(f"    {artifact_id}: inputs unchanged, reused outputs from last render")
+        return
+
+    artifact_before = _tree_hashes(artifact_directory)
+    recording = {"reads": {}, "writes": set(), "listings": set()}
+    recording["reads"][_relative(instances_list_path)] = _file_hash(
+        instances_list_path
+    )
+    _start_recording(recording)
+    try:
+        run()
+    finally:
+        _stop_recording()
+
+    instances_list.flush()
+
+    outputs = set(recording["writes"])
+    if recording["reads"][_relative(instances_list_path)] != _file_hash(
+        instances_list_path
+    ):
+        outputs.add(_relative(instances_list_path))
+    artifact_after = _tree_hashes(artifact_directory)
+    for path, file_hash in artifact_after.items():
+        if artifact_before.get(path) != file_hash:
+            outputs.add(_relative(path))
+    for path in artifact_before:
+        if path not in artifact_after:
+            outputs.add(_relative(path))
+
+    record = {
+        "artifact_id": artifact_id,
+        "inputs": recording["reads"],
+        "outputs": {path: _store_blob(path) for path in sorted(outputs)},
+    }
+    _write_json_atomically(record_path, record)
+    _pending_records.append((record_path, record, recording["listings"]))
+
+
+def _cache_key(artifact_id, identity, script_path):
+    key = hashlib.sha256()
+    key.update(repr([artifact_id, identity]).encode("utf-8"))
+    key.update(_file_hash(script_path).encode("utf-8"))
+    return key.hexdigest()
+
+
+def _start_recording(recording):
+    global _recording
+    # reads answered from harnice's in-process caches never reach open(), so start
+    # those caches empty to make every read inside the macro visible
+    from harnice.products import chtype
+
+    fileio.invalidate_tsv_cache()
+    chtype.clear_registries()
+    with _recording_lock:
+        _recording = recording
+
+
+def _stop_recording():
+    global _recording
+    with _recording_lock:
+        _recording = None
+
+
+def _audit_hook(event, args):
+    recording = _recording
+    if recording is None or getattr(_in_hook, "active", False):
+        return
+    if event not in ("open", "os.listdir", "os.scandir", "subprocess.Popen"):
+        return
+
+    _in_hook.active = True
+    try:
+        if event == "open":
+            path, mode, flags = args
+            if isinstance(path, int) or path is None:
+                return
+            path = os.fsdecode(path)
+            if mode is not None:
+                writes = any(c in mode for c in "wax+")
+                keeps_contents = "a" in mode or "r+" in mode
+            else:
+                writes = bool(flags & _WRITE_FLAGS)
+                keeps_contents = writes and not flags & os.O_TRUNC
+            if _ignored(path):
+                return
+            relpath = _relative(path)
+            # what a file held before the macro first touched it is an input, unless
+            # the macro replaced it outright
+            if relpath not in recording["reads"] and relpath not in recording["writes"]:
+                if keeps_contents or not writes:
+                    recording["reads"][relpath] = _file_hash(path)
+            if writes:
+                recording["writes"].add(relpath)
+
+        elif event in ("os.listdir", "os.scandir"):
+            path = os.fsdecode(args[0]) if args[0] is not None else "."
+            if not _ignored(path):
+                recording["listings"].add(_relative(path))
+
+        elif event == "subprocess.Popen":
+            arguments = args[1]
+            if isinstance(arguments, (str, bytes)):
+                arguments = [arguments]
+            for argument in arguments or []:
+                if not isinstance(argument, (str, bytes, os.PathLike)):
+                    continue
+                path = os.fsdecode(argument)
+                if os.path.isfile(path) and not _ignored(path):
+                    relpath = _relative(path)
+                    if relpath not in recording["reads"]:
+                        recording["reads"][relpath] = _file_hash(path)
+    except Exception:
+        # never let bookkeeping break the macro itself
+        pass
+    finally:
+        _in_hook.active = False
+
+
+def _ignored(path):
+    """Files that aren't inputs to the render: Python's own modules and the caches themselves."""
+    from harnice.utils import tool_utils
+
+    path = os.path.abspath(path)
+    if "__pycache__" in path:
+        return True
+    for prefix in {sys.prefix, sys.base_prefix, os.path.dirname(os.__file__)}:
+        if path.startswith(os.path.abspath(prefix) + os.sep):
+            return True
+    tool_cache = tool_utils.cache_directory()
+    if tool_cache is not None and path.startswith(tool_cache + os.sep):
+        return True
+    return path.startswith(cache_directory() + os.sep)
+
+
+def _relative(path):
+    """Paths inside the rev directory are recorded relative to it."""
+    path = os.path.abspath(path)
+    rev_directory = fileio.rev_directory()
+    if path.startswith(rev_directory + os.sep):
+        return os.path.relpath(path, rev_directory)
+    return path
+
+
+def _absolute(relpath):
+    return os.path.join(fileio.rev_directory(), relpath)
+
+
+def _file_hash(path):
+    """Hash of a file's contents, a directory's listing, or `None` if it doesn't exist."""
+    path = _absolute(path)
+    if os.path.isdir(path):
+        listing = "\n".join(sorted(os.listdir(path)))
+        return "dir:" + hashlib.sha256(listing.encode("utf-8")).hexdigest()
+    try:
+        file_hash = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+    except OSError:
+        return None
+
+
+def _tree_hashes(directory):
+    hashes = {}
+    for dirpath, dirnames, filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            hashes[path] = _file_hash(path)
+    return hashes
+
+
+def _inputs_unchanged(inputs):
+    for path, file_hash in inputs.items():
+        if _file_hash(path) != file_hash:
+            return False
+    return True
+
+
+def _store_blob(path):
+    """Copy an output into the cache and return its hash, or `None` if the file was deleted."""
+    absolute_path = _absolute(path)
+    if not os.path.isfile(absolute_path):
+        return None
+    file_hash = _file_hash(absolute_path)
+    blob_path = os.path.join(cache_directory(), "blobs", file_hash)
+    if not os.path.exists(blob_path):
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(blob_path))
+        os.close(fd)
+        shutil.copyfile(absolute_path, temp_path)
+        os.replace(temp_path, blob_path)
+    return file_hash
+
+
+def _restore_outputs(outputs):
+    for path, file_hash in outputs.items():
+        absolute_path = _absolute(path)
+        if file_hash is None:
+            fileio.silentremove(absolute_path)
+        elif _file_hash(absolute_path) != file_hash:
+            os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+            shutil.copyfile(
+                os.path.join(cache_directory(), "blobs", file_hash), absolute_path
+            )
+        fileio.invalidate_tsv_cache(absolute_path)
+
+
+def _read_json(filepath):
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json_atomically(filepath, data):
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(filepath), suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    os.replace(temp_path, filepath)
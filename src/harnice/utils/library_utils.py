@@ -3,9 +3,13 @@ import re
 import shutil
 import filecmp
 import json
+import hashlib
+import tempfile
+from threading import Lock
 from harnice import fileio
 from harnice.lists import instances_list, library_history, rev_history
 from harnice.cli import print_import_status
+from harnice.utils import profile_utils
 
 """
 where a part lands in a project after it's been imported:
@@ -54,6 +58,49 @@ def pull(input_dict, update_instances_list=True, destination_directory=None):
     - `ValueError`: If required fields (`lib_repo`, `mpn`, `item_type`) are blank.
     - `FileNotFoundError`: If no revision folders are found for the part number in the library.
     """
+    imported_part = import_part(input_dict, destination_directory)
+
+    if update_instances_list:
+        instances_list.bulk_modify(
+            {imported_part["instance_name"]: imported_part["update_contents"]},
+            on_missing="create",
+        )
+
+    library_history.append(
+        imported_part["instance_name"], imported_part["update_contents"]
+    )
+
+    _print_import_status(imported_part)
+    return imported_part["destination_directory"]
+
+
+def import_part(input_dict, destination_directory=None):
+    """
+    Copies a part from the library into the project without recording it anywhere.
+
+    This is steps 1-4 of `pull()`: it validates `input_dict`, picks the revision,
+    imports the library revision and copies editable files, then gathers the library
+    metadata. It doesn't touch the instances list or library history, so several parts
+    can be imported at once on different threads. Pass the results to
+    `apply_imports()` to record them.
+
+    **Args:**
+    - `input_dict` (dict): Same as for `pull()`.
+    - `destination_directory` (str, optional): Same as for `pull()`.
+
+    **Returns:**
+    - `dict`: The imported part, with keys `instance_name`, `item_type`,
+        `destination_directory`, `import_state` and `update_contents` (the
+        instances list columns to set).
+
+    **Raises:**
+    - Same as `pull()`.
+    """
+    with profile_utils.stage("pull", input_dict.get("instance_name")):
+        return _import_part(input_dict, destination_directory)
+
+
+def _import_part(input_dict, destination_directory):
     # throw errors if required fields are blank
     if input_dict.get("lib_repo") in [None, ""]:
         raise ValueError(
@@ -124,21 +171,29 @@ def pull(input_dict, update_instances_list=True, destination_directory=None):
         rev_to_use = highest_source_rev
         import_state = f"imported latest (rev{rev_to_use})"
 
-    # === Import library contents freshly every time
+    # === Import library contents (skipped if the import is already current)
     lib_used_path = os.path.join(destination_directory, "library_used_do_not_edit")
     os.makedirs(lib_used_path, exist_ok=True)
 
     lib_used_rev_path = os.path.join(
         lib_used_path, f"{input_dict.get('mpn')}-rev{rev_to_use}"
     )
-    if os.path.exists(lib_used_rev_path):
-        shutil.rmtree(lib_used_rev_path)
 
     source_lib_rev_path = os.path.join(
         source_lib_path, f"{input_dict.get('mpn')}-rev{rev_to_use}"
     )
 
-    shutil.copytree(source_lib_rev_path, lib_used_rev_path)
+    import_library_rev(
+        source_lib_rev_path,
+        lib_used_rev_path,
+        key=[
+            lib_repo,
+            input_dict.get("item_type"),
+            input_dict.get("lib_subpath", ""),
+            input_dict.get("mpn"),
+            str(rev_to_use),
+        ],
+    )
 
     # === Copy editable files into the editable directory only if not already present
     rename_suffixes = [
@@ -239,38 +294,288 @@ def pull(input_dict, update_instances_list=True, destination_directory=None):
         "attributes_json": attributes_data
     }
 
+    return {
+        "instance_name": input_dict.get("instance_name"),
+        "item_type": input_dict.get("item_type"),
+        "destination_directory": destination_directory,
+        "import_state": import_state,
+        "update_contents": update_contents,
+    }
+
+
+def apply_imports(imported_parts, update_instances_list=True):
+    """
+    Records parts returned by `import_part()` in the project.
+
+    Steps 5 and 6 of `pull()` for a batch of parts: the instances list is updated in
+    one `bulk_modify` and the library history in one append. Import statuses are
+    printed in the order the parts are given.
+
+    **Args:**
+    - `imported_parts` (list): Results of `import_part()`.
+    - `update_instances_list` (bool, optional): If `True`, updates the instances list
+        with library metadata. Defaults to `True`.
+    """
     if update_instances_list:
-        try:
-            instances_list.modify(input_dict.get("instance_name"), update_contents)
-        except ValueError:
-            instances_list.new_instance(
-                input_dict.get("instance_name"), update_contents
-            )
+        instances_list.bulk_modify(
+            {
+                imported_part["instance_name"]: imported_part["update_contents"]
+                for imported_part in imported_parts
+            },
+            on_missing="create",
+        )
+
+    library_history.bulk_append(
+        [
+            (imported_part["instance_name"], imported_part["update_contents"])
+            for imported_part in imported_parts
+        ]
+    )
+
+    for imported_part in imported_parts:
+        _print_import_status(imported_part)
 
-    library_history.append(input_dict.get("instance_name"), update_contents)
 
+def _print_import_status(imported_part):
     print_import_status(
-        input_dict.get("instance_name"),
-        input_dict.get("item_type"),
-        update_contents.get("lib_status"),
-        import_state,
+        imported_part["instance_name"],
+        imported_part["item_type"],
+        imported_part["update_contents"].get("lib_status"),
+        imported_part["import_state"],
         os.path.basename(
-            os.path.dirname(os.path.dirname(os.path.dirname(destination_directory)))
+            os.path.dirname(
+                os.path.dirname(os.path.dirname(imported_part["destination_directory"]))
+            )
         ),
     )
-    return destination_directory
+
+
+IMPORT_STORE_ENV_VAR = "HARNICE_IMPORT_STORE"
+
+
+def import_store_path():
+    """
+    Returns the directory of the content-addressed library import store.
+
+    Defaults to `import_store` at the root of the Harnice repo. Set the
+    `HARNICE_IMPORT_STORE` environment variable to use another directory, or to `off`
+    to copy every import directly from the library.
+
+    **Returns:**
+    - `str` or `None`: Path to the store, or `None` if the store is turned off.
+    """
+    value = os.environ.get(IMPORT_STORE_ENV_VAR, "").strip()
+    if value.lower() in ["off", "0", "false"]:
+        return None
+    if value:
+        return os.path.expanduser(value)
+    return os.path.join(fileio.harnice_root(), "import_store")
+
+
+def import_library_rev(source_lib_rev_path, lib_used_rev_path, key):
+    """
+    Makes `lib_used_rev_path` an exact copy of a library revision folder.
+
+    Library revisions are kept in a content-addressed store (see `import_store_path`)
+    and imported as hardlinks to the stored files, falling back to plain copies where
+    hardlinks aren't supported. Nothing is written at all if `lib_used_rev_path`
+    already holds the same contents from a previous import.
+
+    **Args:**
+    - `source_lib_rev_path` (str): Revision folder in the library, e.g.
+        `.../device/mydevice/mydevice-rev1`.
+    - `lib_used_rev_path` (str): Destination folder inside `library_used_do_not_edit`.
+    - `key` (list): Identifies the library revision in the store, e.g.
+        `[lib_repo, item_type, lib_subpath, mpn, rev]`.
+    """
+    store = import_store_path()
+    if store is None:
+        _replace_tree(source_lib_rev_path, lib_used_rev_path)
+        return
+
+    # The tree hash of the library folder is only recomputed when a file in it changes
+    source_signature = _tree_signature(source_lib_rev_path)
+    key_digest = hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+    index_path = os.path.join(store, "index", f"{key_digest}.json")
+    index = _read_json(index_path)
+    if index.get("signature") == source_signature:
+        tree_hash = index.get("tree_hash")
+    else:
+        tree_hash = _tree_hash(source_lib_rev_path, source_signature)
+        _write_json_atomically(
+            index_path,
+            {"key": key, "signature": source_signature, "tree_hash": tree_hash},
+        )
+
+    # Skip the import if the destination still matches what was imported last time.
+    # The manifest sits next to the folder, not inside it, so it isn't imported itself.
+    manifest_path = f"{lib_used_rev_path}.import.json"
+    manifest = _read_json(manifest_path)
+    if (
+        manifest.get("tree_hash") == tree_hash
+        and os.path.isdir(lib_used_rev_path)
+        and _tree_signature(lib_used_rev_path) == manifest.get("signature")
+    ):
+        return
+
+    with _store_lock(tree_hash):
+        entry_path = _store_entry(
+            store, tree_hash, source_lib_rev_path, source_signature
+        )
+    if entry_path is None:
+        # the library changed while it was being stored
+        _replace_tree(source_lib_rev_path, lib_used_rev_path)
+        fileio.silentremove(manifest_path)
+        return
+
+    if os.path.exists(lib_used_rev_path):
+        shutil.rmtree(lib_used_rev_path)
+    _link_tree(entry_path, lib_used_rev_path)
+    _write_json_atomically(
+        manifest_path,
+        {"tree_hash": tree_hash, "signature": _tree_signature(lib_used_rev_path)},
+    )
+
+
+# tree hash -> Lock, so parallel imports of the same contents don't both rebuild the
+# store entry while the other is linking from it
+_store_locks = {}
+_store_locks_guard = Lock()
+
+
+def _store_lock(tree_hash):
+    with _store_locks_guard:
+        return _store_locks.setdefault(tree_hash, Lock())
+
+
+def _replace_tree(source, destination):
+    if os.path.exists(destination):
+        shutil.rmtree(destination)
+    shutil.copytree(source, destination)
+
+
+def _tree_signature(root):
+    """Return `[relpath, size, mtime_ns]` for everything under `root`, in a stable order. Directories have size -1."""
+    signature = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for dirname in dirnames:
+            relpath = os.path.relpath(os.path.join(dirpath, dirname), root)
+            signature.append([relpath.replace(os.sep, "/"), -1, 0])
+        for filename in sorted(filenames):
+            filepath = os.path.join(dirpath, filename)
+            stat = os.stat(filepath)
+            relpath = os.path.relpath(filepath, root).replace(os.sep, "/")
+            signature.append([relpath, stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def _tree_hash(root, signature):
+    tree_hash = hashlib.sha256()
+    for relpath, size, _ in signature:
+        tree_hash.update(relpath.encode("utf-8") + b"\0")
+        if size < 0:
+            tree_hash.update(b"dir\0")
+            continue
+        file_hash = hashlib.sha256()
+        with open(os.path.join(root, *relpath.split("/")), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                file_hash.update(chunk)
+        tree_hash.update(file_hash.digest())
+    return tree_hash.hexdigest()
+
+
+def _store_entry(store, tree_hash, source, source_signature):
+    """Return the store folder holding `tree_hash`, adding it from `source` if needed.
+
+    Returns `None` if `source` changed while being copied into the store.
+    """
+    entries_path = os.path.join(store, "entries")
+    entry_path = os.path.join(entries_path, tree_hash)
+    entry_manifest_path = f"{entry_path}.json"
+
+    # Store files are shared with every import through hardlinks, so check that none of
+    # them were edited in place since the entry was made
+    if os.path.isdir(entry_path) and _tree_signature(entry_path) == _read_json(
+        entry_manifest_path
+    ).get("signature"):
+        return entry_path
+
+    os.makedirs(entries_path, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(dir=entries_path, prefix=".tmp-")
+    try:
+        temp_entry_path = os.path.join(temp_dir, "tree")
+        shutil.copytree(source, temp_entry_path)
+        if _tree_signature(source) != source_signature:
+            return None
+        signature = _tree_signature(temp_entry_path)
+        if os.path.exists(entry_path):
+            shutil.rmtree(entry_path, ignore_errors=True)
+        try:
+            os.rename(temp_entry_path, entry_path)
+        except OSError:
+            # another import stored the same contents first
+            if not os.path.isdir(entry_path):
+                raise
+            signature = _tree_signature(entry_path)
+        _write_json_atomically(entry_manifest_path, {"signature": signature})
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return entry_path
+
+
+def _link_tree(source, destination):
+    use_links = True
+    for dirpath, dirnames, filenames in os.walk(source):
+        target_dir = os.path.join(destination, os.path.relpath(dirpath, source))
+        os.makedirs(target_dir, exist_ok=True)
+        for filename in filenames:
+            source_file = os.path.join(dirpath, filename)
+            target_file = os.path.join(target_dir, filename)
+            if use_links:
+                try:
+                    os.link(source_file, target_file)
+                    continue
+                except OSError:
+                    # e.g. store and project on different drives
+                    use_links = False
+            shutil.copy2(source_file, target_file)
+
+
+def _read_json(filepath):
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json_atomically(filepath, data):
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(filepath), prefix=".tmp-", suffix=".json"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        fileio.silentremove(temp_path)
+        raise
 
 
 def get_local_path(lib_repo):
     """
     Looks up the local filesystem path for a library repository URL.
 
-    Reads the `library_locations.csv` file to find the mapping between a library
-    repository URL and its local filesystem path. If the CSV file doesn't exist,
-    it creates one with a default entry for the `harnice-library-public` repository.
+    Looks the URL up in the library locations files (see `fileio.location_files`): an
+    optional file named by the `HARNICE_LIBRARY_LOCATIONS` environment variable, then the
+    nearest `library_locations.csv` in the current directory or its parents, then the
+    `library_locations.csv` at the root of the Harnice repo. Each file is read once per
+    run and re-read only when it changes.
 
-    The lookup is case-insensitive. The local path is expanded (e.g., `~` is expanded
-    to the user's home directory).
+    The lookup is case-insensitive and ignores a trailing `/` or `.git`. The local path
+    is expanded (e.g., `~` is expanded to the user's home directory).
 
     **Args:**
     - `lib_repo` (str): Library repository URL to look up (e.g.,
@@ -280,63 +585,18 @@ def get_local_path(lib_repo):
     - `str`: Local filesystem path to the library repository.
 
     **Raises:**
-    - `ValueError`: If the library repository URL is not found in the CSV file,
-        or if no local path is specified for the repository.
+    - `ValueError`: If the library repository URL is not found in any library locations
+        file, or if no local path is specified for the repository.
     """
-    csv_path = fileio.path("library locations")  # path to library_locations.csv
-
-    # ----------------------------------------------------
-    # If file does not exist, auto-generate with default
-    # ----------------------------------------------------
-    if not os.path.exists(csv_path):
-        # Determine base directory of the Harnice repo
-        # (__file__) → .../harnice/utils/library_utils.py
-        # dirname 3 times → repo root
-        repo_root = os.path.dirname(
-            os.path.dirname(
-                os.path.dirname(
-                    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                )
-            )
-        )
-
-        default_local_path = os.path.join(repo_root, "harnice-library-public")
-
-        # Ensure the directory exists for the CSV
-        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
-
-        with open(csv_path, "w", encoding="utf-8") as f:
-            # Normalize the default path to ensure correct separators
-            normalized_path = os.path.normpath(default_local_path)
-            f.write(f"https://github.com/harnice/harnice,{normalized_path}\n")
-
-        print(f"[harnice] Created '{csv_path}'")
-        print(f"[harnice] Default library-public location: {default_local_path}")
-
-    # ----------------------------------------------------
-    # Normal lookup (with BOM-safe decoding)
-    # ----------------------------------------------------
-    with open(csv_path, newline="", encoding="utf-8-sig") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-
-            parts = line.split(",")
-            if len(parts) < 2:
-                continue
-
-            url = parts[0].strip()
-            local = parts[1].strip()
-
-            # Case-insensitive match
-            if url.lower() == lib_repo.lower().strip():
-                if not local:
-                    raise ValueError(f"No local path found for '{lib_repo}'")
-                # Expand user directory (~) and normalize path separators for current platform
-                expanded_path = os.path.expanduser(local)
-                # Normalize separators - os.path.normpath() converts forward slashes to
-                # backslashes on Windows, ensuring proper path format
-                return os.path.normpath(expanded_path)
-
-    raise ValueError(f"'{lib_repo}' not found in library locations. Check your library locations file at {csv_path}")
+    local = fileio.lookup_location("library locations", lib_repo)
+
+    if local is None:
+        raise ValueError(f"'{lib_repo}' not found in library locations. Check your library locations file at {fileio.path('library locations')}")
+    if not local:
+        raise ValueError(f"No local path found for '{lib_repo}'")
+
+    # Expand user directory (~) and normalize path separators for current platform
+    expanded_path = os.path.expanduser(local)
+    # Normalize separators - os.path.normpath() converts forward slashes to
+    # backslashes on Windows, ensuring proper path format
+    return os.path.normpath(expanded_path)
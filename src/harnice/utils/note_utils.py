@@ -1,4 +1,3 @@
-import ast
 from harnice import fileio
 from harnice.lists import instances_list, rev_history
 from harnice import state
@@ -46,11 +45,8 @@ def new_note(
     # Normalize new affectedinstances
     new_affected_instances = affectedinstances or []
     if isinstance(new_affected_instances, str):
-        import ast
-
-        try:
-            new_affected_instances = ast.literal_eval(new_affected_instances)
-        except Exception:
+        new_affected_instances = fileio.decode_cell(new_affected_instances)
+        if isinstance(new_affected_instances, str):
             raise ValueError(f"Malformed affectedinstances value: {affectedinstances}")
 
     # ------------------------------------------------------------
@@ -60,11 +56,8 @@ def new_note(
         # Parse existing list safely
         old_affected_instances_raw = existing.get("note_affected_instances")
         if isinstance(old_affected_instances_raw, str):
-            import ast
-
-            try:
-                old_affected_instances = ast.literal_eval(old_affected_instances_raw)
-            except Exception:
+            old_affected_instances = fileio.decode_cell(old_affected_instances_raw)
+            if isinstance(old_affected_instances, str):
                 old_affected_instances = []
         else:
             old_affected_instances = old_affected_instances_raw or []
@@ -119,14 +112,16 @@ def assign_buildnote_numbers():
     set as both the `note_number` and `print_name` fields.
     """
     build_note_counter = 0
+    changes = {}
     for instance in fileio.read_tsv("instances list"):
         if instance.get("note_type") == "build_note":
             if instance.get("item_type") == "note":
                 build_note_counter += 1
-            instances_list.modify(
-                instance.get("instance_name"),
-                {"note_number": build_note_counter, "print_name": build_note_counter},
-            )
+            changes[instance.get("instance_name")] = {
+                "note_number": build_note_counter,
+                "print_name": build_note_counter,
+            }
+    instances_list.bulk_modify(changes)
 
 
 def make_rev_history_notes(rev):
@@ -303,9 +298,8 @@ def parse_note_instance(instance):
     for key, value in instance.items():
         if key == "note_affected_instances":
             if isinstance(value, str) and value.strip():
-                try:
-                    parsed[key] = ast.literal_eval(value)
-                except Exception:
+                parsed[key] = fileio.decode_cell(value)
+                if isinstance(parsed[key], str):
                     parsed[key] = []  # fallback if malformed
             else:
                 parsed[key] = []
@@ -318,7 +312,7 @@ def parse_note_instance(instance):
 def get_lib_build_notes(instance):
     """
     Returns list of build_notes for this instance from the TSV row.
-    Safely parses with ast.literal_eval.
+    Safely decoded with fileio.decode_cell.
     Always returns a Python list.
     """
 
@@ -327,22 +321,15 @@ def get_lib_build_notes(instance):
     if not raw or raw in ["", None]:
         return []
 
-    try:
-        # Expecting a string representation of a list
-        parsed = ast.literal_eval(raw)
-
-        # Ensure it's actually a list
-        return parsed if isinstance(parsed, list) else []
-
-    except Exception:
-        # Malformed literal → fail safe
-        return []
+    # Expecting an encoded list; anything else (including a malformed cell) → fail safe
+    parsed = fileio.decode_cell(raw)
+    return parsed if isinstance(parsed, list) else []
 
 
 def get_lib_tools(instance):
     """
     Returns list of tools for this instance from the TSV row.
-    Safely parses with ast.literal_eval.
+    Safely decoded with fileio.decode_cell.
     Always returns a Python list.
     """
 
@@ -351,16 +338,9 @@ def get_lib_tools(instance):
     if not raw or raw in ["", None]:
         return []
 
-    try:
-        # Expecting a string representation of a list
-        parsed = ast.literal_eval(raw)
-
-        # Ensure it's actually a list
-        return parsed if isinstance(parsed, list) else []
-
-    except Exception:
-        # Malformed literal → fail safe
-        return []
+    # Expecting an encoded list; anything else (including a malformed cell) → fail safe
+    parsed = fileio.decode_cell(raw)
+    return parsed if isinstance(parsed, list) else []
 
 
 def combine_notes(keep_note_text, merge_note_texts, note_type=None):
@@ -0,0 +1,338 @@
+import os
+import sys
+import csv
+import json
+import time
+import threading
+import subprocess
+from contextlib import contextmanager, nullcontext
+
+"""
+render profiling (`harnice -r --profile`)
+
+While profiling is on, the render is split into stages:
+    run_macro        one per feature_tree_utils.run_macro() artifact_id
+    pull             one per part imported by library_utils.pull() / import_part()
+    instances_list   one per kind of instances list mutation (insert, update, ...)
+    subprocess       one per external program (inkscape, kicad-cli, ...)
+    tool             one per external program run through tool_utils.run(), cached or not
+
+Each stage records wall time, CPU time, files opened for reading and writing, their
+sizes, rows read through fileio.read_tsv() and instances list rows changed. Stages
+nest: a stage's figures include those of the stages running inside it on the same
+thread. Parts imported on worker threads (see system_utils.make_instances_from_bom)
+are counted in their own pull stages only.
+
+At the end of the render the figures are written to `<pn-rev>-render_profile.json` and
+`<pn-rev>-render_profile.tsv` in the rev directory and a summary table is printed.
+"""
+
+REPORT_COLUMNS = [
+    "kind",
+    "name",
+    "calls",
+    "wall_s",
+    "cpu_s",
+    "files_read",
+    "bytes_read",
+    "files_written",
+    "bytes_written",
+    "rows_read",
+    "rows_changed",
+]
+
+_COUNTERS = REPORT_COLUMNS[2:]
+
+_enabled = False
+_hook_installed = False
+_original_run = None
+
+# (kind, name) -> counters, totalled over every time that stage ran
+_totals = {}
+_totals_lock = threading.Lock()
+_render_started = None
+
+# per-thread stack of stages currently running
+_local = threading.local()
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_TRUNC | os.O_APPEND
+
+_NOT_PROFILED = nullcontext()
+
+
+def enable():
+    """
+    Turns on render profiling for the rest of this run.
+
+    Called by the CLI for `harnice -r --profile`. Use `stage()` to mark the parts of the
+    render to measure and `finish()` to write the report.
+    """
+    global _enabled, _hook_installed, _original_run, _render_started
+    _enabled = True
+    _render_started = (time.perf_counter(), _cpu_time())
+    if not _hook_installed:
+        sys.addaudithook(_audit_hook)
+        _hook_installed = True
+    if subprocess.run is not _profiled_run:
+        _original_run = subprocess.run
+        subprocess.run = _profiled_run
+
+
+def enabled():
+    """Returns `True` if render profiling is on."""
+    return _enabled
+
+
+def stage(kind, name):
+    """
+    Context manager that measures everything done inside it as one stage.
+
+    Returns a do-nothing context manager when profiling is off, so it can be left in
+    place around hot code.
+
+    **Args:**
+    - `kind` (str): Kind of stage, e.g. `"run_macro"` or `"pull"`.
+    - `name` (str): Which one, e.g. the macro's artifact_id. Stages with the same kind and
+        name are added together in the report.
+    """
+    if not _enabled:
+        return _NOT_PROFILED
+    return _stage(kind, str(name))
+
+
+def count_rows(read=0, changed=0):
+    """
+    Adds rows to the stages running on this thread.
+
+    **Args:**
+    - `read` (int): Rows read from a list file.
+    - `changed` (int): Instances list rows added, changed or removed.
+    """
+    if not _enabled:
+        return
+    for frame in _stack():
+        frame["rows_read"] += read
+        frame["rows_changed"] += changed
+
+
+def report():
+    """
+    Returns the figures recorded so far.
+
+    **Returns:**
+    - `dict`: `render` holds the wall and CPU time since `enable()`; `stages` is a list of
+        dicts with the keys in `REPORT_COLUMNS`, slowest first.
+    """
+    with _totals_lock:
+        stages = [
+            {"kind": kind, "name": name, **counters}
+            for (kind, name), counters in _totals.items()
+        ]
+    for row in stages:
+        row["wall_s"] = round(row["wall_s"], 6)
+        row["cpu_s"] = round(row["cpu_s"], 6)
+    stages.sort(key=lambda row: row["wall_s"], reverse=True)
+
+    render = {}
+    if _render_started is not None:
+        render = {
+            "wall_s": round(time.perf_counter() - _render_started[0], 6),
+            "cpu_s": round(_cpu_time() - _render_started[1], 6),
+        }
+    return {"render": render, "stages": stages}
+
+
+def finish(rev_directory=None, top=15):
+    """
+    Turns profiling off, writes the profile report and prints a summary table.
+
+    `subprocess.run` is put back as it was before `enable()`, even if writing the report
+    fails.
+
+    **Args:**
+    - `rev_directory` (str, optional): Where to write the report. Defaults to
+        `fileio.rev_directory()`.
+    - `top` (int, optional): Number of slowest stages to print. Defaults to 15.
+
+    **Returns:**
+    - `str`: Path to the JSON report.
+    """
+    from harnice import fileio, state
+    import harnice
+
+    # the report's own files aren't part of the render
+    global _enabled
+    _enabled = False
+    if subprocess.run is _profiled_run:
+        subprocess.run = _original_run
+
+    result = report()
+    result["harnice_version"] = getattr(harnice, "__version__", "")
+    result["partnumber"] = state.partnumber("pn-rev")
+
+    if rev_directory is None:
+        rev_directory = fileio.rev_directory()
+    base = os.path.join(rev_directory, f"{state.partnumber('pn-rev')}-render_profile")
+
+    with open(f"{base}.json", "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    with open(f"{base}.tsv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS, delimiter="\t")
+        writer.writeheader()
+        writer.writerows(result["stages"])
+    fileio.invalidate_tsv_cache(f"{base}.tsv")
+
+    _print_summary(result, top)
+    print(f"Profile written to {base}.json")
+    return f"{base}.json"
+
+
+def _print_summary(result, top):
+    headers = ["kind", "name", "calls", "wall_s", "cpu_s", "files_r", "files_w", "rows"]
+    lines = []
+    for row in result["stages"][:top]:
+        name = row["name"]
+        if len(name) > 40:
+            name = "..." + name[-37:]
+        lines.append(
+            [
+                row["kind"],
+                name,
+                str(row["calls"]),
+                f"{row['wall_s']:.3f}",
+                f"{row['cpu_s']:.3f}",
+                str(row["files_read"]),
+                str(row["files_written"]),
+                str(row["rows_read"] + row["rows_changed"]),
+            ]
+        )
+    widths = [
+        max([len(header)] + [len(line[i]) for line in lines])
+        for i, header in enumerate(headers)
+    ]
+
+    print()
+    if result["render"]:
+        print(
+            f"Render took {result['render']['wall_s']:.3f}s "
+            f"({result['render']['cpu_s']:.3f}s CPU)"
+        )
+    print("  ".join(header.ljust(width) for header, width in zip(headers, widths)))
+    print("  ".join("-" * width for width in widths))
+    for line in lines:
+        print("  ".join(cell.ljust(width) for cell, width in zip(line, widths)))
+    if len(result["stages"]) > top:
+        print(f"... {len(result['stages']) - top} more stages in the report")
+
+
+def _cpu_time():
+    """CPU time of this process and the subprocesses it has waited for."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+@contextmanager
+def _stage(kind, name):
+    frame = {counter: 0 for counter in _COUNTERS}
+    frame["written"] = set()
+    stack = _stack()
+    stack.append(frame)
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield
+    finally:
+        frame["wall_s"] = time.perf_counter() - wall_start
+        frame["cpu_s"] += time.thread_time() - cpu_start
+        stack.pop()
+
+        # written files are measured once the stage is done with them
+        _local.in_hook = True
+        try:
+            for path in frame.pop("written"):
+                try:
+                    frame["bytes_written"] += os.path.getsize(path)
+                except OSError:
+                    pass
+        finally:
+            _local.in_hook = False
+
+        # a subprocess's CPU time belongs to the stages that ran it
+        child_cpu = frame.pop("child_cpu_s", 0)
+        for parent in stack:
+            parent["cpu_s"] += child_cpu
+
+        frame["calls"] = 1
+        with _totals_lock:
+            totals = _totals.setdefault(
+                (kind, name), {counter: 0 for counter in _COUNTERS}
+            )
+            for counter in _COUNTERS:
+                totals[counter] += frame[counter]
+
+
+def _profiled_run(*args, **kwargs):
+    if not _enabled:
+        return _original_run(*args, **kwargs)
+    command = args[0] if args else kwargs.get("args")
+    if isinstance(command, (list, tuple)) and command:
+        command = command[0]
+    name = os.path.basename(os.fsdecode(command)) if command else "subprocess"
+    children_before = os.times()
+    with _stage("subprocess", name):
+        frame = _stack()[-1]
+        try:
+            return _original_run(*args, **kwargs)
+        finally:
+            children_after = os.times()
+            # child CPU time isn't thread time, so add it on top
+            child_cpu = (
+                children_after.children_user - children_before.children_user
+            ) + (children_after.children_system - children_before.children_system)
+            frame["cpu_s"] += child_cpu
+            frame["child_cpu_s"] = child_cpu
+
+
+def _audit_hook(event, args):
+    if not _enabled or event != "open":
+        return
+    stack = getattr(_local, "stack", None)
+    if not stack or getattr(_local, "in_hook", False):
+        return
+
+    _local.in_hook = True
+    try:
+        path, mode, flags = args
+        if isinstance(path, int) or path is None:
+            return
+        path = os.fsdecode(path)
+        if "__pycache__" in path:
+            return
+        if mode is not None:
+            writes = any(c in mode for c in "wax+")
+        else:
+            writes = bool(flags & _WRITE_FLAGS)
+        if writes:
+            for frame in stack:
+                frame["files_written"] += 1
+                frame["written"].add(path)
+        else:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            for frame in stack:
+                frame["files_read"] += 1
+                frame["bytes_read"] += size
+    except Exception:
+        # never let bookkeeping break the render itself
+        pass
+    finally:
+        _local.in_hook = False
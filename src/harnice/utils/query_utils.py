@@ -0,0 +1,349 @@
+import os
+import sqlite3
+import threading
+from harnice import fileio
+from harnice.lists import instances_list
+
+"""
+SQL queries over the lists of the current product
+
+The instances list, circuits list, channel map, disconnect map and system connector list
+are loaded into an in-memory SQLite database, one table each, with indexes on the
+columns they are usually joined on. Lists the current product doesn't have are left
+out. Nothing is written to disk and no server is involved.
+
+Every column is TEXT and holds exactly what the TSV cell holds, so comparisons behave
+like comparing `fileio.read_tsv()` values: blank cells are `''`, not NULL, and numbers
+have to be cast (`CAST(length AS REAL)`) to be compared as numbers.
+
+The database is rebuilt when one of its lists changes on disk or in the open instances
+list session, and reused otherwise, so it is cheap to query it inside a loop.
+"""
+
+# table name -> file key of the list it is loaded from
+TABLES = {
+    "instances": "instances list",
+    "circuits": "circuits list",
+    "channel_map": "channel map",
+    "disconnect_map": "disconnect map",
+    "system_connector_list": "system connector list",
+}
+
+# columns that get an index, per table, when the list has them
+INDEXES = {
+    "instances": ["instance_name"] + instances_list.INDEXED_COLUMNS,
+    "circuits": ["net", "circuit_id", "net_from_refdes", "net_to_refdes"],
+    "channel_map": ["merged_net", "from_device_refdes", "to_device_refdes"],
+    "disconnect_map": [
+        "A-side_device_refdes",
+        "B-side_device_refdes",
+        "disconnect_refdes",
+    ],
+    "system_connector_list": ["device_refdes", "net", "merged_net"],
+}
+
+# one cached database per thread: sqlite3 connections can't be shared between threads
+_local = threading.local()
+
+
+def database(tables=None):
+    """
+    Returns an in-memory SQLite database holding the lists of the current product.
+
+    The same connection is returned again until one of the lists changes, so don't
+    close it. Rows come back as `sqlite3.Row`, which can be indexed by column name or
+    turned into a dict with `dict(row)`.
+
+    **Args:**
+    - `tables` (dict, optional): Table name -> file key or path of a TSV, for the tables
+        to load. Defaults to `TABLES`.
+
+    **Returns:**
+    - `sqlite3.Connection`: Connection to the database.
+    """
+    if tables is None:
+        tables = TABLES
+    sources = {}
+    for table, key in tables.items():
+        filepath = _source_path(key)
+        if filepath is not None:
+            sources[table] = filepath
+    signature = {table: _signature(filepath) for table, filepath in sources.items()}
+
+    cached = getattr(_local, "cached", None)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    connection = sqlite3.connect(":memory:")
+    connection.row_factory = sqlite3.Row
+    for table, filepath in sources.items():
+        _load_table(connection, table, fileio.read_tsv(filepath))
+    connection.commit()
+
+    if cached is not None:
+        cached[1].close()
+    _local.cached = (signature, connection)
+    return connection
+
+
+def query(sql, params=(), tables=None):
+    """
+    Runs a SQL query against `database()` and returns the result as dicts.
+
+    **Args:**
+    - `sql` (str): The query, e.g.
+        `"SELECT * FROM instances WHERE item_type = ? AND net = ?"`.
+    - `params` (tuple or dict, optional): Values for the `?` or `:name` placeholders.
+    - `tables` (dict, optional): Passed to `database()`.
+
+    **Returns:**
+    - `list`: One dict per result row, keyed by column name (or `AS` alias).
+
+    **Raises:**
+    - `sqlite3.Error`: If the query is not valid SQL or names a table or column that
+        isn't there.
+    """
+    cursor = database(tables).execute(sql, params)
+    return [dict(row) for row in cursor]
+
+
+def select(table, alias=None):
+    """
+    Starts a `Query` on one table, for building a query in Python instead of SQL.
+
+    ```python
+    rows = (
+        query_utils.select("instances", "conductor")
+        .join("instances", "cable", on=("conductor.parent_instance", "cable.instance_name"))
+        .where(**{"conductor.item_type": "conductor", "conductor.net": net})
+        .columns("conductor.instance_name", "cable.mpn AS cable_mpn")
+        .order_by("conductor.instance_name")
+        .all()
+    )
+    ```
+
+    **Args:**
+    - `table` (str): Table to select from, e.g. `"instances"`.
+    - `alias` (str, optional): Name to refer to the table by in the rest of the query.
+
+    **Returns:**
+    - `Query`: The query, to add joins, conditions and columns to.
+    """
+    return Query(table, alias)
+
+
+class Query:
+    """
+    A SELECT statement built up one clause at a time. Start one with `select()`.
+
+    Column references are written `"column"` or `"alias.column"`; both are quoted for
+    SQL, so names like `A-side_device_refdes` work as they are. Every method returns the
+    query itself, so calls can be chained.
+    """
+
+    def __init__(self, table, alias=None):
+        self._from = _table_ref(table, alias)
+        self._joins = []
+        self._columns = []
+        self._conditions = []
+        self._params = []
+        self._order = []
+        self._limit = None
+
+    def join(self, table, alias=None, on=(), left=False):
+        """
+        Joins another table.
+
+        **Args:**
+        - `table` (str): Table to join.
+        - `alias` (str, optional): Name to refer to the joined table by.
+        - `on` (tuple or list): A `(column, column)` pair that must be equal, or a list
+            of such pairs.
+        - `left` (bool, optional): `True` for a LEFT JOIN, which keeps rows that have no
+            match (their joined columns are NULL). Defaults to `False`.
+        """
+        pairs = [on] if isinstance(on, tuple) else list(on)
+        if not pairs:
+            raise ValueError("join() needs at least one (column, column) pair in on=")
+        condition = " AND ".join(f"{_column(a)} = {_column(b)}" for a, b in pairs)
+        kind = "LEFT JOIN" if left else "JOIN"
+        self._joins.append(f"{kind} {_table_ref(table, alias)} ON {condition}")
+        return self
+
+    def where(self, sql=None, *params, **equals):
+        """
+        Adds conditions. All conditions of a query must hold.
+
+        **Args:**
+        - `sql` (str, optional): A SQL condition with `?` placeholders, e.g.
+            `"CAST(conductor.length AS REAL) > ?"`.
+        - `*params`: Values for the placeholders in `sql`.
+        - `**equals`: Columns that must equal a value, e.g. `item_type="conductor"`.
+            Use `**{"alias.column": value}` for qualified names. Values are compared as
+            the text stored in the list, so `circuit_id=5` matches `"5"`. A list or tuple
+            value matches any of its items.
+        """
+        if sql is not None:
+            self._conditions.append(f"({sql})")
+            self._params.extend(params)
+        for column, value in equals.items():
+            if isinstance(value, (list, tuple, set)):
+                values = [_text(v) for v in value]
+                if not values:
+                    self._conditions.append("0")
+                    continue
+                placeholders = ", ".join("?" * len(values))
+                self._conditions.append(f"{_column(column)} IN ({placeholders})")
+                self._params.extend(values)
+            else:
+                self._conditions.append(f"{_column(column)} = ?")
+                self._params.append(_text(value))
+        return self
+
+    def columns(self, *columns):
+        """
+        Chooses the columns to return. Defaults to every column of every table.
+
+        **Args:**
+        - `*columns` (str): Column references, optionally with `AS name`, e.g.
+            `"cable.mpn AS cable_mpn"`.
+        """
+        for column in columns:
+            name, _, alias = column.partition(" AS ")
+            self._columns.append(
+                f"{_column(name.strip())} AS {_identifier(alias.strip())}"
+                if alias
+                else _column(column)
+            )
+        return self
+
+    def order_by(self, *columns):
+        """
+        Sorts the result. Prefix a column with `-` to sort it in descending order.
+        Without this, rows come back in an order SQLite chooses.
+        """
+        for column in columns:
+            if column.startswith("-"):
+                self._order.append(f"{_column(column[1:])} DESC")
+            else:
+                self._order.append(_column(column))
+        return self
+
+    def limit(self, count):
+        """Returns at most **count** rows."""
+        self._limit = int(count)
+        return self
+
+    def sql(self):
+        """
+        Returns the query as SQL text and its parameters.
+
+        **Returns:**
+        - `tuple`: `(sql, params)`, ready for `query()` or `connection.execute()`.
+        """
+        parts = [f"SELECT {', '.join(self._columns) or '*'} FROM {self._from}"]
+        parts.extend(self._joins)
+        if self._conditions:
+            parts.append("WHERE " + " AND ".join(self._conditions))
+        if self._order:
+            parts.append("ORDER BY " + ", ".join(self._order))
+        if self._limit is not None:
+            parts.append(f"LIMIT {self._limit}")
+        return " ".join(parts), tuple(self._params)
+
+    def all(self, tables=None):
+        """Runs the query and returns every row as a dict. See `query()`."""
+        return query(*self.sql(), tables=tables)
+
+    def first(self, tables=None):
+        """Runs the query and returns the first row as a dict, or `None` if there are none."""
+        self._limit = 1
+        rows = self.all(tables)
+        return rows[0] if rows else None
+
+    def __repr__(self):
+        sql, params = self.sql()
+        return f"Query({sql!r}, {params!r})"
+
+
+def _source_path(key):
+    """The file a table is loaded from, or `None` if the current product doesn't have it."""
+    if os.path.isfile(key):
+        return os.path.abspath(key)
+    try:
+        filepath = fileio.path(key)
+    except TypeError:
+        return None
+    if os.path.isfile(filepath) or _is_live(filepath):
+        return filepath
+    return None
+
+
+def _is_live(filepath):
+    session = instances_list._session
+    return session is not None and os.path.abspath(session.path) == os.path.abspath(
+        filepath
+    )
+
+
+def _signature(filepath):
+    """What has to stay the same for a loaded table to still be current."""
+    if _is_live(filepath):
+        return ("session", instances_list.generation())
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return (filepath, stat.st_mtime_ns, stat.st_size)
+
+
+def _load_table(connection, table, rows):
+    columns = {}
+    for row in rows:
+        columns.update(dict.fromkeys(row))
+    columns = list(columns)
+    if not columns:
+        columns = ["_empty"]
+    connection.execute(
+        f"CREATE TABLE {_identifier(table)} "
+        f"({', '.join(f'{_identifier(column)} TEXT' for column in columns)})"
+    )
+    connection.executemany(
+        f"INSERT INTO {_identifier(table)} VALUES ({', '.join('?' * len(columns))})",
+        ([_text(row.get(column)) for column in columns] for row in rows),
+    )
+    for column in INDEXES.get(table, []):
+        if column in columns:
+            connection.execute(
+                f"CREATE INDEX {_identifier(f'{table}__{column}')} "
+                f"ON {_identifier(table)} ({_identifier(column)})"
+            )
+
+
+def _text(value):
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def _identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _column(reference):
+    """Quote `column` or `alias.column`; `*` and `alias.*` are left as they are."""
+    reference = reference.strip()
+    if reference == "*":
+        return reference
+    table, dot, column = reference.partition(".")
+    if not dot:
+        return _identifier(reference)
+    if column == "*":
+        return f"{_identifier(table)}.*"
+    return f"{_identifier(table)}.{_identifier(column)}"
+
+
+def _table_ref(table, alias):
+    if alias:
+        return f"{_identifier(table)} AS {_identifier(alias)}"
+    return _identifier(table)
@@ -1,7 +1,10 @@
 import os
 import re
+import json
 import math
-from harnice.utils import appearance
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from harnice.utils import appearance, tool_utils
 
 
 def add_entire_svg_file_contents_to_group(filepath, new_group_name):
@@ -826,3 +829,137 @@ for symbol in symbols_to_build:
     # Save the master SVG file
     with open(path_to_svg, "w") as f:
         f.write(group_output.strip())
+
+
+def export_pdfs(svg_paths, pdf_paths, inkscape_bin, hash_file=None, workers=None):
+    """
+Exports SVG files to PDF with Inkscape, starting Inkscape as few times as possible.
+
+All pages that need exporting go through one `inkscape --shell` session, so Inkscape's
+startup is paid once instead of once per page. Any page that session did not produce
+(e.g. an Inkscape without shell actions), and every page if the session fails, is
+exported on its own with `inkscape --export-type=pdf`, up to `workers` at a time.
+
+With a `hash_file`, the SVG contents each PDF was exported from are remembered there,
+and a page whose SVG is unchanged since its last export, and whose PDF is still there,
+is not exported again. Every exported page is also kept in the tool cache (see
+`tool_utils.run()`), so a page whose SVG was exported before, by this or any other rev,
+is copied from there instead of being exported again.
+
+**Args:**
+- `svg_paths` (list): SVG files to export.
+- `pdf_paths` (list): PDF file to write for each SVG, in the same order.
+- `inkscape_bin` (str): Path to the Inkscape executable, see `harnice.paths.get_inkscape_bin()`.
+- `hash_file` (str, optional): JSON file to keep the SVG hashes in. Without one, every page is exported.
+- `workers` (int, optional): Maximum number of Inkscape processes to run at once when pages are exported one by one. Defaults to the number of CPUs, at most 4.
+
+**Returns:**
+- `list`: The PDF paths that were exported, leaving out the ones skipped as unchanged.
+
+**Raises:**
+- `ValueError`: If `svg_paths` and `pdf_paths` aren't the same length.
+- `subprocess.CalledProcessError`: If Inkscape fails to export a page.
+    """
+    if len(svg_paths) != len(pdf_paths):
+        raise ValueError("export_pdfs needs one pdf path for every svg path")
+
+    hashes = {}
+    if hash_file is not None and os.path.isfile(hash_file):
+        try:
+            with open(hash_file, encoding="utf-8") as f:
+                hashes = json.load(f)
+        except (OSError, ValueError):
+            hashes = {}
+
+    to_export = []
+    new_hashes = {}
+    for svg_path, pdf_path in zip(svg_paths, pdf_paths):
+        with open(svg_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        key = os.path.basename(pdf_path)
+        new_hashes[key] = [digest, inkscape_bin]
+        if hashes.get(key) == [digest, inkscape_bin] and os.path.isfile(pdf_path):
+            continue
+        # a PDF left over from an earlier export must not pass for a fresh one
+        if os.path.isfile(pdf_path):
+            os.remove(pdf_path)
+        to_export.append((os.path.abspath(svg_path), os.path.abspath(pdf_path)))
+
+    if to_export:
+
+        def export_command(svg_path, pdf_path):
+            return [
+                inkscape_bin,
+                svg_path,
+                "--export-type=pdf",
+                f"--export-filename={pdf_path}",
+            ]
+
+        # pages are cached under the command that exports them one by one, whichever
+        # way they were actually exported
+        keys = {
+            paths: tool_utils.fingerprint(
+                export_command(*paths), inputs=[paths[0]], outputs=[paths[1]]
+            )
+            for paths in to_export
+        }
+        uncached = [
+            paths
+            for paths in to_export
+            if tool_utils.restore(keys[paths], [paths[1]]) is None
+        ]
+
+        result = _export_pdfs_in_shell(uncached, inkscape_bin)
+        if result is not None and result.returncode == 0:
+            for paths in uncached:
+                tool_utils.store(keys[paths], [paths[1]])
+        else:
+            # a session that failed may have left half-written pages behind
+            for _, pdf_path in uncached:
+                if os.path.isfile(pdf_path):
+                    os.remove(pdf_path)
+
+        def export_one(paths):
+            svg_path, pdf_path = paths
+            tool_utils.run(
+                export_command(svg_path, pdf_path),
+                inputs=[svg_path],
+                outputs=[pdf_path],
+                check=True,
+            )
+
+        missing = [paths for paths in uncached if not os.path.isfile(paths[1])]
+        if missing:
+            if workers is None:
+                workers = min(4, os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                # list() re-raises the first failed export
+                list(pool.map(export_one, missing))
+
+    if hash_file is not None:
+        with open(hash_file, "w", encoding="utf-8") as f:
+            json.dump(new_hashes, f, indent=2)
+
+    return [pdf_path for _, pdf_path in to_export]
+
+
+def _export_pdfs_in_shell(to_export, inkscape_bin):
+    # shell actions are separated by ";", so paths containing one can't go this way
+    lines = [
+        f"file-open:{svg_path}; export-filename:{pdf_path}; export-do; file-close"
+        for svg_path, pdf_path in to_export
+        if ";" not in svg_path and ";" not in pdf_path
+    ]
+    if not lines:
+        return None
+    try:
+        return tool_utils.run(
+            [inkscape_bin, "--shell"],
+            cache=False,
+            input="\n".join(lines + ["quit"]) + "\n",
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        # the page-by-page export reports a missing Inkscape
+        return None
@@ -1,6 +1,7 @@
 import os
 import csv
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from harnice import fileio
 from harnice.lists import instances_list
 from harnice.utils import library_utils
@@ -131,6 +132,7 @@ def make_instances_for_connectors_cavities_nodes_channels_circuits():
     connectors_list = fileio.read_tsv("system connector list")
     channel_map = fileio.read_tsv("channel map")
 
+    new_instances = []
     for circuit in fileio.read_tsv("circuits list"):
         from_connector_key = (
             f"{circuit.get('net_from_refdes')}.{circuit.get('net_from_connector_name')}"
@@ -147,21 +149,20 @@ def make_instances_for_connectors_cavities_nodes_channels_circuits():
                 break
 
         # from connector node
-        instances_list.new_instance(
-            f"{from_connector_key}.node",
+        new_instances.append(
             {
+                "instance_name": f"{from_connector_key}.node",
                 "net": circuit.get("net"),
                 "item_type": "node",
                 "location_type": "node",
                 "connector_group": from_connector_key,
-            },
-            ignore_duplicates=True,
+            }
         )
 
         # from connector
-        instances_list.new_instance(
-            f"{from_connector_key}.conn",
+        new_instances.append(
             {
+                "instance_name": f"{from_connector_key}.conn",
                 "net": circuit.get("net"),
                 "item_type": "connector",
                 "location_type": "node",
@@ -173,14 +174,13 @@ def make_instances_for_connectors_cavities_nodes_channels_circuits():
                     "net_from_connector_name"
                 ),
                 "this_instance_mating_device_connector_mpn": from_connector_mpn,
-            },
-            ignore_duplicates=True,
+            }
         )
 
         # from connector cavity
-        instances_list.new_instance(
-            from_cavity,
+        new_instances.append(
             {
+                "instance_name": from_cavity,
                 "net": circuit.get("net"),
                 "item_type": "connector_cavity",
                 "parent_instance": f"{from_connector_key}.conn",  # from connector instance
@@ -188,8 +188,7 @@ def make_instances_for_connectors_cavities_nodes_channels_circuits():
                 "connector_group": from_connector_key,
                 "circuit_id": circuit.get("circuit_id"),
                 "circuit_port_number": 0,
-            },
-            ignore_duplicates=True,
+            }
         )
 
         to_connector_key = (
@@ -207,21 +206,20 @@ def make_instances_for_connectors_cavities_nodes_channels_circuits():
                 break
 
         # to connector node
-        instances_list.new_instance(
-            f"{to_connector_key}.node",
+        new_instances.append(
             {
+                "instance_name": f"{to_connector_key}.node",
                 "net": circuit.get("net"),
                 "item_type": "node",
                 "location_type": "node",
                 "connector_group": to_connector_key,
-            },
-            ignore_duplicates=True,
+            }
         )
 
         # to connector
-        instances_list.new_instance(
-            f"{to_connector_key}.conn",
+        new_instances.append(
             {
+                "instance_name": f"{to_connector_key}.conn",
                 "net": circuit.get("net"),
                 "item_type": "connector",
                 "location_type": "node",
@@ -233,14 +231,13 @@ def make_instances_for_connectors_cavities_nodes_channels_circuits():
                     "net_to_connector_name"
                 ),
                 "this_instance_mating_device_connector_mpn": to_connector_mpn,
-            },
-            ignore_duplicates=True,
+            }
         )
 
         # to connector cavity
-        instances_list.new_instance(
-            to_cavity,
+        new_instances.append(
             {
+                "instance_name": to_cavity,
                 "net": circuit.get("net"),
                 "item_type": "connector_cavity",
                 "parent_instance": f"{to_connector_key}.conn",  # to connector instance
@@ -248,14 +245,13 @@ def make_instances_for_connectors_cavities_nodes_channels_circuits():
                 "connector_group": to_connector_key,
                 "circuit_id": circuit.get("circuit_id"),
                 "circuit_port_number": 1,
-            },
-            ignore_duplicates=True,
+            }
         )
 
         # add circuit
-        instances_list.new_instance(
-            f"circuit-{circuit.get('circuit_id')}",
+        new_instances.append(
             {
+                "instance_name": f"circuit-{circuit.get('circuit_id')}",
                 "net": circuit.get("net"),
                 "item_type": "circuit",
                 "print_name": f"{circuit.get('signal')} of {circuit.get('from_side_device_refdes')}.{circuit.get('from_side_device_chname')} <-> {circuit.get('to_side_device_refdes')}.{circuit.get('to_side_device_chname')}",
@@ -286,15 +282,16 @@ def make_instances_for_connectors_cavities_nodes_channels_circuits():
                 "this_channel_from_channel_type": circuit.get("from_channel_type"),
                 "this_channel_to_channel_type": circuit.get("to_channel_type"),
                 "signal_of_channel_type": circuit.get("signal"),
-            },
-            ignore_duplicates=True,
+            }
         )
 
         # --- add channel
-        instances_list.new_instance(
-            f"channel-{circuit.get('from_side_device_refdes')}.{circuit.get('from_side_device_chname')}-"
-            f"{circuit.get('to_side_device_refdes')}.{circuit.get('to_side_device_chname')}",
+        new_instances.append(
             {
+                "instance_name": (
+                    f"channel-{circuit.get('from_side_device_refdes')}.{circuit.get('from_side_device_chname')}-"
+                    f"{circuit.get('to_side_device_refdes')}.{circuit.get('to_side_device_chname')}"
+                ),
                 "item_type": "channel",
                 "print_name": f"{circuit.get('from_side_device_refdes')}.{circuit.get('from_side_device_chname')} <-> {circuit.get('to_side_device_refdes')}.{circuit.get('to_side_device_chname')}",
                 "channel_group": (
@@ -314,8 +311,7 @@ def make_instances_for_connectors_cavities_nodes_channels_circuits():
                 ),
                 "this_channel_from_channel_type": circuit.get("from_channel_type"),
                 "this_channel_to_channel_type": circuit.get("to_channel_type"),
-            },
-            ignore_duplicates=True,
+            }
         )
 
         # Find the chain of nets for this channel from the channel map
@@ -338,10 +334,12 @@ def make_instances_for_connectors_cavities_nodes_channels_circuits():
         # Create net-channel instances for each net in the chain
         for net in chain_of_nets:
             if circuit.get("net") == net:
-                instances_list.new_instance(
-                    f"{net}:channel-{circuit.get('from_side_device_refdes')}.{circuit.get('from_side_device_chname')}-"
-                    f"{circuit.get('to_side_device_refdes')}.{circuit.get('to_side_device_chname')}",
+                new_instances.append(
                     {
+                        "instance_name": (
+                            f"{net}:channel-{circuit.get('from_side_device_refdes')}.{circuit.get('from_side_device_chname')}-"
+                            f"{circuit.get('to_side_device_refdes')}.{circuit.get('to_side_device_chname')}"
+                        ),
                         "net": net,
                         "item_type": "net-channel",
                         "print_name": (
@@ -384,29 +382,25 @@ def make_instances_for_connectors_cavities_nodes_channels_circuits():
                             "from_channel_type"
                         ),
                         "this_channel_to_channel_type": circuit.get("to_channel_type"),
-                    },
-                    ignore_duplicates=True,
+                    }
                 )
 
+    # the same node/connector shows up once per circuit through it; the first one wins
+    instances_list.bulk_new(new_instances, ignore_duplicates=True)
+
     # Post-process: Update all connector instances with mating device information
     # This ensures connector instances have the correct mating device refdes, connector name, and MPN
+    mating_info = {}
     for connector in fileio.read_tsv("system connector list"):
-        try:
-            instances_list.modify(
-                f"{connector.get('device_refdes')}.{connector.get('connector')}.conn",
-                {
-                    "this_instance_mating_device_refdes": connector.get(
-                        "device_refdes"
-                    ),
-                    "this_instance_mating_device_connector": connector.get("connector"),
-                    "this_instance_mating_device_connector_mpn": connector.get(
-                        "connector_mpn"
-                    ),
-                },
-            )
-        except ValueError:
-            # Skip if connector instance doesn't exist (may not have been created if no circuits)
-            pass
+        mating_info[
+            f"{connector.get('device_refdes')}.{connector.get('connector')}.conn"
+        ] = {
+            "this_instance_mating_device_refdes": connector.get("device_refdes"),
+            "this_instance_mating_device_connector": connector.get("connector"),
+            "this_instance_mating_device_connector_mpn": connector.get("connector_mpn"),
+        }
+    # Skip connector instances that don't exist (may not have been created if no circuits)
+    instances_list.bulk_modify(mating_info, on_missing="skip")
 
 
 def add_chains_to_channel_map():
@@ -553,26 +547,38 @@ def add_chains_to_channel_map():
         writer = csv.DictWriter(f, fieldnames=channel_map[0].keys(), delimiter="\t")
         writer.writeheader()
         writer.writerows(channel_map)
+    fileio.invalidate_tsv_cache(fileio.path("channel map"))
 
 
-def make_instances_from_bom():
+def make_instances_from_bom(max_workers=None):
     """
     Creates instances for all devices and disconnects from the BOM.
 
     Reads the Bill of Materials (BOM) and imports each device or disconnect into the
-    instances list using `library_utils.pull()`. Each item is imported with its manufacturer,
-    part number, revision, and library information.
+    instances list, the same as `library_utils.pull()` would. Each item is imported with
+    its manufacturer, part number, revision, and library information.
 
     Items with the `"disconnect"` field set are imported as type `"disconnect"`,
     all others are imported as type `"device"`.
+
+    Library files are imported on a thread pool; the instances list and library history
+    are then updated in one batch and import statuses are printed in BOM order. If an
+    import fails, the imports that haven't started yet are skipped, every part that was
+    imported is still recorded, and the first failure in BOM order is raised.
+
+    **Args:**
+    - `max_workers` (int, optional): Number of parts to import at once. Defaults to
+        the `HARNICE_PULL_WORKERS` environment variable if set, otherwise Python's
+        default thread pool size.
     """
+    input_dicts = []
     for device in fileio.read_tsv("bom"):
         if device.get("disconnect"):
             item_type = "disconnect"
         else:
             item_type = "device"
 
-        library_utils.pull(
+        input_dicts.append(
             {
                 "instance_name": device.get("device_refdes"),
                 "mfg": device.get("MFG"),
@@ -583,3 +589,30 @@ def make_instances_from_bom():
                 "lib_rev_used_here": device.get("rev"),
             }
         )
+
+    if max_workers is None and os.environ.get("HARNICE_PULL_WORKERS"):
+        max_workers = int(os.environ.get("HARNICE_PULL_WORKERS"))
+
+    imported_parts = []
+    error = None
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(library_utils.import_part, input_dict)
+            for input_dict in input_dicts
+        ]
+        for future in futures:
+            if future.cancelled():
+                continue
+            try:
+                imported_parts.append(future.result())
+            except Exception as e:
+                if error is None:
+                    error = e
+                    # don't start the imports still waiting; the ones already running
+                    # finish and are recorded below, since their files are in place
+                    for pending in futures:
+                        pending.cancel()
+
+    library_utils.apply_imports(imported_parts)
+    if error is not None:
+        raise error
@@ -0,0 +1,397 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from harnice import fileio
+from harnice.utils import profile_utils
+
+"""
+cached external tool runs (kicad-cli, Inkscape, ...)
+
+`run()` runs a command like `subprocess.run()`, but first looks for an earlier run of the
+same command in the tool cache. A run is identified by its fingerprint, made of:
+    the tool: its path and what it prints for `--version`
+    the arguments, with the input and output paths replaced by their position
+    the name and contents of every input file, and the `input=` sent to stdin
+
+When an earlier successful run has the same fingerprint, its output files, stdout and stderr
+are restored from the cache instead of running the tool. Otherwise the tool runs, and if it
+succeeds and writes every output, they are stored for next time.
+
+The cache is kept in `.tool_cache` in the part directory, so every rev of a part shares it,
+or in the directory named by the `HARNICE_TOOL_CACHE` environment variable. Deleting it at
+any time is safe. Set `HARNICE_TOOL_CACHE` to `off` to run every command.
+
+Every call is timed; see `timings()`.
+"""
+
+CACHE_DIRNAME = ".tool_cache"
+
+# (tool path, mtime, size) -> version text, for this process
+_versions = {}
+_versions_lock = threading.Lock()
+
+# one dict per run() call, in the order they finished
+_timings = []
+_timings_lock = threading.Lock()
+
+
+def cache_directory():
+    """Returns the directory tool outputs are cached in, or `None` if caching is switched off."""
+    override = os.environ.get("HARNICE_TOOL_CACHE", "")
+    if override.lower() == "off":
+        return None
+    if override:
+        return os.path.abspath(override)
+    return os.path.join(fileio.part_directory(), CACHE_DIRNAME)
+
+
+def run(command, inputs=(), outputs=(), cache=True, check=False, **kwargs):
+    """
+    Runs an external tool, or replays its outputs if it already ran on the same inputs.
+
+    ```python
+    tool_utils.run(
+        [get_kicad_cli(), "sch", "export", "pdf", "--output", pdf_path, sch_path],
+        inputs=[sch_path],
+        outputs=[pdf_path],
+        check=True,
+        capture_output=True,
+    )
+    ```
+
+    Files the tool reads without being named in `inputs` aren't part of the fingerprint, so
+    list all of them (e.g. every sheet of a hierarchical schematic). Only runs that exit with
+    `0` and leave every file of `outputs` in place are cached.
+
+    **Args:**
+    - `command` (list): The command, tool first, as for `subprocess.run()`.
+    - `inputs` (list, optional): Files the tool reads.
+    - `outputs` (list, optional): Files the tool writes. Restored on a cache hit.
+    - `cache` (bool, optional): `False` to always run the tool. Defaults to `True`.
+    - `check` (bool, optional): Raise if the tool exits with an error, as for
+        `subprocess.run()`. Defaults to `False`.
+    - `**kwargs`: Passed on to `subprocess.run()`, e.g. `capture_output`, `text` or `input`.
+
+    **Returns:**
+    - `subprocess.CompletedProcess`: What the tool returned; on a cache hit, what it returned
+        when it was cached.
+
+    **Raises:**
+    - `FileNotFoundError`: If an input file doesn't exist.
+    - `subprocess.CalledProcessError`: If `check` is set and the tool fails.
+    """
+    command = [os.fsdecode(argument) for argument in command]
+    name = os.path.basename(command[0])
+    started = time.perf_counter()
+
+    key = fingerprint(command, inputs, outputs, kwargs) if cache else None
+    with profile_utils.stage("tool", name):
+        result = _replay(key, command, outputs, kwargs)
+        cached = result is not None
+        if not cached:
+            result = subprocess.run(command, **kwargs)
+            if result.returncode == 0 and key is not None:
+                store(key, outputs, result.stdout, result.stderr)
+
+    _record_timing(name, command, cached, time.perf_counter() - started)
+    if check:
+        result.check_returncode()
+    return result
+
+
+def fingerprint(command, inputs=(), outputs=(), kwargs=None):
+    """
+    Returns the fingerprint `run()` would cache a command under.
+
+    Useful for tools that export several files in one session (e.g. `inkscape --shell`),
+    whose outputs are then cached one by one with `store()` under the fingerprint of the
+    command that would export each of them alone.
+
+    **Args:**
+    - `command` (list): The command, tool first.
+    - `inputs` (list, optional): Files the tool reads.
+    - `outputs` (list, optional): Files the tool writes.
+    - `kwargs` (dict, optional): Keyword arguments for `subprocess.run()`. `input` and
+        whether the output is text (`text`, `universal_newlines` or `encoding`) change the
+        fingerprint; `cwd` is only used to find relative input and output paths.
+
+    **Returns:**
+    - `str`: Hex digest, or `None` if caching is switched off.
+
+    **Raises:**
+    - `FileNotFoundError`: If an input file doesn't exist.
+    """
+    if cache_directory() is None:
+        return None
+    kwargs = kwargs or {}
+    cwd = kwargs.get("cwd")
+
+    # paths are replaced by their role, so renaming an output or moving the project
+    # doesn't change the fingerprint
+    placeholders = {}
+    for role, paths in (("input", inputs), ("output", outputs)):
+        for index, path in enumerate(paths):
+            path = os.fsdecode(path)
+            placeholders[path] = f"<{role}{index}>"
+            placeholders[_absolute(path, cwd)] = f"<{role}{index}>"
+    ordered = sorted(placeholders, key=len, reverse=True)
+
+    arguments = []
+    for argument in command[1:]:
+        argument = os.fsdecode(argument)
+        for path in ordered:
+            if path and path in argument:
+                argument = argument.replace(path, placeholders[path])
+        arguments.append(argument)
+
+    key = hashlib.sha256()
+    key.update(
+        json.dumps(
+            {
+                "tool": tool_version(command[0]),
+                "arguments": arguments,
+                "inputs": [os.path.basename(os.fsdecode(path)) for path in inputs],
+                "text": bool(
+                    kwargs.get("text")
+                    or kwargs.get("universal_newlines")
+                    or kwargs.get("encoding")
+                ),
+            }
+        ).encode("utf-8")
+    )
+    for path in inputs:
+        key.update(_file_hash(_absolute(os.fsdecode(path), cwd)).encode("utf-8"))
+    stdin = kwargs.get("input")
+    if stdin is not None:
+        key.update(stdin.encode("utf-8") if isinstance(stdin, str) else stdin)
+    return key.hexdigest()
+
+
+def store(key, outputs, stdout=None, stderr=None):
+    """
+    Stores the outputs of a successful run under a fingerprint from `fingerprint()`.
+
+    Does nothing if `key` is `None` or an output is missing.
+
+    **Args:**
+    - `key` (str): The fingerprint.
+    - `outputs` (list): Files the run wrote, in the order given to `fingerprint()`.
+    - `stdout` (str or bytes, optional): What the run printed.
+    - `stderr` (str or bytes, optional): What the run printed to stderr.
+    """
+    directory = cache_directory()
+    if key is None or directory is None:
+        return
+    if not all(os.path.isfile(os.fsdecode(path)) for path in outputs):
+        return
+    record = {
+        "outputs": [_store_blob(directory, os.fsdecode(path)) for path in outputs],
+        "stdout": _store_stream(directory, stdout),
+        "stderr": _store_stream(directory, stderr),
+    }
+    _write_atomically(
+        _record_path(directory, key), json.dumps(record, indent=1).encode("utf-8")
+    )
+
+
+def restore(key, outputs):
+    """
+    Restores the outputs stored under a fingerprint.
+
+    **Args:**
+    - `key` (str): The fingerprint, or `None`.
+    - `outputs` (list): Where to put the outputs, in the order they were stored.
+
+    **Returns:**
+    - `dict`: The stored record, or `None` if there is nothing to restore.
+    """
+    directory = cache_directory()
+    if key is None or directory is None:
+        return None
+    try:
+        with open(_record_path(directory, key), "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if len(record.get("outputs", [])) != len(outputs):
+        return None
+    blobs = [os.path.join(directory, "blobs", blob) for blob in record["outputs"]]
+    if not all(os.path.isfile(blob) for blob in blobs):
+        return None
+    for blob, path in zip(blobs, outputs):
+        path = os.fsdecode(path)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(blob, path)
+        fileio.invalidate_tsv_cache(path)
+    return record
+
+
+def tool_version(tool):
+    """
+    Returns what a tool prints for `--version`, prefixed with its path.
+
+    Asked once per tool per process, and remembered in the tool cache for as long as the
+    tool's file doesn't change, so a fully cached render doesn't start the tool at all.
+
+    **Args:**
+    - `tool` (str): Path or command name of the tool.
+
+    **Returns:**
+    - `str`: `"<path> <version>"`, with an empty version if the tool couldn't tell.
+    """
+    path = shutil.which(tool) or tool
+    try:
+        stat = os.stat(path)
+        signature = [os.path.abspath(path), stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        signature = [path, None, None]
+
+    with _versions_lock:
+        version = _versions.get(tuple(signature))
+    if version is not None:
+        return version
+
+    directory = cache_directory()
+    versions_path = os.path.join(directory, "versions.json") if directory else None
+    known = {}
+    if versions_path is not None:
+        try:
+            with open(versions_path, "r", encoding="utf-8") as f:
+                known = json.load(f)
+        except (OSError, ValueError):
+            known = {}
+    entry = known.get(signature[0])
+    if entry is not None and entry[:2] == signature[1:] and signature[1] is not None:
+        version = entry[2]
+    else:
+        try:
+            result = subprocess.run(
+                [path, "--version"], capture_output=True, text=True, timeout=60
+            )
+            version = f"{signature[0]} {result.stdout.strip()}"
+        except (OSError, subprocess.SubprocessError):
+            version = f"{signature[0]} "
+        if versions_path is not None and signature[1] is not None:
+            known[signature[0]] = signature[1:] + [version]
+            _write_atomically(
+                versions_path, json.dumps(known, indent=1).encode("utf-8")
+            )
+
+    with _versions_lock:
+        _versions[tuple(signature)] = version
+    return version
+
+
+def timings():
+    """
+    Returns how long each `run()` call of this process took.
+
+    **Returns:**
+    - `list`: One dict per call, oldest first, with `tool` (name of the executable),
+        `command` (the full command), `cached` (`True` if the outputs were replayed from
+        the cache) and `seconds` (wall time, including the cache lookup).
+    """
+    with _timings_lock:
+        return [dict(timing) for timing in _timings]
+
+
+def clear_timings():
+    """Forgets the timings recorded so far."""
+    with _timings_lock:
+        _timings.clear()
+
+
+def _replay(key, command, outputs, kwargs):
+    """A `CompletedProcess` rebuilt from the cache, or `None` on a miss."""
+    record = restore(key, outputs)
+    if record is None:
+        return None
+    text = bool(
+        kwargs.get("text") or kwargs.get("universal_newlines") or kwargs.get("encoding")
+    )
+    captured = kwargs.get("capture_output") or kwargs.get("stdout") == subprocess.PIPE
+    captured_err = (
+        kwargs.get("capture_output") or kwargs.get("stderr") == subprocess.PIPE
+    )
+    directory = cache_directory()
+    return subprocess.CompletedProcess(
+        command,
+        0,
+        _load_stream(directory, record.get("stdout"), text) if captured else None,
+        _load_stream(directory, record.get("stderr"), text) if captured_err else None,
+    )
+
+
+def _record_timing(name, command, cached, seconds):
+    with _timings_lock:
+        _timings.append(
+            {
+                "tool": name,
+                "command": command,
+                "cached": cached,
+                "seconds": seconds,
+            }
+        )
+
+
+def _absolute(path, cwd=None):
+    return os.path.abspath(os.path.join(cwd or os.getcwd(), path))
+
+
+def _file_hash(path):
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _record_path(directory, key):
+    return os.path.join(directory, "records", f"{key}.json")
+
+
+def _store_blob(directory, path):
+    """Copy a file into the cache and return its hash."""
+    file_hash = _file_hash(path)
+    blob_path = os.path.join(directory, "blobs", file_hash)
+    if not os.path.exists(blob_path):
+        with open(path, "rb") as f:
+            _write_atomically(blob_path, f.read())
+    return file_hash
+
+
+def _store_stream(directory, data):
+    if data is None:
+        return None
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    file_hash = hashlib.sha256(data).hexdigest()
+    blob_path = os.path.join(directory, "blobs", file_hash)
+    if not os.path.exists(blob_path):
+        _write_atomically(blob_path, data)
+    return file_hash
+
+
+def _load_stream(directory, file_hash, text):
+    if file_hash is None:
+        return "" if text else b""
+    try:
+        with open(os.path.join(directory, "blobs", file_hash), "rb") as f:
+            data = f.read()
+    except OSError:
+        data = b""
+    return data.decode("utf-8") if text else data
+
+
+def _write_atomically(filepath, data):
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(filepath))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, filepath)